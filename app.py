@@ -1,386 +1,340 @@
 import streamlit as st
-import requests
 import pandas as pd
-import re
-from bs4 import BeautifulSoup
-import phonenumbers
-from phonenumbers import carrier, geocoder
-from urllib.parse import urljoin, urlparse
-import time
-from io import BytesIO
 import os
+import shutil
+import tempfile
+import time
 from dotenv import load_dotenv
-import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import random
+
+from exports import EXPORT_FORMATS, NdjsonExporter, available_formats, export_file
+from extractor import RealEmployeeDataExtractor
+from job_server import JobClient
+from metrics import RunProfiler
+from rate_limit import TokenBucket
+from records import RECORD_FIELDS, RecordBuffer
 
 # Load environment variables
 load_dotenv()
 
+DISPLAY_COLUMNS = [
+    'Business Name', 'Number of Employees', 'Contact Person', 'First Name',
+    'Corporate Email', 'Email', 'Website', 'Phone', 'Phone Type',
+    'Street Address', 'Zip Code', 'State', 'City', 'Status'
+]
 
-class RealEmployeeDataExtractor:
-    def __init__(self):
-        self.serper_api_key = os.getenv('SERPER_API_KEY')
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
-
-    def set_api_key(self, api_key):
-        self.serper_api_key = api_key
-
-    def search_companies_and_employees(self, industry, job_role, city, country, num_results=10):
-        """Search for companies and their employees using multiple search strategies"""
-        if not self.serper_api_key:
-            st.error("Please provide Serper.dev API key")
-            return []
-
-        # Enhanced search queries for finding real employees
-        queries = [
-            f'"{job_role}" "{industry}" "{city}" "{country}" site:linkedin.com',
-            f'"{job_role}" "{industry}" companies "{city}" "{country}" contact directory',
-            f'"{job_role}" "{industry}" "{city}" "{country}" "team" "about us" site:company website',
-            f'"{industry}" companies "{city}" "{country}" "{job_role}" leadership team',
-            f'"{job_role}" "{industry}" "{city}" "{country}" "meet our team" OR "our leadership"',
-            f'"{industry}" "{city}" "{country}" "{job_role}" email contact phone',
-            f'"{job_role}" "{industry}" "{city}" "{country}" site:crunchbase.com OR site:zoominfo.com'
-        ]
-
-        all_results = []
-
-        for i, query in enumerate(queries):
-            st.write(f"Searching with query {i + 1}/{len(queries)}: {query[:50]}...")
-
-            url = "https://google.serper.dev/search"
-            payload = {
-                "q": query,
-                "num": 10,
-                "gl": "in" if country.lower() == "india" else "us"
-            }
-            headers = {
-                "X-API-KEY": self.serper_api_key,
-                "Content-Type": "application/json"
-            }
-
-            try:
-                response = requests.post(url, json=payload, headers=headers)
-                response.raise_for_status()
-                results = response.json().get("organic", [])
-                all_results.extend(results)
-                time.sleep(2)  # Rate limiting
-            except requests.exceptions.RequestException as e:
-                st.warning(f"Error with query {i + 1}: {str(e)}")
-                continue
-
-        # Remove duplicates
-        seen_urls = set()
-        unique_results = []
-        for result in all_results:
-            url = result.get('link', '')
-            if url not in seen_urls and url:
-                seen_urls.add(url)
-                unique_results.append(result)
-
-        return unique_results
-
-    def extract_emails_from_text(self, text):
-        """Extract email addresses from text"""
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = re.findall(email_pattern, text)
-        # Filter out common non-employee emails
-        filtered_emails = []
-        exclude_patterns = ['noreply', 'no-reply', 'support', 'info', 'admin', 'webmaster', 'contact']
-
-        for email in emails:
-            if not any(pattern in email.lower() for pattern in exclude_patterns):
-                filtered_emails.append(email)
-
-        return filtered_emails
-
-    def extract_phone_numbers(self, text):
-        """Extract phone numbers from text"""
-        # Indian phone number patterns
-        phone_patterns = [
-            r'\+91[-\s]?\d{10}',
-            r'\+91[-\s]?\d{5}[-\s]?\d{5}',
-            r'\+91[-\s]?\d{4}[-\s]?\d{3}[-\s]?\d{3}',
-            r'\b\d{10}\b',
-            r'\b\d{5}[-\s]?\d{5}\b',
-            r'\b\d{4}[-\s]?\d{3}[-\s]?\d{3}\b'
-        ]
-
-        phones = []
-        for pattern in phone_patterns:
-            matches = re.findall(pattern, text)
-            phones.extend(matches)
-
-        return list(set(phones))  # Remove duplicates
-
-    def extract_names_from_text(self, text, job_role):
-        """Extract potential employee names from text"""
-        # Look for patterns like "John Doe, CTO" or "Jane Smith - CEO"
-        name_patterns = [
-            rf'([A-Z][a-z]+\s+[A-Z][a-z]+)[\s,\-–]+{re.escape(job_role)}',
-            rf'{re.escape(job_role)}[\s,\-–:]+([A-Z][a-z]+\s+[A-Z][a-z]+)',
-            r'([A-Z][a-z]+\s+[A-Z][a-z]+)[\s,\-–]+(Chief\s+Technology\s+Officer|Chief\s+Executive\s+Officer|Chief\s+Financial\s+Officer)',
-            r'(Mr\.?\s+|Ms\.?\s+|Dr\.?\s+)?([A-Z][a-z]+\s+[A-Z][a-z]+)[\s,\-–]+(CTO|CEO|CFO|VP|Director|Manager)'
-        ]
-
-        names = []
-        for pattern in name_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if isinstance(match, tuple):
-                    # Take the name part from tuple
-                    name = match[1] if len(match) > 1 and match[1] else match[0]
-                else:
-                    name = match
-
-                if name and len(name.split()) >= 2:
-                    names.append(name.strip())
-
-        return list(set(names))
-
-    def scrape_website_content(self, url, timeout=10):
-        """Scrape content from a website"""
-        try:
-            response = self.session.get(url, timeout=timeout)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-
-            # Get text content
-            text = soup.get_text()
-
-            # Clean up text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-
-            return text, soup
-
-        except Exception as e:
-            st.warning(f"Could not scrape {url}: {str(e)}")
-            return "", None
-
-    def extract_company_info(self, url, text, soup):
-        """Extract company information from website content"""
-        company_info = {
-            'name': '',
-            'domain': '',
-            'address': '',
-            'phone': '',
-            'employees_count': ''
-        }
-
-        # Extract domain
-        domain = urlparse(url).netloc.replace('www.', '')
-        company_info['domain'] = domain
-
-        # Extract company name from title or content
-        if soup:
-            title = soup.find('title')
-            if title:
-                company_info['name'] = title.get_text().split('|')[0].split('-')[0].strip()
-
-        # Extract address patterns
-        address_patterns = [
-            r'Address[:\s]+([^,\n]+(?:,\s*[^,\n]+)*)',
-            r'Location[:\s]+([^,\n]+(?:,\s*[^,\n]+)*)',
-            r'Office[:\s]+([^,\n]+(?:,\s*[^,\n]+)*)'
-        ]
-
-        for pattern in address_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                company_info['address'] = match.group(1).strip()
-                break
-
-        # Extract phone
-        phones = self.extract_phone_numbers(text)
-        if phones:
-            company_info['phone'] = phones[0]
-
-        # Try to extract employee count
-        employee_patterns = [
-            r'(\d+[\+,]?\d*)\s*employees',
-            r'team\s+of\s+(\d+[\+,]?\d*)',
-            r'(\d+[\+,]?\d*)\s*people'
-        ]
-
-        for pattern in employee_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                company_info['employees_count'] = match.group(1)
-                break
-
-        return company_info
-
-    def process_search_result(self, result, job_role, industry, city, country):
-        """Process a single search result to extract employee data"""
-        url = result.get('link', '')
-        title = result.get('title', '')
-        snippet = result.get('snippet', '')
-
-        employees_found = []
-
-        # Skip if it's a LinkedIn profile URL (we'll handle these separately)
-        if 'linkedin.com/in/' in url:
-            return self.process_linkedin_profile(result, job_role, industry, city, country)
-
-        # Scrape the website
-        text_content, soup = self.scrape_website_content(url)
-
-        if not text_content:
-            return employees_found
-
-        # Extract company information
-        company_info = self.extract_company_info(url, text_content, soup)
-
-        # Extract employee names
-        names = self.extract_names_from_text(text_content + ' ' + title + ' ' + snippet, job_role)
-
-        # Extract emails and phones
-        emails = self.extract_emails_from_text(text_content)
-        phones = self.extract_phone_numbers(text_content)
-
-        # Create employee records
-        for i, name in enumerate(names[:3]):  # Limit to 3 employees per company
-            first_name = name.split()[0]
-            last_name = name.split()[-1] if len(name.split()) > 1 else ''
-
-            # Try to match email to name
-            corporate_email = ''
-            for email in emails:
-                if first_name.lower() in email.lower() or last_name.lower() in email.lower():
-                    corporate_email = email
+# Record fields, including whether the contact store already knew the contact
+TABLE_COLUMNS = RECORD_FIELDS
+
+# Searches whose results are kept in the session
+MAX_STORED_RUNS = 5
+
+# Seconds between polls of a job server for a submitted search
+JOB_POLL_INTERVAL = 1.0
+
+FORMAT_LABELS = {'xlsx': 'Excel', 'csv': 'CSV', 'json': 'JSON', 'ndjson': 'NDJSON', 'parquet': 'Parquet'}
+
+
+def streamlit_reporter(level, message):
+    """Show extractor progress and warnings in the page"""
+    if level == 'error':
+        st.error(message)
+    elif level == 'warning':
+        st.warning(message)
+    else:
+        st.write(message)
+
+
+def to_display_frame(employees_data):
+    """Build the results table with display column names, column by column from a RecordBuffer"""
+    if not isinstance(employees_data, RecordBuffer):
+        employees_data = RecordBuffer.from_records(employees_data, TABLE_COLUMNS)
+    return employees_data.to_pandas(DISPLAY_COLUMNS)
+
+
+@st.cache_resource
+def get_extractor():
+    """One extractor per server process, so its HTTP session, caches and worker processes outlive reruns"""
+    return RealEmployeeDataExtractor(reporter=streamlit_reporter)
+
+
+@st.cache_resource
+def get_rate_limiter(api_key):
+    """One Serper rate limiter per API key, shared by every session that uses the key"""
+    return TokenBucket()
+
+
+def session_extractor():
+    """This session's fork of the shared extractor, so its settings, API key and profiler are its own"""
+    if 'extractor' not in st.session_state:
+        st.session_state.extractor = get_extractor().fork(reporter=streamlit_reporter)
+    return st.session_state.extractor
+
+
+def search_key(industry, job_role, city, country, num_results):
+    return (industry, job_role, city.strip(), country.strip(), num_results)
+
+
+def start_run(key, contact_store):
+    """Session-state entry for one search; the oldest runs and their export files are dropped"""
+    runs = st.session_state.setdefault('runs', {})
+    if key in runs:
+        shutil.rmtree(runs.pop(key)['export']['dir'], ignore_errors=True)
+    while len(runs) >= MAX_STORED_RUNS:
+        shutil.rmtree(runs.pop(next(iter(runs)))['export']['dir'], ignore_errors=True)
+
+    industry, job_role, city, country, num_results = key
+    export_dir = tempfile.mkdtemp(prefix='employee-export-')
+    runs[key] = run = {
+        'key': key,
+        'records': RecordBuffer(TABLE_COLUMNS),
+        'contact_store': contact_store,
+        'search_results': 0,
+        'complete': False,
+        'export': {
+            'dir': export_dir,
+            'spool': os.path.join(export_dir, 'records.ndjson'),
+            'file_stem': f"real_{job_role}_{industry}_{city}_{num_results}_employees",
+            'rows': 0,
+            'prepared': {},
+        },
+    }
+    return run
+
+
+def run_extraction(extractor, key, profile_run):
+    """Search and scrape, streaming rows into a live table; the run is kept even if a rerun cuts it short"""
+    industry, job_role, city, country, num_results = key
+    run = start_run(key, extractor.use_contact_store)
+    profiler = start_profiling(extractor) if profile_run else None
+    exporter = NdjsonExporter(run['export']['spool'], TABLE_COLUMNS)
+    live = st.empty()
+
+    try:
+        with st.spinner("🔍 Searching for real companies and employees..."):
+            search_results = extractor.search_companies_and_employees(
+                industry, job_role, city, country, num_results
+            )
+        run['search_results'] = len(search_results)
+
+        if search_results:
+            with live.container():
+                st.success(f"Found {len(search_results)} search results to process")
+
+                # Stream rows into the table as they are extracted
+                st.subheader("📊 Extracting Real Employee Details...")
+                live_table = st.dataframe(to_display_frame([]), use_container_width=True)
+
+                with st.spinner("🌐 Extracting real employee data from websites..."):
+                    for employee in extractor.iter_real_employees_data(
+                        search_results, industry, job_role, city, country, num_results
+                    ):
+                        run['records'].append(employee)
+                        exporter.write(employee)
+                        live_table.add_rows(to_display_frame([employee]))
+
+        run['complete'] = True
+    finally:
+        exporter.close()
+        run['export']['rows'] = exporter.rows
+        finish_profiling(extractor, profiler)
+
+    live.empty()
+
+
+def run_remote_job(client, key):
+    """Submit the search to the job server and stream its records into a live table until the job ends"""
+    industry, job_role, city, country, num_results = key
+    run = start_run(key, False)
+    exporter = NdjsonExporter(run['export']['spool'], TABLE_COLUMNS)
+    live = st.empty()
+
+    try:
+        with live.container():
+            job = client.submit(industry, job_role, city, country, num_results)
+            run['job_id'] = job['id']
+            if job['merged']:
+                st.info("🤝 An identical search is already queued or running; showing its results")
+
+            progress = st.empty()
+            live_table = st.dataframe(to_display_frame([]), use_container_width=True)
+            while True:
+                job = client.job(job['id'])
+                while True:
+                    records = client.records(job['id'], len(run['records']))
+                    if not records:
+                        break
+                    for employee in records:
+                        run['records'].append(employee)
+                        exporter.write(employee)
+                    live_table.add_rows(to_display_frame(records))
+
+                if job['status'] in ('done', 'failed'):
                     break
+                if job['status'] == 'queued':
+                    progress.caption(f"⏳ Queued on the job server behind {job['queued_ahead']} searches")
+                else:
+                    progress.caption(f"🌐 Running on the job server: {len(run['records'])} records so far")
+                time.sleep(JOB_POLL_INTERVAL)
+
+        run['search_results'] = job['search_results'] or 0
+        run['contact_store'] = any(run['records'].column('contact_status'))
+        if job['status'] == 'failed':
+            st.error(f"❌ The job failed on the server: {job['error']}")
+        else:
+            run['complete'] = True
+    except RuntimeError as e:
+        st.error(f"❌ {e}")
+    finally:
+        exporter.close()
+        run['export']['rows'] = exporter.rows
+
+    live.empty()
+
+
+def show_results(run):
+    employees_data = run['records']
+    industry, job_role, city, country, _ = run['key']
+
+    if not run['complete']:
+        st.warning(f"⚠️ This run was interrupted after {len(employees_data)} records. "
+                   "Click Extract to run it again.")
+    elif not run['search_results']:
+        st.error("❌ No search results found. Please try different search terms or check your API key.")
+        return
+    elif not employees_data:
+        st.warning(
+            "⚠️ No real employee data could be extracted. Try different search parameters or check if companies in this industry/location have online presence.")
+        return
+
+    st.subheader(f"📊 Extracted {len(employees_data)} Real Employee Details")
+    st.dataframe(to_display_frame(employees_data), use_container_width=True)
+    if not run['complete']:
+        return
+
+    st.success(f"✅ Found real employees working as {job_role} in {industry} companies in {city}, {country}")
+    if run['contact_store']:
+        new_contacts = employees_data.column('contact_status').count('new')
+        st.info(f"🆕 {new_contacts} new contacts, {len(employees_data) - new_contacts} already known")
+
+    st.success(f"✅ Successfully extracted {len(employees_data)} real employee details!")
+
+    # Show data sources
+    with st.expander("📋 Data Sources Used"):
+        st.markdown("""
+        **Real data extracted from:**
+        - Company websites and "About Us" pages
+        - LinkedIn professional profiles
+        - Company team directories
+        - Professional networking sites
+        - Business directories and listings
+        - Corporate contact pages
+        """)
 
-            # Generate corporate email if not found
-            if not corporate_email and company_info['domain']:
-                corporate_email = f"{first_name.lower()}.{last_name.lower()}@{company_info['domain']}"
-
-            employee_record = {
-                'business_name': company_info['name'] or self.extract_company_from_url(url),
-                'num_employees': company_info['employees_count'] or 'Unknown',
-                'contact_person': name,
-                'first_name': first_name,
-                'corporate_email': corporate_email,
-                'other_emails': emails[0] if emails else f"info@{company_info['domain']}",
-                'website': f"www.{company_info['domain']}",
-                'phone': phones[i] if i < len(phones) else company_info['phone'],
-                'phone_type': 'Office',
-                'street_address': company_info['address'] or f"{city}, {country}",
-                'zip_code': 'Unknown',
-                'state': 'Unknown',
-                'city': city
-            }
-
-            employees_found.append(employee_record)
-
-        return employees_found
-
-    def process_linkedin_profile(self, result, job_role, industry, city, country):
-        """Process LinkedIn profile results"""
-        url = result.get('link', '')
-        title = result.get('title', '')
-        snippet = result.get('snippet', '')
-
-        # Extract name from LinkedIn title
-        name_match = re.search(r'^([^-|]+)', title)
-        if not name_match:
-            return []
-
-        name = name_match.group(1).strip()
-        first_name = name.split()[0] if name.split() else ''
-
-        # Extract company from snippet or title
-        company_patterns = [
-            r'at\s+([^-|,\n]+)',
-            r'@\s+([^-|,\n]+)',
-            r'-\s+([^|,\n]+)'
-        ]
-
-        company_name = ''
-        for pattern in company_patterns:
-            match = re.search(pattern, title + ' ' + snippet)
-            if match:
-                company_name = match.group(1).strip()
-                break
-
-        if not company_name:
-            company_name = f"{industry} Company"
-
-        # Generate domain from company name
-        domain = company_name.lower().replace(' ', '').replace('-', '') + '.com'
-
-        employee_record = {
-            'business_name': company_name,
-            'num_employees': 'Unknown',
-            'contact_person': name,
-            'first_name': first_name,
-            'corporate_email': f"{first_name.lower()}@{domain}",
-            'other_emails': f"info@{domain}",
-            'website': f"www.{domain}",
-            'phone': 'Unknown',
-            'phone_type': 'Unknown',
-            'street_address': f"{city}, {country}",
-            'zip_code': 'Unknown',
-            'state': 'Unknown',
-            'city': city
-        }
-
-        return [employee_record]
-
-    def extract_company_from_url(self, url):
-        """Extract company name from URL domain"""
-        try:
-            domain = urlparse(url).netloc.replace('www.', '').lower()
-            company_name = domain.split('.')[0]
-            return company_name.title().replace('-', ' ')
-        except:
-            return "Unknown Company"
-
-    def extract_real_employees_data(self, search_results, industry, job_role, city, country, num_results=10):
-        """Extract real employee data from search results using parallel processing"""
-        all_employees = []
-
-        # Process results in parallel for better performance
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_result = {
-                executor.submit(self.process_search_result, result, job_role, industry, city, country): result
-                for result in search_results[:20]  # Process top 20 results
-            }
-
-            for future in as_completed(future_to_result):
-                try:
-                    employees = future.result(timeout=30)
-                    all_employees.extend(employees)
-
-                    # Update progress
-                    st.write(f"Processed {len(all_employees)} employee records so far...")
-
-                except Exception as e:
-                    st.warning(f"Error processing result: {str(e)}")
-                    continue
-
-        # Remove duplicates based on name and company
-        seen = set()
-        unique_employees = []
-
-        for emp in all_employees:
-            key = (emp['contact_person'].lower(), emp['business_name'].lower())
-            if key not in seen:
-                seen.add(key)
-                unique_employees.append(emp)
-
-        # Return requested number of results
-        return unique_employees[:num_results]
+
+def show_export_panel(run):
+    """Download a run's records; a file is only written the first time its format is asked for"""
+    export = run['export']
+    if not export['rows']:
+        return
+
+    st.subheader(f"📥 Download {export['rows']} records")
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        fmt = st.selectbox("Format", options=available_formats(), format_func=FORMAT_LABELS.get)
+    with col2:
+        st.write("")
+        if fmt not in export['prepared'] and st.button(f"Prepare {FORMAT_LABELS[fmt]} file"):
+            extension, _ = EXPORT_FORMATS[fmt]
+            path = os.path.join(export['dir'], export['file_stem'] + extension)
+            with st.spinner(f"Writing {FORMAT_LABELS[fmt]} file..."):
+                export_file(export['spool'], path, TABLE_COLUMNS, DISPLAY_COLUMNS, fmt)
+            export['prepared'][fmt] = path
+
+    if fmt in export['prepared']:
+        path = export['prepared'][fmt]
+        with open(path, 'rb') as f:
+            st.download_button(
+                label=f"📥 Download as {FORMAT_LABELS[fmt]}",
+                data=f,
+                file_name=os.path.basename(path),
+                mime=EXPORT_FORMATS[fmt][1]
+            )
+
+
+def start_profiling(extractor):
+    """Profile the run on this thread and on every worker thread it uses"""
+    profiler = RunProfiler()
+    extractor.set_profiler(profiler)
+    profiler.start()
+    return profiler
+
+
+def finish_profiling(extractor, profiler):
+    if profiler is None:
+        return
+    profiler.stop()
+    extractor.set_profiler(None)
+    st.session_state.last_profile = {'prof': profiler.dump(), 'summary': profiler.summary()}
+
+
+def show_metrics_panel(extractor):
+    """Collapsible per-stage timings, counters and downloads"""
+    with st.expander("📈 Pipeline metrics"):
+        metrics = extractor.metrics
+        snapshot = metrics.snapshot()
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Downloaded", f"{snapshot['bytes_downloaded'] / 1024:.0f} KB")
+        col2.metric("Records", sum(snapshot['records_by_source'].values()))
+        col3.metric("Failed pages", sum(snapshot['pages_failed'].values()))
+        pages = sum(snapshot['pages_by_source'].values())
+        col4.metric("Records per page", f"{sum(snapshot['records_by_source'].values()) / pages:.2f}" if pages else "-")
+
+        rows = metrics.stage_rows()
+        if rows:
+            st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        else:
+            st.caption("No runs measured yet")
+
+        if snapshot['records_by_source']:
+            st.markdown("**Records by source:** " + ", ".join(
+                f"{source} {count}" for source, count in sorted(snapshot['records_by_source'].items())))
+        if snapshot['records_per_page']:
+            st.markdown("**Records per page fetched:** " + ", ".join(
+                f"{source} {ratio:.2f} ({snapshot['pages_by_source'][source]} pages)"
+                for source, ratio in sorted(snapshot['records_per_page'].items())))
+        if snapshot['pages_failed']:
+            st.markdown("**Failed pages by reason:** " + ", ".join(
+                f"{reason} {count}" for reason, count in sorted(snapshot['pages_failed'].items())))
+        if snapshot['events']:
+            st.markdown("**Events:** " + ", ".join(
+                f"{event} {count}" for event, count in sorted(snapshot['events'].items())))
+        if snapshot['gauges']:
+            st.markdown("**Current limits:** " + ", ".join(
+                f"{name} {value}" for name, value in sorted(snapshot['gauges'].items())))
+        if snapshot['decisions']:
+            st.markdown("**Recent concurrency and circuit breaker decisions**")
+            decisions = pd.DataFrame(snapshot['decisions'][::-1])
+            decisions['at'] = pd.to_datetime(decisions['at'], unit='s').dt.strftime('%H:%M:%S')
+            st.dataframe(decisions, use_container_width=True, hide_index=True)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("📥 Metrics JSON", data=metrics.to_json(), file_name="extractor_metrics.json",
+                               mime="application/json")
+        with col2:
+            st.download_button("📥 Prometheus metrics", data=metrics.to_prometheus(), file_name="extractor.prom",
+                               mime="text/plain")
+        with col3:
+            if st.button("Reset metrics"):
+                metrics.reset()
+
+        profile = st.session_state.get('last_profile')
+        if profile:
+            st.markdown("**Profile of the last profiled run**")
+            st.download_button("📥 Download profile (.prof)", data=profile['prof'], file_name="extraction_run.prof",
+                               mime="application/octet-stream")
+            st.code(profile['summary'])
 
 
 def main():
@@ -392,17 +346,22 @@ def main():
     st.info(
         "🔍 This tool searches the web for actual employee information from company websites, LinkedIn profiles, and professional directories.")
 
-    # Initialize extractor
-    if 'extractor' not in st.session_state:
-        st.session_state.extractor = RealEmployeeDataExtractor()
+    extractor = session_extractor()
 
     # API Key input
     st.sidebar.header("Configuration")
 
+    job_server_url = st.sidebar.text_input(
+        "Job server URL", value=os.getenv('JOB_SERVER_URL', ''),
+        help="Send searches to a shared job server (python job_server.py) instead of running them in this "
+             "page; the server's own search and scraping settings apply"
+    ).strip()
+
     # Check if API key is loaded from .env
-    if st.session_state.extractor.serper_api_key:
+    env_api_key = os.getenv('SERPER_API_KEY')
+    if env_api_key:
         st.sidebar.success("✅ API Key loaded from .env file")
-        api_key = st.session_state.extractor.serper_api_key
+        api_key = env_api_key
     else:
         st.sidebar.warning("⚠️ No API key found in .env file")
         api_key = st.sidebar.text_input("Serper.dev API Key", type="password",
@@ -416,8 +375,126 @@ def main():
         help="Select how many real employee details you want to extract"
     )
 
+    # Serper rate limiting, per API key; the .env key's limit is the server's and can't be changed here
+    requests_per_second = st.sidebar.number_input(
+        "Serper requests per second", min_value=0.5, max_value=50.0, value=5.0, step=0.5,
+        disabled=bool(env_api_key), help="Sustained request rate allowed by your Serper.dev plan"
+    )
+    burst = st.sidebar.number_input(
+        "Serper burst size", min_value=1, max_value=50, value=5, disabled=bool(env_api_key),
+        help="How many queries may be sent back-to-back before the rate limit applies"
+    )
+    if api_key and not env_api_key:
+        extractor.set_rate_limiter(get_rate_limiter(api_key))
+        extractor.set_rate_limit(requests_per_second, burst)
+
+    plan_queries = st.sidebar.checkbox(
+        "Plan search queries", value=True,
+        help="Send the search templates that found the most contacts before first and stop once there are "
+             "enough results; untick to always send all of them"
+    )
+    extractor.set_query_planner(plan_queries)
+
+    # Serper response cache
+    use_search_cache = st.sidebar.checkbox(
+        "Use search cache", value=True,
+        help="Reuse stored Serper responses for identical queries"
+    )
+    refresh_search_cache = st.sidebar.checkbox(
+        "Refresh cached searches", value=False,
+        help="Ignore stored responses for this run and overwrite them with fresh results"
+    )
+    cache_ttl_hours = st.sidebar.number_input(
+        "Search cache TTL (hours)", min_value=1, max_value=24 * 90, value=24 * 7
+    )
+    extractor.set_search_cache(
+        use_search_cache, refresh_search_cache, ttl_seconds=cache_ttl_hours * 3600
+    )
+    cache_stats = extractor.search_cache.stats()
+    st.sidebar.caption(
+        f"Search cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+        f"({cache_stats['hit_rate']:.0%}), {cache_stats['entries']} stored"
+    )
+
+    # Website page cache
+    use_page_cache = st.sidebar.checkbox(
+        "Use page cache", value=True,
+        help="Revalidate previously scraped pages with ETag/Last-Modified instead of downloading them again"
+    )
+    extractor.set_page_cache(use_page_cache)
+    page_stats = extractor.page_cache.stats()
+    st.sidebar.caption(
+        f"Page cache: {page_stats['revalidated']} not modified, "
+        f"{page_stats['bytes_saved'] / 1024:.0f} KB saved, {page_stats['parses_avoided']} parses avoided"
+    )
+
+    # Contacts found in earlier runs
+    use_contact_store = st.sidebar.checkbox(
+        "Remember contacts across runs", value=True,
+        help="Store every contact found and mark each result as new or already known"
+    )
+    skip_known = st.sidebar.checkbox(
+        "Only show new contacts", value=False, disabled=not use_contact_store,
+        help="Leave out contacts found in earlier runs and skip pages whose contacts are all stored already"
+    )
+    extractor.set_contact_store(use_contact_store, skip_known)
+    store_stats = extractor.contact_store.stats()
+    st.sidebar.caption(f"Contact store: {store_stats['contacts']} contacts from {store_stats['pages']} pages")
+
+    # Scraping engine
+    engine_label = st.sidebar.selectbox(
+        "Scraping engine", options=["Thread pool", "Async"],
+        help="The async engine keeps many page fetches in flight with per-host connection limits"
+    )
+    max_pages = st.sidebar.number_input(
+        "Search results to scrape", min_value=5, max_value=1000, value=20, step=5,
+        help="Upper bound on how many search results are fetched and parsed"
+    )
+    parse_workers = st.sidebar.number_input(
+        "Parser processes", min_value=0, max_value=os.cpu_count() or 1, value=0,
+        help="Parse pages and extract contacts in this many worker processes (0 = parse on the download threads)"
+    )
+    extractor.set_scrape_engine(
+        'async' if engine_label == "Async" else 'threads', max_pages, parse_workers
+    )
+    adaptive = st.sidebar.checkbox(
+        "Adapt concurrency", value=True,
+        help="Raise or lower requests in flight from observed latency, timeouts and 429/5xx responses"
+    )
+    extractor.set_adaptive_concurrency(adaptive)
+    respect_robots = st.sidebar.checkbox(
+        "Respect robots.txt", value=True,
+        help="Skip pages a site's robots.txt disallows and wait its Crawl-delay between requests to it"
+    )
+    host_delay = st.sidebar.number_input(
+        "Seconds between requests to a site", min_value=0.0, max_value=10.0, value=0.5, step=0.1,
+        help="Pages of other sites are fetched in the meantime, so this rarely lengthens a run"
+    )
+    extractor.set_politeness(respect_robots, host_delay)
+
+    # Same-site crawl of team/about/contact pages
+    crawl_pages = st.sidebar.number_input(
+        "Extra pages per site", min_value=0, max_value=10, value=0,
+        help="Also fetch this many team/about/contact pages linked from each scraped site (0 = off)"
+    )
+    crawl_budget = st.sidebar.number_input(
+        "Crawl time budget (seconds)", min_value=1, max_value=300, value=20,
+        help="Stop fetching extra pages once this much time has been spent on them"
+    )
+    extractor.set_crawl(crawl_pages, time_budget=crawl_budget)
+    skip_near_duplicates = st.sidebar.checkbox(
+        "Skip near-duplicate pages", value=True,
+        help="Don't extract contacts again from pages whose text nearly matches a page already processed in the run"
+    )
+    extractor.set_near_duplicates(skip_near_duplicates)
+
+    profile_run = st.sidebar.checkbox(
+        "Profile the next run", value=False,
+        help="Capture a cProfile of the search and scraping threads; download it from the metrics panel"
+    )
+
     if api_key:
-        st.session_state.extractor.set_api_key(api_key)
+        extractor.set_api_key(api_key)
 
     # Main interface
     col1, col2 = st.columns(2)
@@ -442,106 +519,23 @@ def main():
 
     extract_button = st.button("🔍 Extract Real Employee Data", type="primary")
 
+    key = search_key(industry, job_role, city, country, num_results)
     if extract_button:
         if not all([industry, job_role, city, country]):
             st.error("Please fill in all fields")
+        elif job_server_url:
+            run_remote_job(JobClient(job_server_url), key)
         elif not api_key:
             st.error("Please provide Serper.dev API key in the sidebar")
         else:
-            with st.spinner("🔍 Searching for real companies and employees..."):
-                search_results = st.session_state.extractor.search_companies_and_employees(
-                    industry, job_role, city, country, num_results
-                )
-
-            if search_results:
-                st.success(f"Found {len(search_results)} search results to process")
-
-                with st.spinner("🌐 Extracting real employee data from websites..."):
-                    employees_data = st.session_state.extractor.extract_real_employees_data(
-                        search_results, industry, job_role, city, country, num_results
-                    )
-
-                if employees_data:
-                    # Create DataFrame
-                    df = pd.DataFrame(employees_data)
-
-                    # Reorder columns
-                    column_order = [
-                        'business_name', 'num_employees', 'contact_person', 'first_name',
-                        'corporate_email', 'other_emails', 'website', 'phone', 'phone_type',
-                        'street_address', 'zip_code', 'state', 'city'
-                    ]
-                    df = df[column_order]
-
-                    # Rename columns for display
-                    df.columns = [
-                        'Business Name', 'Number of Employees', 'Contact Person', 'First Name',
-                        'Corporate Email', 'Email', 'Website', 'Phone', 'Phone Type',
-                        'Street Address', 'Zip Code', 'State', 'City'
-                    ]
-
-                    # Display results
-                    st.subheader(f"📊 Extracted {len(employees_data)} Real Employee Details")
-                    st.success(
-                        f"✅ Found real employees working as {job_role} in {industry} companies in {city}, {country}")
-                    st.dataframe(df, use_container_width=True)
-
-                    # Download options
-                    col1, col2, col3 = st.columns(3)
-
-                    with col1:
-                        # Excel download
-                        buffer = BytesIO()
-                        with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
-                            df.to_excel(writer, index=False, sheet_name='Real_Employee_Data')
-                        buffer.seek(0)
-
-                        st.download_button(
-                            label="📥 Download as Excel",
-                            data=buffer,
-                            file_name=f"real_{job_role}_{industry}_{city}_{num_results}_employees.xlsx",
-                            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                        )
-
-                    with col2:
-                        # CSV download
-                        csv = df.to_csv(index=False)
-                        st.download_button(
-                            label="📥 Download as CSV",
-                            data=csv,
-                            file_name=f"real_{job_role}_{industry}_{city}_{num_results}_employees.csv",
-                            mime="text/csv"
-                        )
-
-                    with col3:
-                        # JSON download
-                        json_data = df.to_json(orient='records', indent=2)
-                        st.download_button(
-                            label="📥 Download as JSON",
-                            data=json_data,
-                            file_name=f"real_{job_role}_{industry}_{city}_{num_results}_employees.json",
-                            mime="application/json"
-                        )
-
-                    st.success(f"✅ Successfully extracted {len(employees_data)} real employee details!")
-
-                    # Show data sources
-                    with st.expander("📋 Data Sources Used"):
-                        st.markdown("""
-                        **Real data extracted from:**
-                        - Company websites and "About Us" pages
-                        - LinkedIn professional profiles
-                        - Company team directories
-                        - Professional networking sites
-                        - Business directories and listings
-                        - Corporate contact pages
-                        """)
-
-                else:
-                    st.warning(
-                        "⚠️ No real employee data could be extracted. Try different search parameters or check if companies in this industry/location have online presence.")
-            else:
-                st.error("❌ No search results found. Please try different search terms or check your API key.")
+            run_extraction(extractor, key, profile_run)
+
+    # Results are kept per search, so other widgets and downloads don't cost another search and scrape
+    run = st.session_state.get('runs', {}).get(key)
+    if run:
+        show_results(run)
+        show_export_panel(run)
+    show_metrics_panel(extractor)
 
     # Instructions
     with st.expander("ℹ️ How this Real Data Extraction Works"):
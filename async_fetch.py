@@ -0,0 +1,233 @@
+import asyncio
+import queue
+import threading
+import time
+from collections import namedtuple
+
+import aiohttp
+from multidict import CIMultiDict
+
+from concurrency import CircuitOpenError, outcome_of
+from politeness import MAX_ROBOTS_BYTES, ROBOTS_TIMEOUT, HostQueue, RobotsDisallowedError, robots_url
+
+FetchResult = namedtuple(
+    'FetchResult', ['url', 'status', 'headers', 'body', 'error', 'connect_seconds', 'download_seconds'],
+    defaults=(0.0, 0.0)
+)
+
+_DONE = object()
+
+
+class AsyncFetcher:
+    """asyncio/aiohttp page fetcher with a global in-flight limit and per-host caps
+
+    An AIMDController (`control`) lowers the in-flight limit below max_concurrency when latency or errors
+    call for it, and a HostCircuitBreaker (`breaker`) fails fetches from hosts that keep failing. With a
+    HostPacer (`pacer`), fetches start across hosts in turn as each host's pace allows rather than all at
+    once, and with a RobotsCache (`robots`) pages its robots.txt rules out are not fetched.
+    """
+
+    def __init__(self, max_concurrency=200, per_host_limit=4, timeout=10, headers=None, max_bytes=None,
+                 accept_content_type=None, control=None, breaker=None, pacer=None, robots=None):
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.max_bytes = max_bytes
+        self.accept_content_type = accept_content_type
+        self.control = control
+        self.breaker = breaker
+        self.pacer = pacer
+        self.robots = robots
+        self._released = None
+
+    async def _fetch(self, session, semaphore, url, headers):
+        async with semaphore:
+            timeout = None
+            if self.control is not None:
+                await self._acquire()
+                timeout = aiohttp.ClientTimeout(total=self.control.timeout(self.timeout))
+            started = time.perf_counter()
+            outcome = None
+            try:
+                # Checked once a slot is free, so failures that came in meanwhile are taken into account
+                if self.breaker is not None and not self.breaker.allow(url):
+                    return FetchResult(url, None, {}, b'', CircuitOpenError(f"Skipped {url}: host keeps failing"))
+                result = await self._get(session, url, headers, timeout)
+                outcome = outcome_of(result.error, result.status)
+                return result
+            finally:
+                # Skipped and cancelled fetches count as neither a success nor a failure
+                if self.control is not None:
+                    self.control.release(time.perf_counter() - started, outcome)
+                    self._released.set()
+                if self.breaker is not None and outcome is not None:
+                    self.breaker.record(url, outcome)
+
+    async def _allowed_fetch(self, session, semaphore, url, headers):
+        """_fetch, unless robots.txt rules the page out"""
+        if self.robots is not None:
+            rules = self.robots.cached(url) or await self._fetch_robots(session, url)
+            try:
+                rules.check(url)
+            except RobotsDisallowedError as e:
+                return FetchResult(url, None, {}, b'', e)
+        return await self._fetch(session, semaphore, url, headers)
+
+    async def _fetch_robots(self, session, url):
+        started = time.perf_counter()
+        status, body = None, b''
+        try:
+            async with session.get(robots_url(url), allow_redirects=True,
+                                   timeout=aiohttp.ClientTimeout(total=ROBOTS_TIMEOUT)) as response:
+                # Error pages are read too, so the connection is kept for the page fetch that follows
+                status = response.status
+                body = await response.content.read(MAX_ROBOTS_BYTES)
+        except Exception:
+            status = None
+        return self.robots.store(url, status, body, time.perf_counter() - started)
+
+    async def _acquire(self):
+        # Releases on this loop wake us straight away; the timeout covers slots freed by other threads
+        while not self.control.try_acquire():
+            self._released.clear()
+            try:
+                await asyncio.wait_for(self._released.wait(), 0.1)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _get(self, session, url, headers, timeout=None):
+        started = time.perf_counter()
+        try:
+            async with session.get(url, headers=headers, allow_redirects=True, timeout=timeout) as response:
+                connect_seconds = time.perf_counter() - started
+                response_headers = CIMultiDict(response.headers)
+                content_type = response_headers.get('Content-Type', '')
+
+                # Don't download bodies we're going to throw away
+                if response.status == 200 and self.accept_content_type and \
+                        not self.accept_content_type(content_type):
+                    error = ValueError(f"Skipped non-HTML content ({content_type})")
+                    return FetchResult(url, response.status, response_headers, b'', error, connect_seconds)
+
+                # Stream the body and stop at max_bytes
+                started = time.perf_counter()
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    body.extend(chunk)
+                    if self.max_bytes and len(body) >= self.max_bytes:
+                        del body[self.max_bytes:]
+                        break
+
+                return FetchResult(url, response.status, response_headers, bytes(body), None, connect_seconds,
+                                   time.perf_counter() - started)
+        except Exception as e:
+            return FetchResult(url, None, {}, b'', e)
+
+    async def _run(self, urls, headers_for, emit, stop):
+        # One connector for the whole job: keep-alive connections are reused across pages
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            limit_per_host=self.per_host_limit,
+            ttl_dns_cache=300
+        )
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._released = asyncio.Event()
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers) as session:
+            if self.pacer is not None:
+                await self._run_paced(session, semaphore, urls, headers_for, emit, stop)
+                return
+
+            tasks = [
+                asyncio.ensure_future(self._fetch(session, semaphore, url, headers_for(url) if headers_for else None))
+                for url in urls
+            ]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    emit(await next_done)
+                    if stop.is_set():
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_paced(self, session, semaphore, urls, headers_for, emit, stop):
+        """Start each fetch once the pacer gives its host a turn, going across hosts in turn"""
+        queue = HostQueue(self.pacer, urls, on_skip=lambda url, error: emit(FetchResult(url, None, {}, b'', error)))
+        pending = set()
+        try:
+            while queue or pending:
+                # No more than can be in flight, so each request goes out when its host's turn comes
+                slots = self.control.limit if self.control is not None else self.max_concurrency
+                while len(pending) < slots:
+                    url = queue.pop_ready()
+                    if url is None:
+                        break
+                    task = asyncio.ensure_future(
+                        self._allowed_fetch(session, semaphore, url, headers_for(url) if headers_for else None)
+                    )
+                    # A done callback also runs for tasks cancelled before they started
+                    task.add_done_callback(lambda _, url=url: self.pacer.finish(url))
+                    pending.add(task)
+
+                if not pending:
+                    # Nothing left when robots.txt ruled out the rest of the queue
+                    if queue:
+                        await asyncio.sleep(queue.wait_time())
+                    continue
+                done, pending = await asyncio.wait(
+                    pending, timeout=queue.wait_time() if len(pending) < slots else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    emit(task.result())
+                    if stop.is_set():
+                        return
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def iter_fetch(self, urls, headers_for=None):
+        """Yield FetchResults in completion order while the event loop runs in a background thread
+
+        Closing the generator early cancels every fetch that is still pending.
+        """
+        results = queue.Queue()
+        stop = threading.Event()
+        running = {}
+
+        async def main():
+            running['loop'] = asyncio.get_running_loop()
+            running['task'] = asyncio.current_task()
+            if not stop.is_set():
+                await self._run(urls, headers_for, results.put, stop)
+
+        def worker():
+            try:
+                asyncio.run(main())
+            except asyncio.CancelledError:
+                pass
+            finally:
+                results.put(_DONE)
+
+        thread = threading.Thread(target=worker, name='async-fetch', daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                item = results.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            # Consumer went away: cancel whatever is still in flight
+            stop.set()
+            if 'task' in running and thread.is_alive():
+                try:
+                    running['loop'].call_soon_threadsafe(running['task'].cancel)
+                except RuntimeError:
+                    pass  # loop already closed
@@ -0,0 +1,347 @@
+"""Headless batch runner: extract employee data for many search combinations without Streamlit
+
+    python batch.py jobs.csv --output results.ndjson --concurrency 4
+
+Jobs are read from a CSV (with a header row) or JSON-lines file with the fields industry, job_role,
+city, country and optionally num_results. Records are appended to the output as they are found,
+tagged with the job they came from. Finished jobs are recorded in a checkpoint file, so running the
+same command again after a crash skips them and only redoes the jobs that were in progress.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from records import RECORD_FIELDS
+
+JOB_FIELDS = ('industry', 'job_role', 'city', 'country', 'num_results')
+
+# Job fields copied onto each record (records already carry the city)
+JOB_TAGS = ('job_id', 'industry', 'job_role', 'country')
+
+OUTPUT_FIELDS = list(JOB_TAGS) + RECORD_FIELDS
+
+logger = logging.getLogger('batch')
+
+
+def read_jobs(path):
+    """Jobs from a CSV or JSON-lines file, each with a stable id"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith(('.jsonl', '.ndjson', '.json')):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+
+    jobs = []
+    for index, row in enumerate(rows):
+        try:
+            job = parse_job(row)
+        except ValueError as e:
+            raise ValueError(f"Job {index + 1} in {path}: {e}") from None
+        job['job_id'] = job_id(index, job)
+        jobs.append(job)
+    return jobs
+
+
+def parse_job(row):
+    """The JOB_FIELDS of one job as stripped strings and an int num_results (10 when not given)"""
+    if not isinstance(row, dict):
+        raise ValueError(f"a job must be an object with the fields {', '.join(JOB_FIELDS)}")
+    job = {field: str(row.get(field) or '').strip() for field in JOB_FIELDS}
+    missing = [field for field in JOB_FIELDS[:4] if not job[field]]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    try:
+        job['num_results'] = int(job['num_results'] or 10)
+    except ValueError:
+        raise ValueError(f"num_results is not a number: {job['num_results']!r}") from None
+    if job['num_results'] < 1:
+        raise ValueError("num_results must be at least 1")
+    return job
+
+
+def job_id(index, job):
+    """Id that stays the same between runs over the same jobs file"""
+    key = json.dumps([index] + [job[field] for field in JOB_FIELDS], sort_keys=True)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+class Checkpoint:
+    """Ids of finished jobs, rewritten atomically after every job"""
+
+    def __init__(self, path):
+        self.path = path
+        self.completed = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.completed = json.load(f).get('completed', {})
+
+    def is_done(self, job_id):
+        return job_id in self.completed
+
+    def mark_done(self, job_id, records):
+        with self._lock:
+            self.completed[job_id] = records
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'completed': self.completed}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+
+class RecordWriter:
+    """Append records to an NDJSON or CSV file as soon as they are extracted"""
+
+    def __init__(self, path):
+        self.path = path
+        self.format = 'csv' if path.endswith('.csv') else 'ndjson'
+        self.fields = OUTPUT_FIELDS
+        self._lock = threading.Lock()
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        if self.format == 'csv':
+            self._csv = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction='ignore')
+            if new_file:
+                self._csv.writeheader()
+                self._file.flush()
+
+    def write(self, job, record):
+        row = {field: job[field] for field in JOB_TAGS}
+        row.update(record)
+        with self._lock:
+            if self.format == 'csv':
+                self._csv.writerow(row)
+            else:
+                self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def compact_output(path, completed):
+    """Drop records of jobs that never finished, so rerunning them doesn't duplicate rows"""
+    if not os.path.exists(path):
+        return 0
+
+    tmp_path = path + '.tmp'
+    dropped = 0
+    with open(path, newline='', encoding='utf-8') as src, open(tmp_path, 'w', newline='', encoding='utf-8') as dst:
+        if path.endswith('.csv'):
+            reader = csv.DictReader(src)
+            writer = csv.DictWriter(dst, fieldnames=reader.fieldnames or [])
+            if reader.fieldnames:
+                writer.writeheader()
+            for row in reader:
+                if row.get('job_id') in completed:
+                    writer.writerow(row)
+                else:
+                    dropped += 1
+        else:
+            for line in src:
+                try:
+                    keep = json.loads(line).get('job_id') in completed
+                except ValueError:
+                    keep = False  # torn last line from a crash
+                if keep:
+                    dst.write(line)
+                else:
+                    dropped += 1
+    os.replace(tmp_path, path)
+    return dropped
+
+
+def run_job(extractor, job, writer, stop=None):
+    """Search, scrape and write one job's records; returns how many were written
+
+    Once `stop` is set the job ends before writing its next record.
+    """
+    search_results = extractor.search_companies_and_employees(
+        job['industry'], job['job_role'], job['city'], job['country'], job['num_results']
+    )
+
+    written = 0
+    records = extractor.iter_real_employees_data(
+        search_results, job['industry'], job['job_role'], job['city'], job['country'], job['num_results']
+    )
+    try:
+        for record in records:
+            if stop is not None and stop.is_set():
+                break
+            writer.write(job, record)
+            written += 1
+    finally:
+        records.close()
+    return written
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run employee data extraction jobs without the Streamlit UI")
+    parser.add_argument('jobs', help="CSV or JSON-lines file of industry, job_role, city, country[, num_results]")
+    parser.add_argument('--output', '-o', default='results.ndjson', help="NDJSON or .csv file to append records to")
+    parser.add_argument('--checkpoint', help="Finished-job file used to resume (default: <output>.checkpoint.json)")
+    parser.add_argument('--concurrency', '-c', type=int, default=4, help="Jobs to run at the same time")
+    parser.add_argument('--api-key', help="Serper.dev API key (default: SERPER_API_KEY)")
+    parser.add_argument('--rate', type=float, default=5.0, help="Serper requests per second")
+    parser.add_argument('--burst', type=int, default=5, help="Serper burst size")
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads', help="Scraping engine")
+    parser.add_argument('--max-pages', type=int, default=20, help="Search results to scrape per job")
+    parser.add_argument('--fixed-concurrency', action='store_true',
+                        help="Keep worker counts fixed instead of adapting them to latency and errors")
+    parser.add_argument('--all-queries', action='store_true',
+                        help="Send every search template instead of stopping once there are enough results")
+    parser.add_argument('--ignore-robots', action='store_true',
+                        help="Fetch pages robots.txt disallows and ignore Crawl-delay (see the site's terms first)")
+    parser.add_argument('--host-delay', type=float, default=0.5,
+                        help="Seconds between requests to the same site, when robots.txt doesn't ask for more")
+    parser.add_argument('--parse-workers', type=int, default=0, help="Parser processes (0 = parse on fetch threads)")
+    parser.add_argument('--crawl-pages', type=int, default=0,
+                        help="Extra team/about/contact pages to fetch per site (0 = no crawl)")
+    parser.add_argument('--crawl-budget', type=float, default=20.0, help="Seconds per job spent on crawled pages")
+    parser.add_argument('--keep-near-duplicates', action='store_true',
+                        help="Extract every page, even ones nearly identical to a page already processed in the job")
+    parser.add_argument('--skip-known', action='store_true',
+                        help="Leave out contacts already in the contact store and skip pages fully stored before")
+    parser.add_argument('--no-contact-store', action='store_true', help="Don't record or look up contacts")
+    parser.add_argument('--no-search-cache', action='store_true', help="Don't read or write the Serper cache")
+    parser.add_argument('--no-page-cache', action='store_true', help="Don't revalidate against the page cache")
+    parser.add_argument('--export', action='append', default=[], metavar='FILE',
+                        help="After the run, also write every record to FILE (.xlsx, .csv, .json, .ndjson or "
+                             ".parquet); may be repeated")
+    parser.add_argument('--metrics-json', help="Write per-stage timings and counters as JSON to this file")
+    parser.add_argument('--metrics-prom', help="Write the same metrics in Prometheus text format to this file")
+    parser.add_argument('--profile', help="cProfile the whole run and save the .prof file here")
+    parser.add_argument('--verbose', '-v', action='store_true', help="Log every query and scraping warning")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.ERROR,
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+    logger.setLevel(logging.INFO)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    # Imported here so --help doesn't pay for requests/lxml
+    from extractor import RealEmployeeDataExtractor
+
+    from exports import format_for_path
+    try:
+        for path in args.export:
+            format_for_path(path)
+    except ValueError as e:
+        logger.error("%s", e)
+        return 2
+
+    jobs = read_jobs(args.jobs)
+    checkpoint = Checkpoint(args.checkpoint or args.output + '.checkpoint.json')
+
+    dropped = compact_output(args.output, checkpoint.completed)
+    if dropped:
+        logger.info("Removed %d records of unfinished jobs from %s", dropped, args.output)
+
+    pending = [job for job in jobs if not checkpoint.is_done(job['job_id'])]
+    logger.info("%d jobs, %d already done, %d to run", len(jobs), len(jobs) - len(pending), len(pending))
+    if not pending:
+        return write_exports(args.output, args.export)
+
+    # One extractor for every job: the rate limiter, caches and connection pool are shared
+    extractor = RealEmployeeDataExtractor(
+        requests_per_second=args.rate, burst=args.burst, scrape_engine=args.engine,
+        max_pages=args.max_pages, parse_workers=args.parse_workers, crawl_pages_per_domain=args.crawl_pages,
+        crawl_time_budget=args.crawl_budget, adaptive_concurrency=not args.fixed_concurrency,
+        plan_queries=not args.all_queries, skip_near_duplicates=not args.keep_near_duplicates,
+        respect_robots=not args.ignore_robots, host_delay=args.host_delay
+    )
+    if args.api_key:
+        extractor.set_api_key(args.api_key)
+    if not extractor.serper_api_key:
+        logger.error("No Serper.dev API key: set SERPER_API_KEY or pass --api-key")
+        return 2
+    extractor.set_search_cache(not args.no_search_cache)
+    extractor.set_page_cache(not args.no_page_cache)
+    extractor.set_contact_store(not args.no_contact_store, args.skip_known)
+
+    profiler = None
+    if args.profile:
+        from metrics import RunProfiler
+        profiler = RunProfiler()
+        extractor.set_profiler(profiler)
+        profiler.start()
+
+    writer = RecordWriter(args.output)
+    executor = ThreadPoolExecutor(max_workers=max(1, args.concurrency))
+    stop = threading.Event()
+    failed = 0
+    started = time.monotonic()
+
+    try:
+        run = profiler.wrap(run_job) if profiler else run_job
+        future_to_job = {executor.submit(run, extractor, job, writer, stop): job for job in pending}
+
+        for done, future in enumerate(as_completed(future_to_job), 1):
+            job = future_to_job[future]
+            try:
+                written = future.result()
+            except Exception as e:
+                failed += 1
+                logger.error("Job %s failed: %s", job['job_id'], e)
+                continue
+
+            checkpoint.mark_done(job['job_id'], written)
+            extractor.metrics.write(args.metrics_json, args.metrics_prom)
+            logger.info(
+                "[%d/%d] %s: %s / %s / %s, %s -> %d records (%.0fs)", done, len(pending), job['job_id'],
+                job['job_role'], job['industry'], job['city'], job['country'], written, time.monotonic() - started
+            )
+    except KeyboardInterrupt:
+        logger.info("Interrupted; stopping running jobs, rerun the same command to resume")
+        return 130
+    finally:
+        # Running jobs end at their next record before the output and the parser processes are closed
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        writer.close()
+        extractor.shutdown_workers()
+        extractor.metrics.write(args.metrics_json, args.metrics_prom)
+        if profiler:
+            profiler.stop()
+            with open(args.profile, 'wb') as f:
+                f.write(profiler.dump())
+
+    if failed:
+        return 1
+    return write_exports(args.output, args.export)
+
+
+def write_exports(output, export_paths):
+    """Convert the output file to each requested format, one record at a time"""
+    from exports import export_file
+
+    for path in export_paths:
+        try:
+            rows = export_file(output, path, OUTPUT_FIELDS)
+        except (ValueError, RuntimeError) as e:
+            logger.error("Export to %s failed: %s", path, e)
+            return 1
+        logger.info("Exported %d records to %s", rows, path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
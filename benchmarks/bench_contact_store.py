@@ -0,0 +1,106 @@
+"""Time contact store lookups and upserts as the number of stored contacts grows.
+
+    python benchmarks/bench_contact_store.py [--rows 1000000] [--probes 20000] [--json out.json]
+
+Rows are bulk-loaded straight into the contacts table, then a mix of known and unknown records is
+looked up and upserted through ContactStore at every size checkpoint.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contact_store import ContactStore, contact_keys  # noqa: E402
+
+FIRST = ['Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Meera', 'John', 'Sarah', 'David', 'Emily']
+LAST = ['Sharma', 'Patel', 'Iyer', 'Gupta', 'Reddy', 'Smith', 'Johnson', 'Brown', 'Taylor', 'Wilson']
+SUFFIXES = ['', ' Pvt Ltd', ' Inc.', ' LLC', ' Limited']
+
+
+def make_record(i):
+    return {
+        'contact_person': f"{FIRST[i % 10]} {LAST[(i // 10) % 10]} {i}",
+        'business_name': f"Company {i // 7}{SUFFIXES[i % len(SUFFIXES)]}",
+        'website': f"https://www.company{i // 7}.example/",
+    }
+
+
+def load(store, start, stop):
+    now = time.time()
+    rows = []
+    for i in range(start, stop):
+        record = make_record(i)
+        rows.append(contact_keys(record) + (record['contact_person'], record['business_name'], now, now))
+    store._conn.executemany(
+        'INSERT INTO contacts (person_key, company_key, domain, contact_person, business_name,'
+        ' first_seen, last_seen, times_seen) VALUES (?, ?, ?, ?, ?, ?, ?, 1)',
+        rows
+    )
+    store._conn.commit()
+
+
+def measure(store, size, probes):
+    rng = random.Random(size)
+    # Half known (with the legal form changed, so only the normalized key matches), half new
+    records = []
+    for n in range(probes):
+        if n % 2:
+            record = make_record(rng.randrange(size))
+            record['business_name'] = record['business_name'].split(' Pvt')[0].split(' Inc')[0] + ' Ltd'
+        else:
+            record = make_record(size + 10_000_000 + n)
+        records.append(record)
+
+    start = time.perf_counter()
+    known = sum(store.is_known(record) for record in records)
+    lookup = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(records), 100):
+        store.upsert_many(records[i:i + 100])
+    upsert = time.perf_counter() - start
+
+    return {
+        'rows': size,
+        'probes': probes,
+        'known': known,
+        'lookup_us': round(lookup / probes * 1e6, 2),
+        'upsert_us': round(upsert / probes * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--probes', type=int, default=20_000)
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    sizes = sorted({size for size in (10_000, 100_000, args.rows) if size <= args.rows})
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ContactStore(os.path.join(tmp, 'contacts.sqlite3'))
+        loaded = 0
+        for size in sizes:
+            load(store, loaded, size)
+            loaded = size
+            result = measure(store, size, args.probes)
+            # measure() adds the new half of its probes; keep them out of the next checkpoint
+            store._conn.execute('DELETE FROM contacts WHERE id > ?', (size,))
+            store._conn.commit()
+            results.append(result)
+            print(f"{size:>10,} rows: lookup {result['lookup_us']:>7.1f} us, upsert {result['upsert_us']:>7.1f} us"
+                  f" ({result['known']}/{args.probes} known)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""Compare the BeautifulSoup and lxml HTML-to-text backends on synthetic company pages.
+
+Each backend runs in its own subprocess so peak RSS figures don't bleed into each other:
+
+    python benchmarks/bench_html_parsing.py [--repeat N] [--json out.json]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_text import lxml_html_to_text, soup_html_to_text  # noqa: E402
+
+BACKENDS = {
+    'html.parser': soup_html_to_text,
+    'lxml': lambda content: lxml_html_to_text(content),
+}
+
+FIRST = ['Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Meera', 'John', 'Sarah', 'David', 'Emily']
+LAST = ['Sharma', 'Patel', 'Iyer', 'Gupta', 'Reddy', 'Smith', 'Johnson', 'Brown', 'Taylor', 'Wilson']
+ROLES = ['CTO', 'CEO', 'CFO', 'VP Engineering', 'Director', 'Marketing Manager']
+
+
+def make_page(members, seed=0):
+    """A team page with nav, inline scripts/styles and `members` profile cards"""
+    rng = random.Random(seed)
+    parts = [
+        '<!DOCTYPE html><html><head><title>Acme Technologies | Leadership Team</title>',
+        '<style>' + '.card{margin:0;padding:4px}' * 50 + '</style>',
+        '<script>' + 'window.dataLayer=window.dataLayer||[];' * 100 + '</script>',
+        '</head><body><nav>' + ''.join(f'<a href="/p{i}">Link {i}</a>' for i in range(40)) + '</nav>',
+    ]
+    for i in range(members):
+        first, last, role = rng.choice(FIRST), rng.choice(LAST), rng.choice(ROLES)
+        parts.append(
+            f'<div class="card"><h3>{first} {last}</h3><p>{role}</p>'
+            f'<p>Email: {first.lower()}.{last.lower()}@acme.example</p>'
+            f'<p>Phone: +91 98{rng.randint(10000000, 99999999)}</p>'
+            f'<!-- card {i} --><script>track({i})</script></div>\n'
+        )
+    parts.append('<footer>Address: 12 MG Road, Bengaluru, India. Team of 250 employees.</footer></body></html>')
+    return ''.join(parts).encode('utf-8')
+
+
+CORPUS = {
+    'small': 20,
+    'medium': 400,
+    'large': 8000,
+}
+
+
+def run_child(backend, repeat):
+    parse = BACKENDS[backend]
+    pages = {name: make_page(members, seed=members) for name, members in CORPUS.items()}
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    report = {'backend': backend, 'pages': {}}
+    for name, content in pages.items():
+        parse(content)  # warm up
+
+        tracemalloc.start()
+        cpu_start = time.process_time()
+        for _ in range(repeat):
+            parse(content)
+        cpu = (time.process_time() - cpu_start) / repeat
+        _, python_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        report['pages'][name] = {
+            'bytes': len(content),
+            'cpu_ms_per_page': round(cpu * 1000, 3),
+            'python_heap_peak_kb': round(python_peak / 1024, 1),
+        }
+
+    report['max_rss_growth_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--child', choices=sorted(BACKENDS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.repeat)))
+        return
+
+    reports = []
+    for backend in BACKENDS:
+        output = subprocess.check_output(
+            [sys.executable, os.path.abspath(__file__), '--child', backend, '--repeat', str(args.repeat)]
+        )
+        reports.append(json.loads(output))
+
+    baseline, fast = reports
+    print(f"{'page':<8}{'bytes':>10}{'html.parser ms':>16}{'lxml ms':>10}{'speedup':>9}"
+          f"{'soup heap KB':>14}{'lxml heap KB':>14}")
+    for name in CORPUS:
+        slow_page, fast_page = baseline['pages'][name], fast['pages'][name]
+        speedup = slow_page['cpu_ms_per_page'] / max(fast_page['cpu_ms_per_page'], 1e-9)
+        print(f"{name:<8}{slow_page['bytes']:>10}{slow_page['cpu_ms_per_page']:>16.2f}"
+              f"{fast_page['cpu_ms_per_page']:>10.2f}{speedup:>8.1f}x"
+              f"{slow_page['python_heap_peak_kb']:>14.0f}{fast_page['python_heap_peak_kb']:>14.0f}")
+    print(f"max RSS growth: html.parser {baseline['max_rss_growth_kb']} KB, lxml {fast['max_rss_growth_kb']} KB")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Measure how near_duplicates tells copies of a page from different pages, and what it costs.
+
+Synthetic company pages share a site template (navigation, footer) but have their own body text. Each
+is copied with a share of its words replaced, as on mirrors and syndicated copies:
+
+    python benchmarks/bench_near_duplicates.py [--pages 300] [--seed 0] [--json out.json]
+
+A copy counts as detected when its fingerprint is within MAX_DISTANCE bits of the original's; a false
+match is a pair of different pages of the same template that are that close.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extraction import get_extraction_engine  # noqa: E402
+from near_duplicates import MAX_DISTANCE, NearDuplicateIndex, fingerprint, is_near  # noqa: E402
+
+EDIT_SHARES = [0.0, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2]
+
+TEMPLATE = ("Home About Us Services Industries Careers Blog Contact {body} Subscribe to our newsletter for "
+            "updates. Copyright 2024 All rights reserved. Privacy Policy Terms of Use Cookie Settings Sitemap")
+
+VOCABULARY = ("software cloud platform clients delivery team engineering quality growth partners consulting "
+              "data analytics security support customers projects solutions markets design research office "
+              "mobile services digital strategy operations finance people culture mission value build").split()
+
+FIRST = ['John', 'Mary', 'Alan', 'Grace', 'Ravi', 'Priya', 'Sarah', 'David', 'Anita', 'Tom']
+LAST = ['Smith', 'Jones', 'Turing', 'Hopper', 'Kumar', 'Sharma', 'Brown', 'Miller', 'Patel', 'Clark']
+ROLES = ['CTO', 'CEO', 'CFO', 'Director', 'Head of Sales']
+
+
+def make_page(rng, words=400):
+    body = [rng.choice(VOCABULARY) for _ in range(words)]
+    for _ in range(4):
+        at = rng.randrange(len(body))
+        body[at:at] = f"{rng.choice(FIRST)} {rng.choice(LAST)} - {rng.choice(ROLES)}.".split()
+    return TEMPLATE.format(body=' '.join(body))
+
+
+def edit(rng, text, share):
+    words = text.split()
+    for at in rng.sample(range(len(words)), round(len(words) * share)):
+        words[at] = rng.choice(VOCABULARY) + 'x'
+    return ' '.join(words)
+
+
+def timed(fn, pages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in pages:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best / len(pages) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [make_page(rng) for _ in range(args.pages)]
+    originals = [fingerprint(text) for text in pages]
+
+    detection = {}
+    for share in EDIT_SHARES:
+        distances = [(fingerprint(edit(rng, text, share)) ^ original).bit_count()
+                     for text, original in zip(pages, originals)]
+        detection[share] = {
+            'detected': sum(distance <= MAX_DISTANCE for distance in distances) / len(distances),
+            'mean_distance': sum(distances) / len(distances),
+        }
+
+    pairs = [(a, b) for i, a in enumerate(originals) for b in originals[i + 1:]]
+    false_matches = sum(is_near(a, b) for a, b in pairs)
+
+    index = NearDuplicateIndex()
+    started = time.perf_counter()
+    for i, value in enumerate(originals):
+        index.check_and_add(value, str(i))
+    lookup_us = (time.perf_counter() - started) / len(originals) * 1e6
+
+    engine = get_extraction_engine('CTO')
+    cost = {
+        'fingerprint_ms': timed(fingerprint, pages, args.repeat),
+        'extract_ms': timed(lambda text: engine.extract(text, '', company_facts=True), pages, args.repeat),
+        'index_lookup_us': lookup_us,
+    }
+
+    print(f"{len(pages)} pages of {sum(len(text) for text in pages) / len(pages) / 1000:.1f} KB, "
+          f"match within {MAX_DISTANCE} of 64 bits")
+    for share, result in detection.items():
+        print(f"{share:6.1%} of words changed  detected {result['detected']:6.1%}  "
+              f"mean distance {result['mean_distance']:5.1f}")
+    print(f"different pages, same template: {false_matches} false matches in {len(pairs)} pairs")
+    print(f"fingerprint {cost['fingerprint_ms']:.2f} ms/page, extraction {cost['extract_ms']:.2f} ms/page, "
+          f"index lookup {cost['index_lookup_us']:.1f} us")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'detection': detection, 'false_matches': false_matches, 'pairs': len(pairs),
+                       'cost': cost}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""Compare the old India-only phone regexes with phones.find_phones on pages with known numbers.
+
+Each synthetic page plants valid numbers of one region, written the ways company sites write them,
+among digit runs that are not phone numbers (order ids, ISBNs, timestamps, PIN codes, dates):
+
+    python benchmarks/bench_phone_extraction.py [--pages 300] [--seed 0] [--json out.json]
+
+Precision is the share of returned numbers that were planted, recall the share of planted numbers
+returned; a regex hit counts as correct when its digits end with a planted number's national number.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+import phonenumbers
+from phonenumbers import PhoneNumberFormat
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import phones  # noqa: E402
+
+# extract_phone_numbers before phones.py
+LEGACY_PATTERNS = [
+    re.compile(r'\+91[-\s]?\d{10}'),
+    re.compile(r'\+91[-\s]?\d{5}[-\s]?\d{5}'),
+    re.compile(r'\+91[-\s]?\d{4}[-\s]?\d{3}[-\s]?\d{3}'),
+    re.compile(r'\b\d{10}\b'),
+    re.compile(r'\b\d{5}[-\s]?\d{5}\b'),
+    re.compile(r'\b\d{4}[-\s]?\d{3}[-\s]?\d{3}\b'),
+]
+
+REGIONS = {'IN': 'India', 'US': 'USA', 'GB': 'UK'}
+
+FILLER = ("Our team builds software for clients across the region. Read our latest case studies, "
+          "browse open roles or get in touch with the office nearest to you. ")
+
+
+def legacy_phones(text):
+    found = []
+    for pattern in LEGACY_PATTERNS:
+        found.extend(pattern.findall(text))
+    return list(set(found))
+
+
+def random_number(rng, region):
+    """A valid number of `region`, built from the region's example numbers with random digits"""
+    kind = rng.choice([phonenumbers.PhoneNumberType.MOBILE, phonenumbers.PhoneNumberType.FIXED_LINE])
+    example = phonenumbers.example_number_for_type(region, kind)
+    national = str(example.national_number)
+    while True:
+        keep = max(2, len(national) // 3)
+        digits = national[:keep] + ''.join(rng.choice('0123456789') for _ in range(len(national) - keep))
+        number = phonenumbers.parse('+' + str(example.country_code) + digits)
+        if phonenumbers.is_valid_number(number):
+            return number
+
+
+def written_forms(number, region):
+    international = phonenumbers.format_number(number, PhoneNumberFormat.INTERNATIONAL)
+    national = phonenumbers.format_number(number, PhoneNumberFormat.NATIONAL)
+    e164 = phonenumbers.format_number(number, PhoneNumberFormat.E164)
+    forms = [international, national, e164, international.replace(' ', '-'), national.replace(' ', '')]
+    if region == 'US':
+        digits = str(number.national_number)
+        forms.append(f"{digits[:3]}.{digits[3:6]}.{digits[6:]}")
+    return forms
+
+
+def distractors(rng):
+    return [
+        f"Order #{rng.randint(10 ** 9, 10 ** 10 - 1)}",
+        f"ISBN 978{rng.randint(10 ** 9, 10 ** 10 - 1)}",
+        f"Updated {rng.randint(1600000000, 1800000000)}",
+        f"PIN {rng.randint(110001, 855999)}",
+        f"{rng.randint(2000, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        f"Since {rng.randint(1950, 2015)} - {rng.randint(2016, 2024)}",
+        f"Invoice {rng.randint(10000, 99999)} {rng.randint(10000, 99999)}",
+        f"CIN U{rng.randint(10000, 99999)}KA{rng.randint(1990, 2020)}PTC{rng.randint(100000, 999999)}",
+    ]
+
+
+def make_corpus(pages, seed):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(pages):
+        region = list(REGIONS)[i % len(REGIONS)]
+        planted = [random_number(rng, region) for _ in range(rng.randint(1, 5))]
+        parts = [FILLER * rng.randint(1, 20)]
+        for number in planted:
+            parts.append(f"{rng.choice(['Phone', 'Tel', 'Call us', 'Mobile', 'Office'])}: "
+                         f"{rng.choice(written_forms(number, region))}. {FILLER}")
+        parts += rng.sample(distractors(rng), rng.randint(2, 6))
+        rng.shuffle(parts)
+        expected = {phonenumbers.format_number(number, PhoneNumberFormat.E164) for number in planted}
+        corpus.append((region, ' '.join(parts), expected, {str(number.national_number) for number in planted}))
+    return corpus
+
+
+def score(found, correct, planted):
+    return {
+        'found': found,
+        'correct': correct,
+        'planted': planted,
+        'precision': round(correct / found, 4) if found else 0.0,
+        'recall': round(correct / planted, 4) if planted else 0.0,
+    }
+
+
+def evaluate(corpus):
+    results = {}
+    for region in REGIONS:
+        pages = [page for page in corpus if page[0] == region]
+        planted = sum(len(expected) for _, _, expected, _ in pages)
+
+        found = correct = recalled = 0
+        for _, text, _, nationals in pages:
+            hits = set()
+            for raw in legacy_phones(text):
+                digits = re.sub(r'\D', '', raw)
+                matched = [national for national in nationals if digits.endswith(national)]
+                found += 1
+                correct += bool(matched)
+                hits.update(matched)
+            recalled += len(hits)
+        legacy = score(found, correct, planted)
+        # The overlapping patterns can return one number several times; recall counts it once
+        legacy['recall'] = round(recalled / planted, 4) if planted else 0.0
+
+        found = correct = 0
+        for _, text, expected, _ in pages:
+            numbers = {phone.number for phone in phones.find_phones(text, phones.region_for_country(REGIONS[region]))}
+            found += len(numbers)
+            correct += len(numbers & expected)
+        results[region] = {'regex': legacy, 'phonenumbers': score(found, correct, planted)}
+    return results
+
+
+def timed(fn, corpus, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for region, text, _, _ in corpus:
+            fn(text, region)
+    elapsed = (time.perf_counter() - start) / repeat
+    size = sum(len(text) for _, text, _, _ in corpus)
+    return {'pages_per_s': round(len(corpus) / elapsed, 1), 'mb_per_s': round(size / elapsed / 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.pages, args.seed)
+    accuracy = evaluate(corpus)
+
+    def matcher(text, region):
+        return phones.find_phones(text, region)
+
+    phones._match_window.cache_clear()
+    phones._line_type.cache_clear()
+    cold = timed(matcher, corpus, 1)
+    speed = {
+        'regex': timed(lambda text, region: legacy_phones(text), corpus, args.repeat),
+        'phonenumbers_cold': cold,
+        'phonenumbers_memoized': timed(matcher, corpus, args.repeat),
+    }
+
+    print(f"{len(corpus)} pages, {sum(len(text) for _, text, _, _ in corpus) / 1e6:.1f} MB of text")
+    for region, methods in accuracy.items():
+        for method, result in methods.items():
+            print(f"{region} {method:<13} precision {result['precision']:6.1%}  recall {result['recall']:6.1%}  "
+                  f"({result['correct']}/{result['found']} found correct, {result['planted']} planted)")
+    for method, result in speed.items():
+        print(f"{method:<22} {result['pages_per_s']:>9.1f} pages/s {result['mb_per_s']:>7.2f} MB/s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'accuracy': accuracy, 'speed': speed}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""Fetch many pages from one host and a few from many others, with and without the politeness scheduler.
+
+A local server answers for each site on its own loopback address (127.0.0.2, 127.0.0.3, ...) and
+throttles like a real one: a request that comes sooner after the previous one to the same host than the
+host allows gets a 429. The busy host asks for a Crawl-delay in its robots.txt; the others allow a
+request every THROTTLE_INTERVAL seconds:
+
+    python benchmarks/bench_politeness.py [--busy-pages 12] [--hosts 40] [--json out.json]
+
+`polite` is the default (robots.txt and a host_delay of 0.5 s); `impolite` ignores robots.txt and keeps
+no delay between requests to a host.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import RealEmployeeDataExtractor  # noqa: E402
+from offline_server import loopback_address  # noqa: E402
+
+THROTTLE_INTERVAL = 0.4
+BUSY_CRAWL_DELAY = 1
+PAGE_LATENCY = 0.2
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        host = self.headers.get('Host', '').split(':')[0]
+        busy = host == self.server.busy_host
+        if self.path == '/robots.txt':
+            body = f"User-agent: *\nCrawl-delay: {BUSY_CRAWL_DELAY}\n" if busy else "User-agent: *\nDisallow:\n"
+            return self._send(200, 'text/plain', body)
+
+        now = time.monotonic()
+        with self.server.lock:
+            last = self.server.last_request.get(host)
+            self.server.last_request[host] = now
+            self.server.requests[host] = self.server.requests.get(host, 0) + 1
+            throttled = last is not None and now - last < (BUSY_CRAWL_DELAY if busy else THROTTLE_INTERVAL)
+            if throttled:
+                self.server.throttled += 1
+        if throttled:
+            return self._send(429, 'text/plain', "Too Many Requests")
+
+        time.sleep(PAGE_LATENCY)
+        self._send(200, 'text/html', f"<html><title>Company {host}</title><body>John Smith - CTO. Mary Jones, "
+                                     f"CEO. Page {self.path}</body></html>")
+
+    def _send(self, status, content_type, body):
+        body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ThrottlingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self):
+        super().__init__(('0.0.0.0', 0), ThrottlingHandler)
+        self.busy_host = loopback_address(0)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.last_request = {}
+        self.requests = {}
+        self.throttled = 0
+
+    def verify_request(self, request, client_address):
+        return client_address[0].startswith('127.')
+
+
+def search_results(port, busy_pages, hosts):
+    """`busy_pages` pages of the busy site first, as search results often come, then two of every other site"""
+    results = [f'http://{loopback_address(0)}:{port}/team/{i}' for i in range(busy_pages)]
+    for index in range(1, hosts):
+        results += [f'http://{loopback_address(index)}:{port}/{path}' for path in ('team', 'about')]
+    return [{'link': link, 'title': 'Company', 'snippet': ''} for link in results]
+
+
+def run(server, results, engine, polite):
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ['CONTACT_STORE_PATH'] = os.path.join(workdir, 'contacts.sqlite3')
+        extractor = RealEmployeeDataExtractor(max_pages=len(results), reporter=lambda level, message: None)
+        extractor.set_page_cache(False)
+        extractor.set_near_duplicates(False)
+        if not polite:
+            extractor.set_politeness(respect_robots=False, host_delay=0)
+
+        server.reset()
+        started = time.perf_counter()
+        extractor.extract_real_employees_data(results, 'Software', 'CTO', 'Pune', 'India', 10 ** 6, engine)
+        seconds = time.perf_counter() - started
+        snapshot = extractor.metrics.snapshot()
+
+    return {
+        'seconds': round(seconds, 2),
+        'pages_fetched': len(results) - sum(snapshot['pages_failed'].values()),
+        'pages_failed': snapshot['pages_failed'],
+        'throttled': server.throttled,
+        'busy_host_requests': server.requests.get(server.busy_host, 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--busy-pages', type=int, default=12)
+    parser.add_argument('--hosts', type=int, default=40)
+    parser.add_argument('--engines', nargs='+', default=['threads', 'async'])
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    server = ThrottlingServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    results = search_results(server.server_address[1], args.busy_pages, args.hosts)
+
+    report = {}
+    try:
+        for engine in args.engines:
+            for polite in (False, True):
+                name = f"{engine}:{'polite' if polite else 'impolite'}"
+                report[name] = result = run(server, results, engine, polite)
+                print(f"{name:<18} {result['seconds']:6.2f}s  {result['pages_fetched']:3d} of {len(results)} pages  "
+                      f"{result['throttled']:3d} throttled  failed {result['pages_failed']}")
+    finally:
+        server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'busy_pages': args.busy_pages, 'hosts': args.hosts, 'results': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Memory per contact record as dicts, EmployeeRecords and a RecordBuffer, and the cost of making a table.
+
+Records are built the way build_page_records builds them: up to three people per company, company
+facts and placeholders written per record, one city per job:
+
+    python benchmarks/bench_record_memory.py [--records 200000] [--json out.json]
+
+Memory is what tracemalloc sees allocated for the records and their values, divided by their number.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import COLUMN_ORDER, RECORD_FIELDS, EmployeeRecord, RecordBuffer  # noqa: E402
+
+FIRST = ['John', 'Mary', 'Alan', 'Grace', 'Ravi', 'Priya', 'Sarah', 'David', 'Anita', 'Tom', 'Vikram', 'Meera']
+LAST = ['Smith', 'Jones', 'Turing', 'Hopper', 'Kumar', 'Sharma', 'Brown', 'Miller', 'Patel', 'Clark', 'Rao']
+CITIES = [('Pune', 'India'), ('London', 'UK'), ('Austin', 'USA')]
+
+
+def record_fields(count, seed=0):
+    """Keyword arguments of `count` records, sharing strings where the extractor shares them
+
+    Company facts are one object per company and placeholders are constants, while names, emails and the
+    f-string fields (website, other_emails, street_address) are new strings in every record.
+    """
+    rng = random.Random(seed)
+    company = 0
+    while count > 0:
+        company += 1
+        city, country = CITIES[company % len(CITIES)]
+        domain = f"company{company}.example"
+        name = f"Company {company} Pvt Ltd"
+        phone = f"+91{rng.randrange(10 ** 9, 10 ** 10)}"
+        for _ in range(min(count, rng.randint(1, 3))):
+            first, last = rng.choice(FIRST), rng.choice(LAST)
+            person = f"{first} {last}"
+            yield dict(
+                business_name=name,
+                num_employees='Unknown',
+                contact_person=person,
+                first_name=person.split()[0],
+                corporate_email=f"{first.lower()}.{last.lower()}@{domain}",
+                other_emails=f"info@{domain}",
+                website=f"www.{domain}",
+                phone=phone,
+                phone_type='Mobile',
+                street_address=f"{city}, {country}",
+                zip_code='Unknown',
+                state='Unknown',
+                city=city,
+                contact_status='new',
+            )
+            count -= 1
+
+
+def measure(build, count):
+    """(bytes per record, seconds per record) to build and hold `count` records, and the records"""
+    gc.collect()
+    started = time.perf_counter()
+    build(record_fields(count))
+    seconds = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    held = build(record_fields(count))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / count, seconds / count, held
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    layouts = {
+        'dicts': lambda fields: list(fields),
+        'records': lambda fields: [EmployeeRecord(**values) for values in fields],
+        'buffer': lambda fields: RecordBuffer.from_records(EmployeeRecord(**values) for values in fields),
+    }
+    results = {}
+    held = {}
+    for name, build in layouts.items():
+        per_record, seconds, held[name] = measure(build, args.records)
+        results[name] = {'bytes_per_record': round(per_record, 1), 'build_us_per_record': round(seconds * 1e6, 2)}
+
+    import pandas as pd
+
+    # The table as it was made before: DataFrame from the dicts, re-indexed by column order, then renamed
+    def frame_from_dicts():
+        frame = pd.DataFrame(held['dicts'], columns=RECORD_FIELDS)
+        frame.columns = [name.replace('_', ' ').title() for name in RECORD_FIELDS]
+        return frame
+
+    headers = [name.replace('_', ' ').title() for name in RECORD_FIELDS]
+    results['dicts']['dataframe_seconds'] = round(timed(frame_from_dicts)[0], 3)
+    results['buffer']['dataframe_seconds'] = round(timed(lambda: held['buffer'].to_pandas(headers))[0], 3)
+    try:
+        import pyarrow as pa
+        results['dicts']['arrow_seconds'] = round(timed(lambda: pa.Table.from_pylist(held['dicts']))[0], 3)
+        results['buffer']['arrow_seconds'] = round(timed(lambda: held['buffer'].to_arrow(headers))[0], 3)
+    except ImportError:
+        pass
+
+    print(f"{args.records} records of {len(COLUMN_ORDER)} fields plus contact_status")
+    for name, result in results.items():
+        line = f"{name:<8} {result['bytes_per_record']:>7.0f} bytes/record  {result['build_us_per_record']:5.2f} us to build"
+        if 'dataframe_seconds' in result:
+            line += f"  DataFrame {result['dataframe_seconds']:.3f}s"
+        if 'arrow_seconds' in result:
+            line += f"  Arrow {result['arrow_seconds']:.3f}s"
+        print(line)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'records': args.records, 'layouts': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,347 @@
+"""Local stand-in for google.serper.dev and the sites it returns, serving a recorded corpus
+
+    python benchmarks/offline_server.py --corpus benchmarks/corpus [--port 8765] [--record]
+    SERPER_SEARCH_URL=http://127.0.0.1:8765/search streamlit run app.py
+
+Search results are rewritten to point at the server, and every site gets its own loopback address
+(127.0.0.2, 127.0.0.3, ...), so per-host limits and circuit breakers see as many hosts as in a live
+run; this relies on the whole of 127.0.0.0/8 being routed to loopback, as it is on Linux. Responses
+are delayed by the latency recorded with them. With --record, searches are forwarded to the real Serper
+API and pages fetched from the real sites, and everything served is added to the corpus.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractor import SERPER_SEARCH_URL  # noqa: E402
+from serper_cache import normalize_payload  # noqa: E402
+from urls import canonical_url, site_of  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# Served when a search or page was recorded without a latency
+DEFAULT_SEARCH_LATENCY = 0.4
+DEFAULT_PAGE_LATENCY = 0.15
+
+
+def origin_of(url):
+    parsed = urlsplit(url)
+    return f'{parsed.scheme.lower()}://{parsed.netloc.lower()}'
+
+
+def loopback_address(index):
+    """Loopback address of the index-th site; 127.0.0.1 is left to the search endpoint"""
+    block, host = divmod(index, 252)
+    return f'127.{block // 256}.{block % 256}.{host + 2}'
+
+
+class Corpus:
+    """Recorded Serper responses and pages: corpus.json plus one file per page body
+
+    Searches that weren't recorded are answered from `pool`, a list of organic results handed out
+    in windows picked by the query text, so synthetic corpora can serve whatever queries are sent.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.source = 'recorded'
+        self.queries = []  # search parameters the corpus was recorded for
+        self.origins = []  # site index -> 'https://www.acme.example'
+        self.searches = {}  # normalized payload -> {'payload', 'organic', 'elapsed'}
+        self.pool = []
+        self.pages = {}  # canonical URL -> {'url', 'status', 'content_type', 'file', 'elapsed'}
+        self._origin_index = {}
+        self._bodies = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path):
+        corpus = cls(path)
+        with open(os.path.join(path, 'corpus.json'), encoding='utf-8') as f:
+            data = json.load(f)
+        corpus.source = data.get('source', 'recorded')
+        corpus.queries = data.get('queries', [])
+        corpus.pool = data.get('pool', [])
+        corpus.pages = data.get('pages', {})
+        for origin in data.get('origins', []):
+            corpus.origin_index(origin, add=True)
+        for search in data.get('searches', []):
+            corpus.searches[normalize_payload(search['payload'])] = search
+        return corpus
+
+    @classmethod
+    def open(cls, path):
+        """The corpus at `path`, or a new empty one"""
+        if os.path.exists(os.path.join(path, 'corpus.json')):
+            return cls.load(path)
+        return cls(path)
+
+    def save(self):
+        os.makedirs(self.path, exist_ok=True)
+        with self._lock:
+            data = {
+                'source': self.source,
+                'queries': self.queries,
+                'origins': self.origins,
+                'searches': list(self.searches.values()),
+                'pool': self.pool,
+                'pages': self.pages,
+            }
+        tmp_path = os.path.join(self.path, 'corpus.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp_path, os.path.join(self.path, 'corpus.json'))
+
+    def fingerprint(self):
+        """Short hash of the corpus contents, so results from different corpora aren't compared"""
+        digest = hashlib.sha1()
+        for key in sorted(self.pages):
+            digest.update(f"{key}:{self.pages[key]['status']}:{self.pages[key].get('file')}".encode())
+        for key in sorted(self.searches):
+            digest.update(key.encode())
+        digest.update(json.dumps(self.pool, sort_keys=True).encode())
+        return digest.hexdigest()[:12]
+
+    def origin_index(self, url, add=False):
+        origin = origin_of(url)
+        with self._lock:
+            index = self._origin_index.get(origin)
+            if index is None and add:
+                index = self._origin_index[origin] = len(self.origins)
+                self.origins.append(origin)
+            return index
+
+    def add_search(self, payload, organic, elapsed):
+        with self._lock:
+            self.searches[normalize_payload(payload)] = {'payload': payload, 'organic': organic,
+                                                         'elapsed': round(elapsed, 3)}
+
+    def search(self, payload):
+        """(organic results, recorded latency) for a Serper payload"""
+        search = self.searches.get(normalize_payload(payload))
+        if search is not None:
+            return search['organic'], search.get('elapsed', DEFAULT_SEARCH_LATENCY)
+        if not self.pool:
+            return [], DEFAULT_SEARCH_LATENCY
+
+        num = int(payload.get('num', 10))
+        start = int(hashlib.sha1(payload.get('q', '').encode()).hexdigest()[:8], 16)
+        start += (int(payload.get('page', 1)) - 1) * num
+        return [self.pool[(start + i) % len(self.pool)] for i in range(min(num, len(self.pool)))], \
+            DEFAULT_SEARCH_LATENCY
+
+    def add_page(self, url, status, content_type, body, elapsed):
+        self.origin_index(url, add=True)
+        key = canonical_url(url)
+        name = hashlib.sha1(key.encode()).hexdigest()[:16]
+        os.makedirs(os.path.join(self.path, 'pages'), exist_ok=True)
+        with open(os.path.join(self.path, 'pages', name), 'wb') as f:
+            f.write(body)
+        with self._lock:
+            self.pages[key] = {'url': url, 'status': status, 'content_type': content_type,
+                               'file': f'pages/{name}', 'elapsed': round(elapsed, 3)}
+            self._bodies[key] = body
+
+    def page(self, url):
+        """(page entry, body) for a URL, or (None, b'') when it wasn't recorded"""
+        key = canonical_url(url)
+        entry = self.pages.get(key)
+        if entry is None:
+            return None, b''
+        body = self._bodies.get(key)
+        if body is None:
+            with open(os.path.join(self.path, entry['file']), 'rb') as f:
+                body = self._bodies[key] = f.read()
+        return entry, body
+
+
+class OfflineHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, delayed ACKs add ~40 ms per response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        if urlsplit(self.path).path.rstrip('/') != '/search':
+            self._send(404, 'text/plain', b'')
+            return
+        status, organic = self.server.search(payload, self.headers.get('X-API-KEY'))
+        self._send(status, 'application/json', json.dumps({'organic': organic}).encode('utf-8'))
+
+    def do_GET(self):
+        address = self.connection.getsockname()[0]
+        status, content_type, body = self.server.page(address, self.path, self.headers.get('User-Agent'))
+        self._send(status, content_type, body)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class OfflineServer(ThreadingHTTPServer):
+    """Serves a Corpus over HTTP, or with record=True fills it from the live search API and sites
+
+    `latency_scale` multiplies the recorded latencies; 0 answers straight away. When recording, searches
+    are forwarded to `serper_url`.
+    """
+
+    daemon_threads = True
+    # One listening socket stands in for a host per site, so it needs the backlog of many servers; with
+    # the default of 5, bursts of connections see SYN retransmits and 1 s stalls
+    request_queue_size = 256
+
+    def __init__(self, corpus, port=0, record=False, latency_scale=1.0, serper_url=SERPER_SEARCH_URL):
+        # Every loopback address has to reach the server; requests from elsewhere are refused below
+        super().__init__(('0.0.0.0', port), OfflineHandler)
+        self.corpus = corpus
+        self.record = record
+        self.latency_scale = latency_scale
+        self.serper_url = serper_url
+        self.port = self.server_address[1]
+        self._session = requests.Session() if record else None
+        self._thread = None
+
+    def verify_request(self, request, client_address):
+        return client_address[0].startswith('127.')
+
+    @property
+    def search_url(self):
+        return f'http://127.0.0.1:{self.port}/search'
+
+    def local_origin(self, index):
+        return f'http://{loopback_address(index)}:{self.port}'
+
+    def to_local(self, url):
+        """The served URL for an original one, or None for sites outside the corpus"""
+        index = self.corpus.origin_index(url, add=self.record)
+        if index is None:
+            return None
+        parsed = urlsplit(url)
+        return self.local_origin(index) + (parsed.path or '/') + (f'?{parsed.query}' if parsed.query else '')
+
+    def restore(self, text):
+        """Replace served addresses in text with the hosts they stand in for"""
+        for index, origin in enumerate(self.corpus.origins):
+            local = f'{loopback_address(index)}:{self.port}'
+            if local in text:
+                text = text.replace(local, site_of(origin))
+        return text
+
+    def search(self, payload, api_key=None):
+        started = time.perf_counter()
+        if self.record:
+            response = self._session.post(self.serper_url, json=payload, timeout=30,
+                                          headers={'X-API-KEY': api_key or '', 'Content-Type': 'application/json'})
+            if response.status_code != 200:
+                return response.status_code, []
+            organic = response.json().get('organic', [])
+            self.corpus.add_search(payload, organic, time.perf_counter() - started)
+        else:
+            organic, elapsed = self.corpus.search(payload)
+            time.sleep(elapsed * self.latency_scale)
+
+        results = []
+        for result in organic:
+            link = result.get('link', '')
+            local = None if not link.startswith('http') or 'linkedin.com/in/' in link else self.to_local(link)
+            results.append(dict(result, link=local) if local else result)
+        return 200, results
+
+    def page(self, address, path, user_agent=None):
+        """(status, content type, body) for a path on the site served at `address`"""
+        index = self._index_of(address)
+        if index is None:
+            return 404, 'text/plain', b''
+        origin = self.corpus.origins[index]
+        url = origin + path
+
+        entry, body = self.corpus.page(url)
+        if entry is None and self.record:
+            entry, body = self._record_page(url, user_agent)
+        if entry is None:
+            return 404, 'text/plain', b''
+        if not self.record:
+            time.sleep(entry.get('elapsed', DEFAULT_PAGE_LATENCY) * self.latency_scale)
+
+        # Absolute links back to the site have to lead to the server too
+        local = self.local_origin(index).encode()
+        host = urlsplit(origin).netloc.encode()
+        body = body.replace(b'https://' + host, local).replace(b'http://' + host, local)
+        return entry['status'], entry['content_type'] or 'application/octet-stream', body
+
+    def _index_of(self, address):
+        parts = address.split('.')
+        if len(parts) != 4 or parts[0] != '127':
+            return None
+        index = (int(parts[1]) * 256 + int(parts[2])) * 252 + int(parts[3]) - 2
+        return index if 0 <= index < len(self.corpus.origins) else None
+
+    def _record_page(self, url, user_agent):
+        started = time.perf_counter()
+        try:
+            response = self._session.get(url, timeout=15, headers={'User-Agent': user_agent or ''})
+            status, content_type, body = response.status_code, response.headers.get('Content-Type', ''), \
+                response.content
+        except requests.exceptions.RequestException:
+            # Recorded as a gateway error, so the replay fails the page as the live run did
+            status, content_type, body = 502, 'text/plain', b''
+        self.corpus.add_page(url, status, content_type, body, time.perf_counter() - started)
+        return self.corpus.page(url)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name='offline-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self.record:
+            self.corpus.save()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--corpus', default=DEFAULT_CORPUS)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--record', action='store_true', help="Fill the corpus from the live API and sites")
+    parser.add_argument('--latency-scale', type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = OfflineServer(Corpus.open(args.corpus), args.port, args.record, args.latency_scale)
+    print(f"Serving {args.corpus} ({len(server.corpus.pages)} pages); "
+          f"SERPER_SEARCH_URL={server.search_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.record:
+            server.corpus.save()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from metrics import failure_reason
+from urls import site_of
+
+# Outcomes of one request, as far as the controllers are concerned
+OK = 'ok'
+OVERLOAD = 'overload'  # timeout, connection failure, 429 or 5xx: back off
+ERROR = 'error'  # 404, non-HTML and the like: the server is fine, the page isn't
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of fetching from a host whose circuit is open"""
+
+
+def outcome_of(error=None, status=None):
+    """Classify a finished request as OK, OVERLOAD or ERROR"""
+    if status is None and error is not None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None) or getattr(error, 'status', None)
+    if status == 429 or (isinstance(status, int) and status >= 500):
+        return OVERLOAD
+    if error is None:
+        return OK
+    return OVERLOAD if failure_reason(error) in ('timeout', 'connection') else ERROR
+
+
+def _quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class AIMDController:
+    """Additive-increase/multiplicative-decrease limit on requests in flight
+
+    After every `window` successful requests the limit grows by one if the window's p90 latency stayed
+    under `latency_target` and the limit was actually reached, and is multiplied by `decrease` if the p90
+    was over target. A timeout, connection failure, 429 or 5xx cuts the limit straight away, at most once
+    per `limit` completions so that one burst of failures counts as one signal.
+    """
+
+    def __init__(self, name, initial=5, minimum=1, maximum=32, latency_target=3.0, window=10, decrease=0.7,
+                 metrics=None, adaptive=True):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.window = window
+        self.decrease = decrease
+        self.metrics = metrics
+        self.adaptive = adaptive
+        self.initial = initial
+        self.limit = initial
+        self.in_flight = 0
+        self._latencies = []
+        self._recent = deque(maxlen=200)
+        self._since_change = 0
+        self._saturated = False
+        self._cond = threading.Condition()
+        self._gauge()
+
+    def configure(self, adaptive=None, initial=None):
+        with self._cond:
+            if adaptive is not None:
+                self.adaptive = adaptive
+            if initial is not None:
+                self.initial = initial
+            if not self.adaptive:
+                self.limit = self.initial
+            self._cond.notify_all()
+        self._gauge()
+
+    def try_acquire(self):
+        with self._cond:
+            if self.in_flight < self.limit:
+                self._take()
+                return True
+            return False
+
+    def acquire(self):
+        """Block until fewer than `limit` requests are in flight, then take a slot"""
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self._take()
+
+    def _take(self):
+        self.in_flight += 1
+        if self.in_flight >= self.limit:
+            self._saturated = True
+
+    def release(self, seconds, outcome=OK):
+        """Give the slot back, reporting how long the request took and how it ended
+
+        With outcome None (a request that was skipped or interrupted) the slot is only freed.
+        """
+        decision = None
+        with self._cond:
+            self.in_flight -= 1
+            if outcome is None:
+                self._cond.notify_all()
+                return
+            self._since_change += 1
+            if outcome == OK:
+                self._latencies.append(seconds)
+                self._recent.append(seconds)
+            if self.adaptive:
+                decision = self._adjust(outcome)
+            self._cond.notify_all()
+
+        if decision:
+            self._report(*decision)
+
+    @contextmanager
+    def request(self, on_outcome=None):
+        """Hold a slot for the body of a with block
+
+        The outcome is taken from an exception raised in the block, or else from the `status` the block
+        sets on the yielded object; on_outcome(outcome) is called with it too. Requests that were skipped
+        (CircuitOpenError) or interrupted count as neither a success nor a failure.
+        """
+        self.acquire()
+        slot = SimpleNamespace(status=None)
+        outcome = None
+        started = time.perf_counter()
+        try:
+            yield slot
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            outcome = outcome_of(e)
+            raise
+        else:
+            outcome = outcome_of(status=slot.status)
+        finally:
+            self.release(time.perf_counter() - started, outcome)
+            if on_outcome is not None and outcome is not None:
+                on_outcome(outcome)
+
+    def _adjust(self, outcome):
+        if outcome == OVERLOAD:
+            if self._since_change >= self.limit:
+                return self._set_limit(math.floor(self.limit * self.decrease), 'decrease', 'overload')
+            return None
+
+        if len(self._latencies) < self.window:
+            return None
+        p90 = _quantile(self._latencies, 0.9)
+        saturated = self._saturated
+        self._latencies = []
+        self._saturated = False
+
+        if p90 > self.latency_target:
+            return self._set_limit(math.floor(self.limit * self.decrease), 'decrease', f'p90 {p90:.2f}s')
+        if saturated:
+            return self._set_limit(self.limit + 1, 'increase', f'p90 {p90:.2f}s')
+        return None
+
+    def _set_limit(self, limit, action, reason):
+        limit = max(self.minimum, min(self.maximum, limit))
+        if limit == self.limit:
+            return None
+        previous, self.limit = self.limit, limit
+        self._since_change = 0
+        return action, previous, limit, reason
+
+    def _report(self, action, previous, limit, reason):
+        if self.metrics is not None:
+            self.metrics.decision(self.name, action, reason, limit_from=previous, limit_to=limit)
+        self._gauge()
+
+    def _gauge(self):
+        if self.metrics is not None:
+            self.metrics.set_gauge(f'{self.name}_concurrency_limit', self.limit)
+
+    def timeout(self, ceiling, floor=2.0, multiplier=4.0):
+        """Request timeout: a multiple of the recent p95 latency, between floor and ceiling"""
+        with self._cond:
+            if not self.adaptive or len(self._recent) < 20:
+                return ceiling
+            p95 = _quantile(self._recent, 0.95)
+        return max(floor, min(ceiling, p95 * multiplier))
+
+
+class HostCircuitBreaker:
+    """Stop sending requests to a host after `threshold` overload failures in a row
+
+    An open circuit rejects requests for `cooldown` seconds, then lets a single probe through; the probe's
+    outcome closes the circuit again or keeps it open for another cooldown.
+    """
+
+    def __init__(self, threshold=3, cooldown=60.0, metrics=None):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.metrics = metrics
+        self._hosts = {}  # host -> [consecutive failures, opened at, probe started at]
+        self._lock = threading.Lock()
+
+    def allow(self, url):
+        host = site_of(url)
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state[1] is None:
+                return True
+            # One probe per cooldown; a probe that never reported back (e.g. cancelled) is replaced
+            now = time.monotonic()
+            if now - state[1] >= self.cooldown and (state[2] is None or now - state[2] >= self.cooldown):
+                state[2] = now
+                return True
+        if self.metrics is not None:
+            self.metrics.count('circuit_rejected')
+        return False
+
+    def check(self, url):
+        if not self.allow(url):
+            raise CircuitOpenError(f"Skipped {site_of(url)}: too many recent timeouts or server errors")
+
+    def record(self, url, outcome):
+        host = site_of(url)
+        decision = None
+        with self._lock:
+            state = self._hosts.get(host)
+            if outcome != OVERLOAD:
+                if state is not None:
+                    if state[1] is not None:
+                        decision = 'close'
+                    del self._hosts[host]
+            else:
+                if state is None:
+                    state = self._hosts[host] = [0, None, None]
+                state[0] += 1
+                if state[2] is not None or (state[1] is None and state[0] >= self.threshold):
+                    decision = 'open' if state[1] is None else 'reopen'
+                    state[1] = time.monotonic()
+                    state[2] = None
+            open_hosts = sum(1 for state in self._hosts.values() if state[1] is not None)
+
+        if decision and self.metrics is not None:
+            self.metrics.decision('circuit', decision, host)
+            self.metrics.set_gauge('open_circuits', open_hosts)
+
+    def open_hosts(self):
+        with self._lock:
+            return sorted(host for host, state in self._hosts.items() if state[1] is not None)
@@ -0,0 +1,182 @@
+import json
+import re
+import time
+
+from crawl import crawlable
+from sqlite_store import open_database
+from urls import canonical_url, site_of
+
+# Legal-form words dropped from the end of company names ("Acme Pvt. Ltd." -> "acme")
+LEGAL_SUFFIXES = {
+    'pvt', 'private', 'ltd', 'limited', 'llc', 'llp', 'lp', 'inc', 'incorporated', 'corp', 'corporation',
+    'co', 'company', 'plc', 'gmbh', 'ag', 'sa', 'bv', 'nv', 'pte', 'pty', 'srl', 'oy', 'ab',
+}
+HONORIFICS = {'mr', 'mrs', 'ms', 'miss', 'dr', 'prof', 'sir', 'shri', 'smt'}
+
+_NON_WORD = re.compile(r'[^\w\s]+')
+
+
+def _tokens(text):
+    return _NON_WORD.sub(' ', (text or '').lower().replace('&', ' and ')).split()
+
+
+def normalize_company(name):
+    """Company name without punctuation, case or a trailing legal form"""
+    tokens = _tokens(name)
+    if tokens and tokens[0] == 'the':
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return ' '.join(tokens)
+
+
+def normalize_person(name):
+    """Person name tokens without honorifics, sorted so "Smith, John" matches "John Smith\""""
+    return ' '.join(sorted(token for token in _tokens(name) if token not in HONORIFICS))
+
+
+def normalize_domain(website):
+    website = (website or '').strip().lower()
+    if not website:
+        return ''
+    return site_of(website if '//' in website else '//' + website)
+
+
+def contact_keys(record):
+    """(person, company, domain) keys a record is matched on
+
+    The domain is left empty for directories and social networks (crawl.NO_CRAWL_SITES): their pages are
+    about many companies, so the same name there doesn't make the same contact.
+    """
+    domain = normalize_domain(record.get('website', ''))
+    return (
+        normalize_person(record.get('contact_person', '')),
+        normalize_company(record.get('business_name', '')),
+        domain if crawlable(domain) else '',
+    )
+
+
+class ContactStore:
+    """SQLite store of every contact seen, so repeat campaigns can tell new contacts from known ones
+
+    A record matches a stored contact when the normalized person name is the same and either the
+    normalized company name or the company domain is. Both pairs are indexed, so a lookup is two index
+    probes however many contacts are stored.
+    """
+
+    def __init__(self, path='.cache/contacts.sqlite3'):
+        self.path = path
+        self.new = 0
+        self.known = 0
+
+        self._conn, self._lock = open_database(path, synchronous='NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS contacts ('
+            ' id INTEGER PRIMARY KEY,'
+            ' person_key TEXT NOT NULL,'
+            ' company_key TEXT NOT NULL,'
+            ' domain TEXT NOT NULL,'
+            ' contact_person TEXT,'
+            ' business_name TEXT,'
+            ' record TEXT,'
+            ' first_seen REAL NOT NULL,'
+            ' last_seen REAL NOT NULL,'
+            ' times_seen INTEGER NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS contacts_person_company ON contacts (person_key, company_key)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS contacts_person_domain ON contacts (person_key, domain)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS processed_pages ('
+            ' url TEXT PRIMARY KEY,'
+            ' processed_at REAL NOT NULL,'
+            ' records INTEGER NOT NULL)'
+        )
+        self._conn.commit()
+
+    def _find(self, person_key, company_key, domain):
+        # UNION ALL instead of OR so each half uses its own index
+        row = self._conn.execute(
+            'SELECT id FROM contacts WHERE person_key = ? AND company_key = ?'
+            ' UNION ALL SELECT id FROM contacts WHERE person_key = ? AND domain = ? AND domain != \'\''
+            ' LIMIT 1',
+            (person_key, company_key, person_key, domain)
+        ).fetchone()
+        return row[0] if row else None
+
+    def is_known(self, record):
+        with self._lock:
+            return self._find(*contact_keys(record)) is not None
+
+    def upsert(self, record):
+        """Store a record; returns 'new' or 'known'"""
+        return self.upsert_many([record])[0]
+
+    def upsert_many(self, records):
+        """Store records in one transaction; returns 'new' or 'known' for each"""
+        now = time.time()
+        statuses = []
+        with self._lock:
+            for record in records:
+                person_key, company_key, domain = contact_keys(record)
+                data = json.dumps(dict(record), ensure_ascii=False)
+                contact_id = self._find(person_key, company_key, domain)
+                if contact_id is None:
+                    self._conn.execute(
+                        'INSERT INTO contacts (person_key, company_key, domain, contact_person, business_name, record,'
+                        ' first_seen, last_seen, times_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)',
+                        (person_key, company_key, domain, record.get('contact_person'), record.get('business_name'),
+                         data, now, now)
+                    )
+                    statuses.append('new')
+                    self.new += 1
+                else:
+                    self._conn.execute(
+                        'UPDATE contacts SET last_seen = ?, times_seen = times_seen + 1, record = ? WHERE id = ?',
+                        (now, data, contact_id)
+                    )
+                    statuses.append('known')
+                    self.known += 1
+            self._conn.commit()
+        return statuses
+
+    def mark_page(self, url, records):
+        """Remember that every record of a page has been stored"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO processed_pages (url, processed_at, records) VALUES (?, ?, ?)',
+                (canonical_url(url), time.time(), records)
+            )
+            self._conn.commit()
+
+    def processed_pages(self, urls, max_age_seconds):
+        """The URLs among `urls` whose records were all stored within max_age_seconds"""
+        by_key = {}
+        for url in urls:
+            by_key.setdefault(canonical_url(url), []).append(url)
+        keys = list(by_key)
+        cutoff = time.time() - max_age_seconds
+
+        processed = set()
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self._conn.execute(
+                    f'SELECT url FROM processed_pages WHERE processed_at >= ? AND url IN ({",".join("?" * len(chunk))})',
+                    [cutoff] + chunk
+                )
+                for (key,) in rows:
+                    processed.update(by_key[key])
+        return processed
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM contacts')
+            self._conn.execute('DELETE FROM processed_pages')
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            contacts = self._conn.execute('SELECT COUNT(*) FROM contacts').fetchone()[0]
+            pages = self._conn.execute('SELECT COUNT(*) FROM processed_pages').fetchone()[0]
+        return {'contacts': contacts, 'pages': pages, 'new': self.new, 'known': self.known}
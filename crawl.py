@@ -0,0 +1,131 @@
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+from html_text import extract_links
+from urls import canonical_url, site_of
+
+# URL/anchor keywords of pages that tend to list people, with how much each is worth
+LINK_KEYWORDS = (
+    (10, ('team', 'leadership', 'management', 'founder', 'executive', 'board', 'director', 'our-people',
+          'ourpeople', 'who-we-are', 'whoweare')),
+    (6, ('about', 'people', 'staff', 'company', 'partners', 'meet')),
+    (4, ('contact', 'office', 'location', 'reach-us')),
+)
+
+ANCHOR_PATTERNS = [
+    (weight, re.compile(r'\b(?:' + '|'.join(re.escape(keyword) for keyword in keywords) + ')'))
+    for weight, keywords in LINK_KEYWORDS
+]
+
+# Path segments of pages that never list the company's people
+NEGATIVE_SEGMENTS = {
+    'login', 'signin', 'sign-in', 'signup', 'register', 'account', 'cart', 'checkout', 'privacy',
+    'privacy-policy', 'terms', 'cookies', 'cookie-policy', 'legal', 'blog', 'news', 'press', 'tag',
+    'tags', 'category', 'search', 'feed', 'rss', 'wp-login.php', 'careers', 'jobs', 'faq', 'help',
+}
+
+SKIP_EXTENSIONS = ('.pdf', '.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.zip', '.mp4', '.mp3', '.doc',
+                   '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.css', '.js', '.xml', '.json')
+
+# Directories and social networks: their "team" links are not the company's own pages
+NO_CRAWL_SITES = ('linkedin.com', 'crunchbase.com', 'zoominfo.com', 'facebook.com', 'twitter.com', 'x.com',
+                  'instagram.com', 'youtube.com', 'wikipedia.org', 'glassdoor.com', 'indeed.com')
+
+
+def crawlable(site):
+    return bool(site) and not any(site == other or site.endswith('.' + other) for other in NO_CRAWL_SITES)
+
+
+def score_link(url, anchor_text=''):
+    """How likely a link is to lead to a page listing the company's people"""
+    path = urlparse(url).path.lower()
+    if path.endswith(SKIP_EXTENSIONS):
+        return 0
+
+    segments = [segment for segment in path.split('/') if segment]
+    if any(segment in NEGATIVE_SEGMENTS for segment in segments):
+        return 0
+
+    anchor = anchor_text.lower()
+    score = 0
+    for weight, keywords in LINK_KEYWORDS:
+        if any(keyword in path for keyword in keywords):
+            score = max(score, weight)
+    for weight, pattern in ANCHOR_PATTERNS:
+        if pattern.search(anchor):
+            score += weight // 2
+            break
+
+    # Prefer /team over /blog/2019/05/our-team-offsite
+    return max(0, score - max(0, len(segments) - 2) * 2)
+
+
+class CrawlFrontier:
+    """Same-site follow-up links for one extraction run, best scoring first, within page and time budgets"""
+
+    def __init__(self, pages_per_domain=3, max_pages=30, time_budget=20.0, min_score=4):
+        self.pages_per_domain = pages_per_domain
+        self.max_pages = max_pages
+        self.time_budget = time_budget
+        self.min_score = min_score
+        self.deadline = None
+        self._seen = set()
+        self._candidates = {}
+        self._lock = threading.Lock()
+
+    def mark_seen(self, urls):
+        with self._lock:
+            self._seen.update(canonical_url(url) for url in urls)
+
+    def discover(self, page_url, content, encoding=None):
+        """Collect candidate links from a fetched page"""
+        if not crawlable(site_of(page_url)):
+            return
+        self.add_links(page_url, extract_links(content, page_url, encoding))
+
+    def add_links(self, page_url, links):
+        site = site_of(page_url)
+        if not crawlable(site):
+            return
+
+        with self._lock:
+            candidates = self._candidates.setdefault(site, {})
+            for url, anchor_text in links:
+                if site_of(url) != site:
+                    continue
+                key = canonical_url(url)
+                if key in self._seen:
+                    continue
+                score = score_link(url, anchor_text)
+                if score >= self.min_score and score > candidates.get(key, (0, None, None))[0]:
+                    candidates[key] = (score, url, page_url)
+
+    def next_wave(self):
+        """The best links of every site, as search-result-like dicts; starts the time budget"""
+        with self._lock:
+            per_site = []
+            for site, candidates in self._candidates.items():
+                ranked = sorted(candidates.items(), key=lambda item: -item[1][0])[:self.pages_per_domain]
+                per_site.append([(score, key, url, page_url) for key, (score, url, page_url) in ranked])
+
+            # Round-robin over sites so one big site can't take the whole global budget
+            wave = []
+            while per_site and len(wave) < self.max_pages:
+                for links in list(per_site):
+                    if not links:
+                        per_site.remove(links)
+                        continue
+                    wave.append(links.pop(0))
+                    if len(wave) >= self.max_pages:
+                        break
+
+            self._candidates.clear()
+            self._seen.update(key for _, key, _, _ in wave)
+            self.deadline = time.monotonic() + self.time_budget
+
+        return [{'link': url, 'title': '', 'snippet': '', 'crawled_from': page_url} for _, _, url, page_url in wave]
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
@@ -0,0 +1,216 @@
+"""Incremental record exports: rows are written as they arrive, so no format needs every record in memory
+
+    with open_exporter('contacts.xlsx', columns) as exporter:
+        for record in records:
+            exporter.write(record)
+"""
+import csv
+import json
+import os
+
+# Format name -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'xlsx': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('.csv', 'text/csv'),
+    'json': ('.json', 'application/json'),
+    'ndjson': ('.ndjson', 'application/x-ndjson'),
+    'parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def available_formats():
+    """Export formats whose libraries are installed (Parquet needs pyarrow)"""
+    formats = [fmt for fmt in EXPORT_FORMATS if fmt != 'parquet']
+    try:
+        import pyarrow  # noqa: F401
+        formats.append('parquet')
+    except ImportError:
+        pass
+    return formats
+
+
+def format_for_path(path):
+    extension = os.path.splitext(path)[1].lower()
+    for fmt, (fmt_extension, _) in EXPORT_FORMATS.items():
+        if extension == fmt_extension or (fmt == 'ndjson' and extension == '.jsonl'):
+            return fmt
+    raise ValueError(f"Can't tell the export format of {path}; use one of "
+                     + ", ".join(extension for extension, _ in EXPORT_FORMATS.values()))
+
+
+def _cell(value):
+    return '' if value is None else value
+
+
+class Exporter:
+    """Writes records with fixed columns to one file; `headers` renames the columns in the output"""
+
+    def __init__(self, path, columns, headers=None):
+        self.path = path
+        self.columns = list(columns)
+        self.headers = list(headers or columns)
+        self.rows = 0
+
+    def write(self, record):
+        self._write_row([_cell(record.get(column)) for column in self.columns])
+        self.rows += 1
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+        return self.rows
+
+    def _write_row(self, row):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CsvExporter(Exporter):
+    """CSV written in chunks of `chunk_rows`"""
+
+    def __init__(self, path, columns, headers=None, chunk_rows=1000):
+        super().__init__(path, columns, headers)
+        self.chunk_rows = chunk_rows
+        self._chunk = []
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(self.headers)
+
+    def _write_row(self, row):
+        self._chunk.append(row)
+        if len(self._chunk) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        self._csv.writerows(self._chunk)
+        self._chunk = []
+
+    def close(self):
+        if not self._file.closed:
+            self._flush()
+            self._file.close()
+
+
+class NdjsonExporter(Exporter):
+    """One JSON object per line"""
+
+    def __init__(self, path, columns, headers=None):
+        super().__init__(path, columns, headers)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def _write_row(self, row):
+        self._file.write(json.dumps(dict(zip(self.headers, row)), ensure_ascii=False) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+class JsonExporter(NdjsonExporter):
+    """A JSON array, written one object at a time"""
+
+    def __init__(self, path, columns, headers=None):
+        super().__init__(path, columns, headers)
+        self._file.write('[')
+
+    def _write_row(self, row):
+        self._file.write(('\n' if not self.rows else ',\n') + json.dumps(dict(zip(self.headers, row)),
+                                                                          ensure_ascii=False))
+
+    def close(self):
+        if not self._file.closed:
+            self._file.write('\n]\n')
+            self._file.close()
+
+
+class ParquetExporter(Exporter):
+    """Parquet with one row group per `chunk_rows` records; every column is a string"""
+
+    def __init__(self, path, columns, headers=None, chunk_rows=10000):
+        super().__init__(path, columns, headers)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow") from None
+
+        self._pa = pa
+        self.chunk_rows = chunk_rows
+        self._schema = pa.schema([(header, pa.string()) for header in self.headers])
+        self._chunk = [[] for _ in self.headers]
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def _write_row(self, row):
+        for values, value in zip(self._chunk, row):
+            values.append(str(value))
+        if len(self._chunk[0]) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if self._chunk[0]:
+            self._writer.write_table(self._pa.Table.from_arrays(self._chunk, schema=self._schema))
+            self._chunk = [[] for _ in self.headers]
+
+    def close(self):
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+
+
+class XlsxExporter(Exporter):
+    """Excel via openpyxl's write-only mode, which streams rows to disk instead of keeping cell objects"""
+
+    def __init__(self, path, columns, headers=None, sheet_name='Real_Employee_Data'):
+        super().__init__(path, columns, headers)
+        from openpyxl import Workbook
+
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(sheet_name)
+        self._sheet.append(self.headers)
+
+    def _write_row(self, row):
+        self._sheet.append(row)
+
+    def close(self):
+        if self._workbook is not None:
+            self._workbook.save(self.path)
+            self._workbook = None
+
+
+EXPORTERS = {
+    'xlsx': XlsxExporter,
+    'csv': CsvExporter,
+    'json': JsonExporter,
+    'ndjson': NdjsonExporter,
+    'parquet': ParquetExporter,
+}
+
+
+def open_exporter(path, columns, headers=None, fmt=None):
+    """Exporter for `path`, picking the format from its extension unless `fmt` is given"""
+    return EXPORTERS[fmt or format_for_path(path)](path, columns, headers)
+
+
+def read_records(path):
+    """Records back from an NDJSON or CSV file, one at a time"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def export_file(src_path, dst_path, columns, headers=None, fmt=None):
+    """Convert an NDJSON or CSV record file to another format, streaming; returns the number of rows"""
+    with open_exporter(dst_path, columns, headers, fmt) as exporter:
+        return exporter.write_many(read_records(src_path))
@@ -0,0 +1,227 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from phones import DEFAULT_REGION, find_phones
+
+PageExtraction = namedtuple('PageExtraction', ['names', 'emails', 'phones', 'address', 'employees_count'])
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+EXCLUDED_EMAIL_PARTS = ('noreply', 'no-reply', 'support', 'info', 'admin', 'webmaster', 'contact')
+
+ADDRESS_PATTERNS = [
+    ('address', re.compile(r'Address[:\s]+([^,\n]+(?:,\s*[^,\n]+)*)', re.IGNORECASE)),
+    ('location', re.compile(r'Location[:\s]+([^,\n]+(?:,\s*[^,\n]+)*)', re.IGNORECASE)),
+    ('office', re.compile(r'Office[:\s]+([^,\n]+(?:,\s*[^,\n]+)*)', re.IGNORECASE)),
+]
+
+EMPLOYEE_PATTERNS = [
+    ('employees', False, re.compile(r'(\d+[\+,]?\d*)\s*employees', re.IGNORECASE)),
+    ('team', True, re.compile(r'team\s+of\s+(\d+[\+,]?\d*)', re.IGNORECASE)),
+    ('people', False, re.compile(r'(\d+[\+,]?\d*)\s*people', re.IGNORECASE)),
+]
+
+TITLE_NAME_PATTERN = re.compile(
+    r'([A-Z][a-z]+\s+[A-Z][a-z]+)[\s,\-–]+(Chief\s+Technology\s+Officer|Chief\s+Executive\s+Officer|Chief\s+Financial\s+Officer)',
+    re.IGNORECASE
+)
+SHORT_TITLE_NAME_PATTERN = re.compile(
+    r'(Mr\.?\s+|Ms\.?\s+|Dr\.?\s+)?([A-Z][a-z]+\s+[A-Z][a-z]+)[\s,\-–]+(CTO|CEO|CFO|VP|Director|Manager)',
+    re.IGNORECASE
+)
+
+# Characters a name match can be made of: what [A-Z]/[a-z] accept under IGNORECASE, whitespace and
+# the separators. Matches never cross anything else, so they only need to be searched for inside
+# the runs of these characters that contain a trigger keyword.
+NAME_RUN_CHARS = r'A-Za-z\u0130\u0131\u017f\u212a\s,\-–:'
+
+# Characters a headcount can be made of before "employees"/"people"
+COUNT_RUN_PATTERN = re.compile(r'[\d+,\s]*')
+
+# Keywords that gate the slower patterns
+KEYWORDS = {
+    'chief': ['chief'],
+    'title': ['cto', 'ceo', 'cfo', 'vp', 'director', 'manager'],
+    'address': ['address'],
+    'location': ['location'],
+    'office': ['office'],
+    'employees': ['employees'],
+    'team': ['team'],
+    'people': ['people'],
+}
+
+# Keywords only needed for the company facts (address and headcount)
+COMPANY_FACT_KEYWORDS = ('address', 'location', 'office', 'employees', 'team', 'people')
+
+
+def fold_case(text):
+    """Lowercase copy with the same length, folding the letters IGNORECASE treats as ASCII"""
+    if '\u0130' in text:
+        text = text.replace('\u0130', 'i')
+    lowered = text.lower()
+    if '\u0131' in lowered:
+        lowered = lowered.replace('\u0131', 'i')
+    if '\u017f' in lowered:
+        lowered = lowered.replace('\u017f', 's')
+    return lowered
+
+
+def find_all(haystack, needle, end=None):
+    """Every offset of needle in haystack"""
+    found = []
+    pos = haystack.find(needle, 0, end)
+    while pos >= 0:
+        found.append(pos)
+        pos = haystack.find(needle, pos + 1, end)
+    return found
+
+
+class _Page:
+    """Text being extracted from, with the reversed copy needed to find where a run starts"""
+
+    def __init__(self, text):
+        self.text = text
+        self._reversed = None
+
+    def run_start(self, pos, run_pattern):
+        if self._reversed is None:
+            self._reversed = self.text[::-1]
+        reversed_pos = len(self.text) - pos
+        return pos - (run_pattern.match(self._reversed, reversed_pos).end() - reversed_pos)
+
+    def run_end(self, pos, run_pattern):
+        return run_pattern.match(self.text, pos).end()
+
+
+class ExtractionEngine:
+    """Precompiled extractor for one job role that finds names, emails, phones and company facts
+
+    One case-folded copy of the page is searched for the trigger keywords (substring search, so
+    overlapping mentions are all found). The original patterns then only run where they can match:
+    name patterns over the runs of name characters around their keyword and fact patterns at each
+    keyword mention. Results match the original per-helper regexes. Phones come from phones.find_phones.
+    """
+
+    def __init__(self, job_role):
+        self.job_role = job_role
+        role = re.escape(job_role)
+
+        self.name_patterns = [
+            ('role', False, re.compile(rf'([A-Z][a-z]+\s+[A-Z][a-z]+)[\s,\-–]+{role}', re.IGNORECASE)),
+            ('role', True, re.compile(rf'{role}[\s,\-–:]+([A-Z][a-z]+\s+[A-Z][a-z]+)', re.IGNORECASE)),
+            ('chief', False, TITLE_NAME_PATTERN),
+            ('title', False, SHORT_TITLE_NAME_PATTERN),
+        ]
+
+        self.keywords = dict(KEYWORDS)
+        if job_role:
+            self.keywords['role'] = [fold_case(job_role)]
+
+        # The role may add characters of its own (e.g. "R&D") to a name run
+        extra_chars = ''.join(sorted({re.escape(c) for c in job_role if not re.match(f'[{NAME_RUN_CHARS}]', c)}))
+        self.name_run_pattern = re.compile(f'[{NAME_RUN_CHARS}{extra_chars}]*')
+
+    def scan(self, text, company_facts=True):
+        """Offsets of every keyword mention"""
+        lowered = fold_case(text)
+
+        positions = {}
+        for kind, needles in self.keywords.items():
+            if not company_facts and kind in COMPANY_FACT_KEYWORDS:
+                continue
+            found = []
+            for needle in needles:
+                found.extend(find_all(lowered, needle))
+            if found:
+                positions[kind] = sorted(found)
+
+        return _Page(text), positions
+
+    def extract(self, text, extra='', company_facts=True, region=DEFAULT_REGION):
+        """Extract everything from `text`; names are also looked for in `extra` (e.g. title and snippet)
+
+        With company_facts=False the address and headcount are left empty, for pages of a company
+        whose facts are already known. Phone numbers without a country code are read as `region`'s.
+        """
+        combined = text + extra if extra else text
+        end = len(text)
+        page, positions = self.scan(combined, company_facts)
+
+        return PageExtraction(
+            names=self._names(page, positions),
+            emails=self._emails(combined, end),
+            phones=find_phones(combined, region, end),
+            address=self._address(combined, positions, end),
+            employees_count=self._employees_count(page, positions, end),
+        )
+
+    def _names(self, page, positions):
+        names = []
+
+        for key, starts_with_role, pattern in self.name_patterns:
+            if key not in positions:
+                continue
+
+            # Maximal runs of name characters around each mention, in order
+            windows = sorted({
+                (page.run_start(pos, self.name_run_pattern), page.run_end(pos, self.name_run_pattern))
+                for pos in positions[key]
+            })
+
+            for start, end in windows:
+                for match in pattern.findall(page.text, start, end):
+                    if isinstance(match, tuple):
+                        # Take the name part from tuple
+                        name = match[1] if len(match) > 1 and match[1] else match[0]
+                    else:
+                        name = match
+
+                    if name and len(name.split()) >= 2:
+                        names.append(name.strip())
+
+        return list(set(names))
+
+    @staticmethod
+    def _emails(text, end):
+        if '@' not in text:
+            return []
+        return [
+            email for email in EMAIL_PATTERN.findall(text, 0, end)
+            if not any(part in email.lower() for part in EXCLUDED_EMAIL_PARTS)
+        ]
+
+    @staticmethod
+    def _address(text, positions, end):
+        # Each pattern starts with its keyword, so the first mention where it matches is re.search's answer
+        for keyword, pattern in ADDRESS_PATTERNS:
+            for pos in positions.get(keyword, ()):
+                if pos >= end:
+                    break
+                match = pattern.match(text, pos, end)
+                if match:
+                    return match.group(1).strip()
+        return ''
+
+    @staticmethod
+    def _employees_count(page, positions, end):
+        for keyword, anchored, pattern in EMPLOYEE_PATTERNS:
+            for pos in positions.get(keyword, ()):
+                if pos >= end:
+                    break
+                if anchored:
+                    match = pattern.match(page.text, pos, end)
+                else:
+                    # The count sits in the run of digits/commas/spaces right before the keyword
+                    keyword_end = pos + len(keyword)
+                    if keyword_end > end:
+                        break
+                    match = pattern.search(page.text, page.run_start(pos, COUNT_RUN_PATTERN), keyword_end)
+                if match:
+                    return match.group(1)
+        return ''
+
+
+@lru_cache(maxsize=64)
+def get_extraction_engine(job_role):
+    """Shared engine per job role so patterns are compiled once per job"""
+    return ExtractionEngine(job_role)
@@ -0,0 +1,1201 @@
+import copy
+import logging
+import multiprocessing
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import TokenBucket
+from serper_cache import SerperCache
+from page_cache import PageCache
+from contact_store import ContactStore, contact_keys
+from metrics import PipelineMetrics
+from near_duplicates import NearDuplicateIndex, fingerprint
+from concurrency import AIMDController, HostCircuitBreaker
+from crawl import CrawlFrontier, crawlable
+from html_text import html_to_text, is_html_content_type, charset_from_content_type, read_limited
+from page_processing import build_page_records, extract_company_from_url, process_page
+from phones import find_phones, region_for_country
+from politeness import MAX_ROBOTS_BYTES, ROBOTS_TIMEOUT, HostPacer, HostQueue, RobotsCache
+from query_planner import QUERY_TEMPLATES, RESULTS_PER_QUERY, QueryPlanner, QueryStats
+from records import EmployeeRecord
+from single_flight import SingleFlight
+from urls import canonical_url, site_of
+
+SERPER_SEARCH_URL = "https://google.serper.dev/search"
+
+# Longest wait between Serper retries, whatever Retry-After asks for
+MAX_RETRY_DELAY = 30.0
+
+logger = logging.getLogger(__name__)
+
+
+REPORT_LEVELS = {'info': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+
+
+def log_reporter(level, message):
+    """Default progress callback: send extractor messages to the logging module"""
+    logger.log(REPORT_LEVELS.get(level, logging.INFO), message)
+
+
+class RunContext:
+    """State shared by the pages of one extraction run: crawl frontier, per-site company facts, page fingerprints"""
+
+    def __init__(self, frontier=None, near_duplicates=None):
+        self.frontier = frontier
+        self.near_duplicates = near_duplicates
+        self.near_duplicates_skipped = 0
+        self.extract_seconds_saved = 0.0
+        self._company_info = {}
+        self._lock = threading.Lock()
+
+    def company_info_for(self, url):
+        site = site_of(url)
+        if not crawlable(site):
+            return None
+        with self._lock:
+            return self._company_info.get(site)
+
+    def remember_company_info(self, url, company_info):
+        """Keep the first facts found for a site; returns the ones to use
+
+        Pages of directories and social networks (crawl.NO_CRAWL_SITES) are about different companies, so
+        their facts are never shared.
+        """
+        site = site_of(url)
+        if not crawlable(site):
+            return company_info
+        with self._lock:
+            return self._company_info.setdefault(site, company_info)
+
+    def near_duplicate_skipped(self, seconds):
+        with self._lock:
+            self.near_duplicates_skipped += 1
+            self.extract_seconds_saved += seconds
+
+
+class RealEmployeeDataExtractor:
+    def __init__(self, requests_per_second=5.0, burst=5, max_search_workers=7, max_retries=4,
+                 search_cache_ttl=7 * 24 * 3600, page_cache_max_mb=256, scrape_engine='threads',
+                 max_workers=5, max_pages=20, max_concurrency=200, per_host_limit=4, fetch_timeout=10,
+                 parser_backend='lxml', max_page_bytes=2 * 1024 * 1024, parse_workers=0, crawl_pages_per_domain=0,
+                 crawl_max_pages=30, crawl_time_budget=20.0, adaptive_concurrency=True, plan_queries=True,
+                 skip_near_duplicates=True, respect_robots=True, host_delay=0.5, reporter=None):
+        self.serper_api_key = os.getenv('SERPER_API_KEY')
+        # Pointed at a local stand-in (benchmarks/offline_server.py) to run without network access
+        self.serper_url = os.getenv('SERPER_SEARCH_URL', SERPER_SEARCH_URL)
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+
+        # Pool enough connections for the search fan-out and the scraping workers at their adaptive maximums
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=64)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        # Serper quota is enforced by the limiter instead of a fixed sleep
+        self.rate_limiter = TokenBucket(requests_per_second, burst)
+        self.max_search_workers = max_search_workers
+        self.max_retries = max_retries
+
+        # Identical Serper payloads are served from disk instead of re-paying latency and credits
+        self.search_cache = SerperCache(
+            os.getenv('SERPER_CACHE_PATH', '.cache/serper_cache.sqlite3'),
+            ttl_seconds=search_cache_ttl
+        )
+        self.search_cache_ttl = search_cache_ttl
+        self.use_search_cache = True
+        self.refresh_search_cache = False
+
+        # Templates are tried in order of past yield until enough unique results are in hand
+        self.query_planner = QueryPlanner(QueryStats(os.getenv('QUERY_STATS_PATH', '.cache/query_stats.sqlite3')))
+        self.plan_queries = plan_queries
+
+        # Team/about pages rarely change, so keep them on disk and revalidate
+        self.page_cache = PageCache(
+            os.getenv('PAGE_CACHE_PATH', '.cache/page_cache.sqlite3'),
+            max_bytes=page_cache_max_mb * 1024 * 1024
+        )
+        self.use_page_cache = True
+
+        # Every contact ever produced, so repeat campaigns can tell new contacts from known ones
+        self.contact_store = ContactStore(os.getenv('CONTACT_STORE_PATH', '.cache/contacts.sqlite3'))
+        self.use_contact_store = True
+        self.skip_known_contacts = False
+        self.revisit_pages_after = 30 * 24 * 3600
+
+        # Scraping engine: 'threads' (default) or 'async' for hundreds of pages in flight
+        self.scrape_engine = scrape_engine
+        self.max_workers = max_workers
+        self.max_pages = max_pages
+        self.max_concurrency = max_concurrency
+        self.per_host_limit = per_host_limit
+        self.fetch_timeout = fetch_timeout
+
+        # 'lxml' is the fast path; 'html.parser' keeps the original BeautifulSoup behaviour
+        self.parser_backend = parser_backend
+        self.max_page_bytes = max_page_bytes
+
+        # Worker processes for parsing/extraction; 0 keeps it on the fetching threads
+        self.parse_workers = parse_workers
+        self._process_pools = {}  # parse_workers -> ProcessPoolExecutor
+        self._process_pool_lock = threading.Lock()
+
+        # Concurrent requests for the same page (e.g. from parallel batch jobs) share one fetch and parse
+        self._flights = SingleFlight()
+
+        # Follow team/about/contact links of scraped sites; 0 pages per domain turns the crawl off
+        self.crawl_pages_per_domain = crawl_pages_per_domain
+        self.crawl_max_pages = crawl_max_pages
+        self.crawl_time_budget = crawl_time_budget
+
+        # Mirrors, syndicated copies and templated pages of a run are fingerprinted and not extracted twice
+        self.skip_near_duplicates = skip_near_duplicates
+
+        # Per-stage timings and counters; a RunProfiler is attached only while a run is being profiled
+        self.metrics = PipelineMetrics()
+        self.profiler = None
+
+        # Requests in flight follow observed latency and overload signals; hosts that keep timing out or
+        # failing with 5xx are skipped for a while instead of tying up workers
+        self._make_controls(adaptive_concurrency)
+
+        # robots.txt of every site is fetched once a day; fetches go out across hosts, each host paced to
+        # its Crawl-delay (at least host_delay seconds apart)
+        self.respect_robots = respect_robots
+        self.robots = RobotsCache(self._fetch_robots, metrics=self.metrics)
+        self.pacer = HostPacer(self.robots if respect_robots else None, min_delay=host_delay,
+                               per_host_limit=per_host_limit)
+
+        # Progress and warnings go through report(level, message) so the class runs without a UI
+        self.report = reporter or log_reporter
+
+    def _make_controls(self, adaptive):
+        self.fetch_control = AIMDController(
+            'fetch', initial=self.max_workers, maximum=max(self.max_workers, 32), metrics=self.metrics,
+            adaptive=adaptive
+        )
+        self.async_fetch_control = AIMDController(
+            'async_fetch', initial=min(self.max_concurrency, 50), maximum=self.max_concurrency,
+            metrics=self.metrics, adaptive=adaptive
+        )
+        self.search_control = AIMDController(
+            'search', initial=self.max_search_workers, maximum=max(self.max_search_workers, 16),
+            latency_target=2.0, metrics=self.metrics, adaptive=adaptive
+        )
+        self.breaker = HostCircuitBreaker(metrics=self.metrics)
+
+    def fork(self, reporter=None):
+        """An extractor with its own settings, API key, metrics, profiler and concurrency limits that shares
+        this one's HTTP session, rate limiter, caches, stores, worker processes and per-host pacing
+
+        For a server with several users: each one changes the settings of their own fork only.
+        """
+        forked = copy.copy(self)
+        forked.metrics = PipelineMetrics()
+        forked.profiler = None
+        forked._make_controls(self.fetch_control.adaptive)
+        forked.robots = self.robots.view(forked.metrics)
+        forked.pacer = self.pacer.view(forked.robots if self.respect_robots else None)
+        forked.report = reporter or self.report
+        return forked
+
+    def set_reporter(self, reporter):
+        self.report = reporter or log_reporter
+
+    def set_profiler(self, profiler):
+        self.profiler = profiler
+
+    def _submit(self, executor, fn, *args):
+        """executor.submit, profiling the call when a run is being profiled"""
+        return executor.submit(self.profiler.wrap(fn) if self.profiler else fn, *args)
+
+    def set_api_key(self, api_key):
+        self.serper_api_key = api_key
+
+    def set_serper_url(self, url=None):
+        self.serper_url = url or SERPER_SEARCH_URL
+
+    def set_rate_limiter(self, rate_limiter):
+        """Pace Serper requests with another limiter, e.g. one shared by every user of an API key"""
+        self.rate_limiter = rate_limiter
+
+    def set_rate_limit(self, requests_per_second, burst):
+        self.rate_limiter.configure(requests_per_second, burst)
+
+    def set_search_cache(self, enabled=True, refresh=False, ttl_seconds=None):
+        """Toggle the Serper cache; `refresh` skips lookups but still stores fresh responses"""
+        self.use_search_cache = enabled
+        self.refresh_search_cache = refresh
+        if ttl_seconds is not None:
+            self.search_cache_ttl = ttl_seconds
+
+    def set_query_planner(self, enabled=True):
+        """Send search templates by past yield until enough results are found, or always send all of them"""
+        self.plan_queries = enabled
+
+    def set_page_cache(self, enabled=True):
+        self.use_page_cache = enabled
+
+    def set_contact_store(self, enabled=True, skip_known=False, revisit_days=None):
+        """Toggle the contact store; `skip_known` drops known contacts and pages already fully stored"""
+        self.use_contact_store = enabled
+        self.skip_known_contacts = skip_known
+        if revisit_days is not None:
+            self.revisit_pages_after = revisit_days * 24 * 3600
+
+    def set_scrape_engine(self, engine, max_pages=None, parse_workers=None):
+        self.scrape_engine = engine
+        if max_pages is not None:
+            self.max_pages = max_pages
+        if parse_workers is not None:
+            self.parse_workers = parse_workers
+
+    def set_adaptive_concurrency(self, enabled=True):
+        """Adapt requests in flight to latency and errors, or keep the fixed worker counts"""
+        for control in (self.fetch_control, self.async_fetch_control, self.search_control):
+            control.configure(adaptive=enabled)
+
+    @staticmethod
+    def _pool_size(control):
+        """Threads for a pool gated by `control`: enough for the largest limit it may reach"""
+        return control.maximum if control.adaptive else control.initial
+
+    def set_crawl(self, pages_per_domain, max_pages=None, time_budget=None):
+        self.crawl_pages_per_domain = pages_per_domain
+        if max_pages is not None:
+            self.crawl_max_pages = max_pages
+        if time_budget is not None:
+            self.crawl_time_budget = time_budget
+
+    def set_near_duplicates(self, skip=True):
+        """Skip extraction of pages nearly identical to one already extracted in the run, or extract every page"""
+        self.skip_near_duplicates = skip
+
+    def set_politeness(self, respect_robots=True, host_delay=None):
+        """Follow robots.txt rules and Crawl-delay, or only keep host_delay seconds between requests to a host"""
+        self.respect_robots = respect_robots
+        self.pacer.robots = self.robots if respect_robots else None
+        if host_delay is not None:
+            self.pacer.configure(min_delay=host_delay)
+
+    def _serper_search(self, payload):
+        """Send one Serper query, backing off on HTTP 429 and transient errors"""
+        headers = {
+            "X-API-KEY": self.serper_api_key,
+            "Content-Type": "application/json"
+        }
+
+        with self.metrics.time('search'):
+            return self._serper_request(payload, headers)
+
+    def _serper_request(self, payload, headers):
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            with self.search_control.request() as slot:
+                response = self.session.post(self.serper_url, json=payload, headers=headers, timeout=30)
+                slot.status = response.status_code
+
+            if response.status_code == 429 or response.status_code >= 500:
+                self.metrics.count('search_rate_limited' if response.status_code == 429 else 'search_server_errors')
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+
+                # Honour Retry-After when given (within the backoff cap), otherwise exponential backoff with jitter
+                try:
+                    delay = min(MAX_RETRY_DELAY, max(0.0, float(response.headers.get('Retry-After', ''))))
+                except ValueError:
+                    delay = min(MAX_RETRY_DELAY, 2 ** attempt) + random.uniform(0, 0.5)
+
+                if response.status_code == 429:
+                    self.rate_limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+                self.metrics.count('search_retries')
+                continue
+
+            response.raise_for_status()
+            return response.json().get("organic", [])
+
+        return []
+
+    def search_companies_and_employees(self, industry, job_role, city, country, num_results=10):
+        """Search for companies and their employees using multiple search strategies"""
+        with self.metrics.time('search_total'):
+            return self._search_companies_and_employees(industry, job_role, city, country, num_results)
+
+    def _search_companies_and_employees(self, industry, job_role, city, country, num_results):
+        if not self.serper_api_key:
+            self.report("error", "Please provide Serper.dev API key")
+            return []
+
+        # Enhanced search queries for finding real employees, best expected yield first when planning
+        planner = self.query_planner
+        yields = planner.stats.yields()
+        templates = planner.order(yields) if self.plan_queries else QUERY_TEMPLATES
+        target = planner.target_urls(yields, num_results, self.max_pages) if self.plan_queries else None
+        queries = {
+            name: template.format(industry=industry, job_role=job_role, city=city, country=country)
+            for name, template in templates
+        }
+
+        gl = "in" if country.lower() == "india" else "us"
+
+        seen_urls = set()
+        unique_results = []
+
+        def merge(name, results):
+            # Merge and remove duplicates; http/https, www., fragments, trailing slashes and tracking
+            # parameters don't make a page different. Returns how many results were new.
+            new = 0
+            for result in results:
+                url = result.get('link', '')
+                if not url:
+                    continue
+                key = canonical_url(url)
+                if key not in seen_urls:
+                    seen_urls.add(key)
+                    unique_results.append(dict(result, query_template=name))
+                    new += 1
+            return new
+
+        # (template, result page) still to send; further pages only once every template has been tried
+        pending = [(name, 1) for name, _ in templates]
+        next_pages = []
+        sent = 0
+
+        while pending:
+            # Without a target every template goes out at once; with one, only as many as are expected
+            # to bring in the missing results
+            wave = []
+            expected = 0.0
+            while pending and (target is None or not wave or len(unique_results) + expected < target):
+                name, page = pending.pop(0)
+                wave.append((name, page))
+                expected += planner.expected(yields, name)[0]
+
+            payloads = []
+            for name, page in wave:
+                payload = {"q": queries[name], "num": RESULTS_PER_QUERY, "gl": gl}
+                if page > 1:
+                    payload["page"] = page
+                payloads.append(payload)
+
+            responses = self._search_wave(payloads, [f"{name} (page {page})" if page > 1 else name
+                                                     for name, page in wave])
+            sent += len(wave)
+
+            # Merged in plan order, so the results don't depend on which query finished first
+            for (name, page), results in zip(wave, responses):
+                if results is None:
+                    continue
+                planner.stats.record_query(name, len(results), merge(name, results))
+                if target is not None and len(results) >= RESULTS_PER_QUERY and page < planner.max_pages_per_template:
+                    next_pages.append((name, page + 1))
+
+            if target is not None and len(unique_results) >= target:
+                break
+            if not pending and next_pages:
+                # Every template has been tried; ask for more results from those that filled their page
+                pending, next_pages = next_pages, []
+                self.metrics.count('search_pages_requested', len(pending))
+
+        if pending or next_pages:
+            skipped = sum(1 for _, page in pending + next_pages if page == 1)
+            if skipped:
+                self.metrics.count('search_queries_skipped', skipped)
+            self.metrics.decision('search_planner', 'stop', f'{len(unique_results)} of {target} results',
+                                  queries=sent, skipped=skipped)
+
+        return unique_results
+
+    def _search_wave(self, payloads, labels):
+        """Results for each payload (None where the query failed), from the cache where possible"""
+        responses = [None] * len(payloads)
+
+        # Serve what we can from the cache before touching the network
+        pending = []
+        for i, payload in enumerate(payloads):
+            cached = None
+            if self.use_search_cache and not self.refresh_search_cache:
+                cached = self.search_cache.get(payload, self.search_cache_ttl)
+            if cached is None:
+                pending.append(i)
+            else:
+                self.metrics.count('search_cache_hits')
+                responses[i] = cached
+
+        if not pending:
+            return responses
+
+        # Fan the queries out concurrently; the token bucket keeps us inside the quota
+        with ThreadPoolExecutor(max_workers=max(1, min(self._pool_size(self.search_control), len(pending)))) as executor:
+            future_to_index = {
+                self._submit(executor, self._serper_search, payloads[i]): i
+                for i in pending
+            }
+
+            for future in as_completed(future_to_index):
+                i = future_to_index[future]
+                try:
+                    results = future.result()
+                except requests.exceptions.RequestException as e:
+                    self.metrics.count('search_failures')
+                    self.report("warning", f"Error with query {labels[i]}: {str(e)}")
+                    continue
+
+                self.report("info", f"Finished query {labels[i]}: {payloads[i]['q'][:50]}...")
+
+                if self.use_search_cache:
+                    self.search_cache.set(payloads[i], results)
+                responses[i] = results
+
+        return responses
+
+    def extract_emails_from_text(self, text):
+        """Extract email addresses from text"""
+        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+        emails = re.findall(email_pattern, text)
+        # Filter out common non-employee emails
+        filtered_emails = []
+        exclude_patterns = ['noreply', 'no-reply', 'support', 'info', 'admin', 'webmaster', 'contact']
+
+        for email in emails:
+            if not any(pattern in email.lower() for pattern in exclude_patterns):
+                filtered_emails.append(email)
+
+        return filtered_emails
+
+    def extract_phone_numbers(self, text, country=None):
+        """Extract valid phone numbers from text as E.164 strings, reading local numbers as `country`'s"""
+        return [phone.number for phone in find_phones(text, region_for_country(country))]
+
+    def extract_names_from_text(self, text, job_role):
+        """Extract potential employee names from text"""
+        # Look for patterns like "John Doe, CTO" or "Jane Smith - CEO"
+        name_patterns = [
+            rf'([A-Z][a-z]+\s+[A-Z][a-z]+)[\s,\-–]+{re.escape(job_role)}',
+            rf'{re.escape(job_role)}[\s,\-–:]+([A-Z][a-z]+\s+[A-Z][a-z]+)',
+            r'([A-Z][a-z]+\s+[A-Z][a-z]+)[\s,\-–]+(Chief\s+Technology\s+Officer|Chief\s+Executive\s+Officer|Chief\s+Financial\s+Officer)',
+            r'(Mr\.?\s+|Ms\.?\s+|Dr\.?\s+)?([A-Z][a-z]+\s+[A-Z][a-z]+)[\s,\-–]+(CTO|CEO|CFO|VP|Director|Manager)'
+        ]
+
+        names = []
+        for pattern in name_patterns:
+            matches = re.findall(pattern, text, re.IGNORECASE)
+            for match in matches:
+                if isinstance(match, tuple):
+                    # Take the name part from tuple
+                    name = match[1] if len(match) > 1 and match[1] else match[0]
+                else:
+                    name = match
+
+                if name and len(name.split()) >= 2:
+                    names.append(name.strip())
+
+        return list(set(names))
+
+    def parse_html(self, content, encoding=None):
+        """Turn raw HTML into cleaned text and the page title"""
+        with self.metrics.time('parse'):
+            return html_to_text(content, self.parser_backend, encoding)
+
+    def _check_response(self, url, entry, status):
+        """Raise for failed fetches and count revalidated cache hits"""
+        if status == 304 and entry:
+            self.page_cache.mark_revalidated(url, entry)
+        elif status is None or status >= 400:
+            raise requests.exceptions.HTTPError(f"{status} Error for url: {url}")
+
+    def _store_parsed(self, url, entry, status, headers, body, text, title):
+        """Put freshly parsed text in the page cache"""
+        if not self.use_page_cache:
+            return
+        if status == 304 and entry:
+            if entry['text'] is None:
+                self.page_cache.update_text(url, text, title)
+        else:
+            self.page_cache.store(url, headers, body, text, title)
+
+    def _page_from_response(self, url, entry, status, headers, body):
+        """Turn a fetched (or revalidated) page into cleaned text and title"""
+        self._check_response(url, entry, status)
+
+        # Not modified: skip the download, and the parse too when the text was cached
+        if status == 304 and entry:
+            if entry['text'] is not None:
+                return entry['text'], entry['title'] or ''
+            text, title = self.parse_html(entry['body'])
+        else:
+            text, title = self.parse_html(body, charset_from_content_type(headers.get('Content-Type')))
+
+        self._store_parsed(url, entry, status, headers, body, text, title)
+        return text, title
+
+    def _fetch_robots(self, url):
+        """(status, body) of a robots.txt, for the robots cache"""
+        # Error pages are read too, so the connection goes back to the pool for the page fetch that follows
+        with self.session.get(url, timeout=ROBOTS_TIMEOUT, stream=True) as response:
+            return response.status_code, read_limited(response.iter_content(64 * 1024), MAX_ROBOTS_BYTES)
+
+    def _fetch_raw(self, url, timeout=10):
+        """Download a page without parsing it: (cache entry, status, headers, body)"""
+        if self.respect_robots:
+            self.robots.rules_for(url).check(url)
+        entry = self.page_cache.get(url) if self.use_page_cache else None
+
+        with self.fetch_control.request(lambda outcome: self.breaker.record(url, outcome)):
+            # Checked once a slot is free, so failures that came in meanwhile are taken into account
+            self.breaker.check(url)
+            with self.metrics.time('connect'):
+                response = self.session.get(url, timeout=self.fetch_control.timeout(timeout),
+                                            headers=PageCache.conditional_headers(entry), stream=True)
+
+            # Stream the body so oversized or non-HTML responses never sit fully in memory
+            with response:
+                body = b''
+                if response.status_code == 304:
+                    self.metrics.count('pages_not_modified')
+                else:
+                    response.raise_for_status()
+
+                    content_type = response.headers.get('Content-Type', '')
+                    if not is_html_content_type(content_type):
+                        raise ValueError(f"Skipped non-HTML content ({content_type})")
+
+                    with self.metrics.time('download'):
+                        body = read_limited(response.iter_content(64 * 1024), self.max_page_bytes)
+                    self.metrics.add_bytes(len(body))
+
+        return entry, response.status_code, response.headers, body
+
+    def _fetch_shared(self, url, timeout=10):
+        """_fetch_raw, joining a download of the same page that is already in flight"""
+        response, shared = self._flights.do(('fetch', canonical_url(url)), lambda: self._fetch_raw(url, timeout))
+        if shared:
+            self.metrics.count('fetches_shared')
+        return response
+
+    def _fetch_and_parse(self, url, timeout):
+        entry, status, headers, body = self._fetch_raw(url, timeout)
+        text, title = self._page_from_response(url, entry, status, headers, body)
+        return entry, status, headers, body, text, title
+
+    def scrape_website_content(self, url, timeout=10, run=None):
+        """Scrape content from a website, revalidating against the page cache"""
+        try:
+            page, shared = self._flights.do(('page', canonical_url(url)), lambda: self._fetch_and_parse(url, timeout))
+            if shared:
+                self.metrics.count('fetches_shared')
+
+            entry, status, headers, body, text, title = page
+            if run is not None and run.frontier is not None:
+                self._discover_links(run.frontier, url, entry, status, headers, body)
+            return text, title
+
+        except Exception as e:
+            self._page_failed(url, e)
+            return "", ""
+
+    def _discover_links(self, frontier, url, entry, status, headers, body):
+        """Queue the page's same-site team/about/contact links for the crawl wave"""
+        with self.metrics.time('links'):
+            if status == 304 and entry:
+                frontier.discover(url, entry['body'])
+            else:
+                frontier.discover(url, body, charset_from_content_type(headers.get('Content-Type')))
+
+    def _page_failed(self, url, error, action="scrape"):
+        reason = self.metrics.page_failed(error)
+        self.report("warning", f"Could not {action} {url} ({reason}): {str(error)}")
+
+    def extract_company_info(self, url, text, title='', country=None):
+        """Extract company information from website content; local phone numbers are read as `country`'s"""
+        company_info = {
+            'name': '',
+            'domain': '',
+            'address': '',
+            'phone': '',
+            'phone_type': '',
+            'employees_count': ''
+        }
+
+        # Extract domain
+        domain = urlparse(url).netloc.replace('www.', '')
+        company_info['domain'] = domain
+
+        # Extract company name from title
+        if title:
+            company_info['name'] = title.split('|')[0].split('-')[0].strip()
+
+        # Extract address patterns
+        address_patterns = [
+            r'Address[:\s]+([^,\n]+(?:,\s*[^,\n]+)*)',
+            r'Location[:\s]+([^,\n]+(?:,\s*[^,\n]+)*)',
+            r'Office[:\s]+([^,\n]+(?:,\s*[^,\n]+)*)'
+        ]
+
+        for pattern in address_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                company_info['address'] = match.group(1).strip()
+                break
+
+        # Extract phone
+        phones = find_phones(text, region_for_country(country))
+        if phones:
+            company_info['phone'], company_info['phone_type'] = phones[0]
+
+        # Try to extract employee count
+        employee_patterns = [
+            r'(\d+[\+,]?\d*)\s*employees',
+            r'team\s+of\s+(\d+[\+,]?\d*)',
+            r'(\d+[\+,]?\d*)\s*people'
+        ]
+
+        for pattern in employee_patterns:
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                company_info['employees_count'] = match.group(1)
+                break
+
+        return company_info
+
+    def process_search_result(self, result, job_role, industry, city, country, run=None):
+        """Process a single search result to extract employee data"""
+        url = result.get('link', '')
+
+        # Skip if it's a LinkedIn profile URL (we'll handle these separately)
+        if 'linkedin.com/in/' in url:
+            return self.process_linkedin_profile(result, job_role, industry, city, country)
+
+        with self.metrics.time('page'):
+            # Scrape the website
+            text_content, page_title = self.scrape_website_content(url, timeout=self.fetch_timeout, run=run)
+
+            return self.build_employee_records(result, text_content, page_title, job_role, industry, city, country,
+                                               run)
+
+    def build_employee_records(self, result, text_content, page_title, job_role, industry, city, country, run=None):
+        """Extract employee records from an already fetched page; a page that failed (no text) isn't counted"""
+        if not text_content:
+            return []
+        url = result.get('link', '')
+        if self._is_near_duplicate(run, url, text_content):
+            return []
+        company_info = self._known_company_info(run, url)
+        with self.metrics.time('extract'):
+            records, company_info = build_page_records(result, text_content, page_title, job_role, industry, city,
+                                                       country, company_info)
+        self._remember_company_info(run, url, company_info)
+        self._count_page(result, records)
+        return records
+
+    def _is_near_duplicate(self, run, url, text_content):
+        """Fingerprint the page; True if an earlier page of the run had nearly the same text"""
+        if run is None or run.near_duplicates is None or not text_content:
+            return False
+        with self.metrics.time('fingerprint'):
+            value = fingerprint(text_content)
+        if value is None:
+            return False
+        original = run.near_duplicates.check_and_add(value, url)
+        if original is None:
+            return False
+        self._near_duplicate_skipped(run, url, original)
+        return True
+
+    def _near_duplicate_skipped(self, run, url, original, extracted=False):
+        # What the skipped extraction would have cost, going by the pages extracted so far; nothing was
+        # saved when a worker process had extracted the page already
+        seconds = 0.0 if extracted else self.metrics.mean('extract')
+        self.metrics.count('near_duplicate_pages_skipped')
+        if not extracted:
+            self.metrics.observe('extract_skipped', seconds)
+        run.near_duplicate_skipped(seconds)
+        logger.debug("Skipped extraction of %s: near-duplicate of %s", url, original)
+
+    def _known_company_info(self, run, url):
+        company_info = run.company_info_for(url) if run is not None else None
+        if company_info is not None:
+            self.metrics.count('company_info_reused')
+        return company_info
+
+    @staticmethod
+    def _remember_company_info(run, url, company_info):
+        if run is not None and company_info is not None:
+            run.remember_company_info(url, company_info)
+
+    def _count_page(self, result, records):
+        source = 'crawl' if result.get('crawled_from') else 'website'
+        self.metrics.count_page(source)
+        self.metrics.count_records(source, len(records))
+
+    def process_linkedin_profile(self, result, job_role, industry, city, country):
+        """Process LinkedIn profile results"""
+        url = result.get('link', '')
+        title = result.get('title', '')
+        snippet = result.get('snippet', '')
+
+        # Extract name from LinkedIn title
+        name_match = re.search(r'^([^-|]+)', title)
+        if not name_match:
+            return []
+
+        name = name_match.group(1).strip()
+        first_name = name.split()[0] if name.split() else ''
+
+        # Extract company from snippet or title
+        company_patterns = [
+            r'at\s+([^-|,\n]+)',
+            r'@\s+([^-|,\n]+)',
+            r'-\s+([^|,\n]+)'
+        ]
+
+        company_name = ''
+        for pattern in company_patterns:
+            match = re.search(pattern, title + ' ' + snippet)
+            if match:
+                company_name = match.group(1).strip()
+                break
+
+        if not company_name:
+            company_name = f"{industry} Company"
+
+        # Generate domain from company name
+        domain = company_name.lower().replace(' ', '').replace('-', '') + '.com'
+
+        employee_record = EmployeeRecord(
+            business_name=company_name,
+            num_employees='Unknown',
+            contact_person=name,
+            first_name=first_name,
+            corporate_email=f"{first_name.lower()}@{domain}",
+            other_emails=f"info@{domain}",
+            website=f"www.{domain}",
+            phone='Unknown',
+            phone_type='Unknown',
+            street_address=f"{city}, {country}",
+            zip_code='Unknown',
+            state='Unknown',
+            city=city
+        )
+
+        self.metrics.count_records('linkedin')
+        return [employee_record]
+
+    def extract_company_from_url(self, url):
+        """Extract company name from URL domain"""
+        return extract_company_from_url(url)
+
+    def extract_real_employees_data(self, search_results, industry, job_role, city, country, num_results=10,
+                                    engine=None):
+        """Extract real employee data from search results using parallel processing"""
+        return list(self.iter_real_employees_data(
+            search_results, industry, job_role, city, country, num_results, engine
+        ))
+
+    def iter_real_employees_data(self, search_results, industry, job_role, city, country, num_results=10,
+                                 engine=None):
+        """Yield deduplicated employee records as pages are processed
+
+        Pending fetches are cancelled as soon as `num_results` unique records have been produced.
+        With the contact store on, each record gets a `contact_status` of 'new' or 'known'.
+        """
+        engine = engine or self.scrape_engine
+        to_process = search_results[:self.max_pages]
+
+        store = self.contact_store if self.use_contact_store else None
+        skip_known = store is not None and self.skip_known_contacts
+        if skip_known:
+            to_process = self._skip_processed_pages(to_process)
+
+        run = RunContext(near_duplicates=NearDuplicateIndex() if self.skip_near_duplicates else None)
+        batches = self._iter_waves(to_process, industry, job_role, city, country, engine, run)
+
+        # Remove duplicates based on normalized name and company (or company domain)
+        seen = set()
+        produced = 0
+        started = time.perf_counter()
+
+        # Contacts per search template, for the query planner; crawled pages count for the page they came from
+        template_of = {result.get('link'): result.get('query_template') for result in to_process}
+        template_contacts = Counter()
+
+        try:
+            for result, employees in batches:
+                for emp in employees:
+                    dedupe_started = time.perf_counter()
+                    person, company, domain = contact_keys(emp)
+                    duplicate = (person, company) in seen or (domain and (person, '@' + domain) in seen)
+                    seen.add((person, company))
+                    if domain:
+                        seen.add((person, '@' + domain))
+                    self.metrics.observe('dedupe', time.perf_counter() - dedupe_started)
+                    if duplicate:
+                        self.metrics.count('duplicates_dropped')
+                        continue
+
+                    if store is not None:
+                        with self.metrics.time('contact_store'):
+                            emp['contact_status'] = store.upsert(emp)
+                        self.metrics.count('contacts_' + emp['contact_status'])
+                        if skip_known and emp['contact_status'] == 'known':
+                            self.metrics.count('known_contacts_skipped')
+                            continue
+                    template_contacts[result.get('query_template') or template_of.get(result.get('crawled_from'))] += 1
+                    yield emp
+
+                    produced += 1
+                    self.metrics.count('records_emitted')
+                    if produced >= num_results:
+                        self.metrics.count('runs_stopped_early')
+                        return
+
+                # Only pages whose records were all stored can be skipped by later campaigns
+                if store is not None and employees and 'linkedin.com/in/' not in result.get('link', ''):
+                    store.mark_page(result.get('link', ''), len(employees))
+        finally:
+            batches.close()
+            self.metrics.observe('run', time.perf_counter() - started)
+            self.query_planner.stats.record_contacts(template_contacts)
+            if run.near_duplicates_skipped:
+                self.report("info", f"Skipped {run.near_duplicates_skipped} near-duplicate pages "
+                                    f"(about {run.extract_seconds_saved:.2f}s of extraction)")
+
+    def _skip_processed_pages(self, search_results):
+        """Drop results whose page was fully stored in a recent run"""
+        processed = self.contact_store.processed_pages(
+            [result.get('link', '') for result in search_results], self.revisit_pages_after
+        )
+        if not processed:
+            return search_results
+        self.metrics.count('processed_pages_skipped', len(processed))
+        return [result for result in search_results if result.get('link', '') not in processed]
+
+    def _iter_batches(self, search_results, industry, job_role, city, country, engine, run=None):
+        """(result, records) batches from one list of results on the chosen engine"""
+        if self.parse_workers:
+            # Fetch in threads/async tasks, parse and extract in worker processes
+            fetched = self._iter_fetched_async(search_results) if engine == 'async' else \
+                self._iter_fetched_threaded(search_results)
+            return self._iter_parsed_in_processes(search_results, fetched, industry, job_role, city, country, run)
+        if engine == 'async':
+            return self._iter_async(search_results, industry, job_role, city, country, run)
+        return self._iter_threaded(search_results, industry, job_role, city, country, run)
+
+    def _iter_waves(self, search_results, industry, job_role, city, country, engine, run):
+        """Search results first, then (when crawling) the best same-site links found on them"""
+        frontier = None
+        if self.crawl_pages_per_domain:
+            frontier = CrawlFrontier(self.crawl_pages_per_domain, self.crawl_max_pages, self.crawl_time_budget)
+            frontier.mark_seen(result.get('link', '') for result in search_results)
+        run.frontier = frontier
+
+        batches = self._iter_batches(search_results, industry, job_role, city, country, engine, run)
+        try:
+            yield from batches
+        finally:
+            batches.close()
+
+        if frontier is None:
+            return
+        follow_ups = frontier.next_wave()
+        self.metrics.count('crawl_pages_queued', len(follow_ups))
+        if not follow_ups:
+            return
+
+        # Crawled pages reuse the company facts of their site but don't look for further links
+        run.frontier = None
+        batches = self._iter_batches(follow_ups, industry, job_role, city, country, engine, run)
+        try:
+            for batch in batches:
+                yield batch
+                # Checked as pages complete; fetches still in flight are bounded by fetch_timeout
+                if frontier.expired():
+                    self.metrics.count('crawl_time_budget_exhausted')
+                    return
+        finally:
+            batches.close()
+
+    def _iter_paced(self, executor, items, url_of, fn, *args):
+        """Submit fn(item, *args) when each item's host may be sent a request; yield (item, future) as they finish
+
+        Items go out across hosts in turn, paced by the HostPacer, so a backlog for one slow or Crawl-delayed
+        host never queues ahead of the other hosts. No more are submitted than fetch_control lets run, so
+        a request goes out when its host's turn comes rather than after waiting for a slot.
+        """
+        queue = HostQueue(self.pacer, items, url_of,
+                          on_skip=lambda item, error: self._page_failed(url_of(item), error))
+        pending = {}
+        try:
+            while queue or pending:
+                slots = self.fetch_control.limit
+                while len(pending) < slots:
+                    item = queue.pop_ready()
+                    if item is None:
+                        break
+                    pending[self._submit(executor, self._paced, url_of(item), fn, item, *args)] = item
+
+                if not pending:
+                    # Nothing left when robots.txt ruled out the rest of the queue
+                    if queue:
+                        time.sleep(queue.wait_time())
+                    continue
+                done, _ = wait(pending, timeout=queue.wait_time() if len(pending) < slots else None,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future
+        finally:
+            # Work that never started gives its host's turn back
+            for future, item in pending.items():
+                if future.cancel():
+                    self.pacer.finish(url_of(item))
+
+    def _paced(self, url, fn, *args):
+        try:
+            return fn(*args)
+        finally:
+            self.pacer.finish(url)
+
+    def _iter_threaded(self, search_results, industry, job_role, city, country, run=None):
+        """Thread-pool engine: each worker fetches and parses one result"""
+        # LinkedIn profiles are read from the search result itself, without a request
+        pages = []
+        for result in self._unique_pages(search_results):
+            if 'linkedin.com/in/' in result.get('link', ''):
+                yield result, self.process_linkedin_profile(result, job_role, industry, city, country)
+            else:
+                pages.append(result)
+
+        executor = ThreadPoolExecutor(max_workers=self._pool_size(self.fetch_control))
+        completed = self._iter_paced(executor, pages, lambda result: result.get('link', ''),
+                                     self.process_search_result, job_role, industry, city, country, run)
+
+        try:
+            for result, future in completed:
+                try:
+                    employees = future.result(timeout=30)
+                except Exception as e:
+                    self._page_failed(result.get('link', ''), e, "process")
+                    continue
+
+                yield result, employees
+        finally:
+            # Drop queued work if the consumer stopped early
+            completed.close()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _iter_async(self, search_results, industry, job_role, city, country, run=None):
+        """Async engine: an event loop keeps many fetches in flight while this thread parses bodies"""
+        for result in search_results:
+            if 'linkedin.com/in/' in result.get('link', ''):
+                yield result, self.process_linkedin_profile(result, job_role, industry, city, country)
+
+        fetched = self._iter_fetched_async(search_results)
+        try:
+            for result, entry, status, headers, body in fetched:
+                url = result['link']
+                try:
+                    text_content, page_title = self._page_from_response(url, entry, status, headers, body)
+                except Exception as e:
+                    self._page_failed(url, e)
+                    continue
+
+                if run is not None and run.frontier is not None:
+                    self._discover_links(run.frontier, url, entry, status, headers, body)
+
+                yield result, self.build_employee_records(
+                    result, text_content, page_title, job_role, industry, city, country, run
+                )
+        finally:
+            fetched.close()
+
+    def _unique_pages(self, search_results):
+        """Results that point to different pages once URLs are canonicalized, first occurrence wins"""
+        seen = set()
+        unique = []
+        for result in search_results:
+            key = canonical_url(result.get('link', ''))
+            if key in seen:
+                self.metrics.count('duplicate_urls_skipped')
+                continue
+            seen.add(key)
+            unique.append(result)
+        return unique
+
+    def _results_to_fetch(self, search_results):
+        """Non-LinkedIn results by URL, one per canonical page"""
+        return {
+            result['link']: result for result in self._unique_pages(search_results)
+            if result.get('link') and 'linkedin.com/in/' not in result['link']
+        }
+
+    def _iter_fetched_threaded(self, search_results):
+        """Download pages on the thread pool, yielding (result, cache entry, status, headers, body)"""
+        result_by_url = self._results_to_fetch(search_results)
+        executor = ThreadPoolExecutor(max_workers=self._pool_size(self.fetch_control))
+        completed = self._iter_paced(executor, list(result_by_url), lambda url: url, self._fetch_shared,
+                                     self.fetch_timeout)
+
+        try:
+            for url, future in completed:
+                try:
+                    entry, status, headers, body = future.result()
+                except Exception as e:
+                    self._page_failed(url, e)
+                    continue
+
+                yield result_by_url[url], entry, status, headers, body
+        finally:
+            completed.close()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _iter_fetched_async(self, search_results):
+        """Download pages on the asyncio engine, yielding (result, cache entry, status, headers, body)"""
+        from async_fetch import AsyncFetcher
+
+        result_by_url = self._results_to_fetch(search_results)
+
+        entries = {}
+        if self.use_page_cache:
+            for url in result_by_url:
+                entries[url] = self.page_cache.get(url)
+
+        fetcher = AsyncFetcher(
+            max_concurrency=self.max_concurrency,
+            per_host_limit=self.per_host_limit,
+            timeout=self.fetch_timeout,
+            headers=self.headers,
+            max_bytes=self.max_page_bytes,
+            accept_content_type=is_html_content_type,
+            control=self.async_fetch_control if self.async_fetch_control.adaptive else None,
+            breaker=self.breaker,
+            pacer=self.pacer,
+            robots=self.robots if self.respect_robots else None
+        )
+        fetches = fetcher.iter_fetch(list(result_by_url), lambda url: PageCache.conditional_headers(entries.get(url)))
+
+        try:
+            for fetched in fetches:
+                if fetched.connect_seconds:
+                    self.metrics.observe('connect', fetched.connect_seconds)
+                if fetched.error is not None:
+                    self._page_failed(fetched.url, fetched.error)
+                    continue
+
+                if fetched.status == 304:
+                    self.metrics.count('pages_not_modified')
+                elif fetched.body:
+                    self.metrics.observe('download', fetched.download_seconds)
+                    self.metrics.add_bytes(len(fetched.body))
+
+                yield result_by_url[fetched.url], entries.get(fetched.url), fetched.status, fetched.headers, \
+                    fetched.body
+        finally:
+            # Closing the fetch generator cancels everything still in flight
+            fetches.close()
+
+    def _get_process_pool(self):
+        """Worker processes for parsing, kept across jobs because starting them is expensive"""
+        # Batch jobs and forks share the pools; one per size, so changing parse_workers never shuts down
+        # a pool another run is still using
+        with self._process_pool_lock:
+            pool = self._process_pools.get(self.parse_workers)
+            if pool is None:
+                # spawn, not fork: the parent may be a multi-threaded Streamlit server
+                pool = self._process_pools[self.parse_workers] = ProcessPoolExecutor(
+                    max_workers=self.parse_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return pool
+
+    def shutdown_workers(self):
+        with self._process_pool_lock:
+            pools = list(self._process_pools.values())
+            self._process_pools.clear()
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _iter_parsed_in_processes(self, search_results, fetched, industry, job_role, city, country, run=None):
+        """Hand downloaded bodies to the process pool and yield (result, records) as the workers finish"""
+        frontier = run.frontier if run is not None else None
+        for result in search_results:
+            if 'linkedin.com/in/' in result.get('link', ''):
+                yield result, self.process_linkedin_profile(result, job_role, industry, city, country)
+
+        pool = self._get_process_pool()
+        pending = {}
+
+        def collect(future):
+            result, entry, status, headers, body = pending.pop(future)
+            url = result['link']
+            try:
+                records, text, title, timings, links, company_info, page_fingerprint = future.result()
+            except Exception as e:
+                self._page_failed(url, e, "process")
+                return result, []
+            for stage, seconds in timings.items():
+                self.metrics.observe(stage, seconds)
+            if links:
+                frontier.add_links(url, links)
+            self._store_parsed(url, entry, status, headers, body, text, title)
+            # Pages without text aren't counted, as in the other engines
+            if not text:
+                return result, []
+            # Checked against the run's index here rather than in the worker; the worker has extracted
+            # a near-duplicate already, its records are only dropped
+            if page_fingerprint is not None:
+                original = run.near_duplicates.check_and_add(page_fingerprint, url)
+                if original is not None:
+                    self._near_duplicate_skipped(run, url, original, extracted=True)
+                    return result, []
+            self._remember_company_info(run, url, company_info)
+            self._count_page(result, records)
+            return result, records
+
+        try:
+            for result, entry, status, headers, body in fetched:
+                url = result['link']
+                try:
+                    self._check_response(url, entry, status)
+                except Exception as e:
+                    self._page_failed(url, e)
+                    continue
+
+                # Workers only get plain data; the cache and Streamlit stay in this process
+                text, title, encoding = None, None, None
+                if status == 304 and entry:
+                    if entry['text'] is not None:
+                        text, title = entry['text'], entry['title'] or ''
+                    if entry['text'] is None or frontier is not None:
+                        body = entry['body']
+                else:
+                    encoding = charset_from_content_type(headers.get('Content-Type'))
+
+                future = pool.submit(process_page, result, body, encoding, text, title, job_role, industry, city,
+                                     country, self.parser_backend, frontier is not None,
+                                     self._known_company_info(run, url),
+                                     run is not None and run.near_duplicates is not None)
+                pending[future] = (result, entry, status, headers, body)
+
+                # Hand back whatever the workers have finished while we were downloading
+                for done in [f for f in pending if f.done()]:
+                    yield collect(done)
+
+            for done in as_completed(list(pending)):
+                yield collect(done)
+        finally:
+            for future in pending:
+                future.cancel()
+            fetched.close()
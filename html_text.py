@@ -0,0 +1,121 @@
+from urllib.parse import urldefrag, urljoin, urlparse
+
+from lxml import etree
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+_DROP_TAGS = ('script', 'style')
+
+
+def clean_text(text):
+    """Collapse page text into single-spaced phrases"""
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+def is_html_content_type(content_type):
+    """True for HTML responses, and for responses that don't declare a type at all"""
+    if not content_type:
+        return True
+    media_type = content_type.split(';')[0].strip().lower()
+    return media_type in HTML_CONTENT_TYPES
+
+
+def charset_from_content_type(content_type):
+    """Charset declared in a Content-Type header, or None to let the parser sniff it"""
+    for param in (content_type or '').split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset' and value.strip():
+            return value.strip().strip('"\'')
+    return None
+
+
+def read_limited(chunks, max_bytes):
+    """Join an iterable of byte chunks, stopping once max_bytes have been read"""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer.extend(chunk)
+        if max_bytes and len(buffer) >= max_bytes:
+            del buffer[max_bytes:]
+            break
+    return bytes(buffer)
+
+
+def soup_html_to_text(content):
+    """Reference parser: full BeautifulSoup tree with the stdlib html.parser"""
+    # Only imported when needed; it is the slowest import on the CLI's startup path
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, 'html.parser')
+
+    title_tag = soup.find('title')
+    title = title_tag.get_text() if title_tag else ''
+
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    return clean_text(soup.get_text()), title
+
+
+def _lxml_root(content, encoding=None):
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+        encoding = 'utf-8'
+
+    parser = etree.HTMLParser(
+        encoding=encoding,
+        remove_comments=True,
+        remove_pis=True,
+        no_network=True,
+        recover=True
+    )
+    return etree.fromstring(content, parser)
+
+
+def lxml_html_to_text(content, encoding=None):
+    """Fast parser: libxml2 builds the tree in C and we only walk its text nodes"""
+    root = _lxml_root(content, encoding)
+    if root is None:
+        return '', ''
+
+    title = root.findtext('.//title') or ''
+
+    # Drop script/style bodies but keep the text that follows them
+    etree.strip_elements(root, *_DROP_TAGS, with_tail=False)
+
+    return clean_text(''.join(root.itertext())), title
+
+
+def html_to_text(content, backend='lxml', encoding=None):
+    """Cleaned text and <title> of an HTML document, falling back to BeautifulSoup if lxml fails"""
+    if backend == 'lxml':
+        try:
+            return lxml_html_to_text(content, encoding)
+        except (etree.LxmlError, ValueError, LookupError):
+            pass
+    return soup_html_to_text(content)
+
+
+def extract_links(content, base_url, encoding=None):
+    """(absolute URL, anchor text) for every http(s) link on a page, fragments removed"""
+    try:
+        root = _lxml_root(content, encoding)
+    except (etree.LxmlError, ValueError, LookupError):
+        return []
+    if root is None:
+        return []
+
+    links = []
+    for anchor in root.iter('a'):
+        href = (anchor.get('href') or '').strip()
+        if not href or href.startswith(('#', 'mailto:', 'tel:', 'javascript:')):
+            continue
+        try:
+            url = urldefrag(urljoin(base_url, href))[0]
+        except ValueError:
+            continue  # malformed href, e.g. a broken IPv6 host
+        if urlparse(url).scheme in ('http', 'https'):
+            links.append((url, ' '.join(''.join(anchor.itertext()).split())[:200]))
+    return links
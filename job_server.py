@@ -0,0 +1,436 @@
+"""Job server: searches submitted over HTTP run on one shared extractor from a persistent queue
+
+    python job_server.py --port 8600 --workers 2
+    JOB_SERVER_URL=http://127.0.0.1:8600 streamlit run app.py
+
+Every job goes through one extractor, so all users share its Serper rate limit, caches, contact store
+and connection pool. A job submitted while an identical one (same industry, job role, city, country
+and number of results) is queued or running is merged into it. Jobs are kept in SQLite; jobs that were
+running when the server stopped are queued again at the next start.
+
+    POST /jobs                       {"industry", "job_role", "city", "country"[, "num_results"]}
+    GET  /jobs/<id>                  status, records so far and jobs queued ahead
+    GET  /jobs/<id>/records?offset=N records from the N-th on
+    GET  /metrics                    extractor metrics in Prometheus text format
+    GET  /health                     number of jobs by status
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from batch import JOB_FIELDS, parse_job
+from sqlite_store import open_database
+
+logger = logging.getLogger('job_server')
+
+
+def job_key(job):
+    """Same key for submissions that would produce the same records"""
+    fields = [job[field].casefold() if isinstance(job[field], str) else job[field] for field in JOB_FIELDS]
+    return hashlib.sha1(json.dumps(fields).encode('utf-8')).hexdigest()[:16]
+
+
+class JobQueue:
+    """SQLite queue of jobs and the records they produced
+
+    A partial unique index allows one queued or running job per key. The file belongs to one server
+    process: at start, jobs left running are taken to be interrupted and queued again.
+    """
+
+    def __init__(self, path='.cache/jobs.sqlite3'):
+        self.path = path
+
+        self._conn, self._lock = open_database(path, synchronous='NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY,'
+            ' key TEXT NOT NULL,'
+            ' params TEXT NOT NULL,'
+            ' status TEXT NOT NULL,'
+            ' submissions INTEGER NOT NULL DEFAULT 1,'
+            ' search_results INTEGER,'
+            ' records INTEGER NOT NULL DEFAULT 0,'
+            ' error TEXT,'
+            ' created_at REAL NOT NULL,'
+            ' started_at REAL,'
+            ' finished_at REAL)'
+        )
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_in_flight ON jobs (key) WHERE status IN ('queued', 'running')"
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS job_records ('
+            ' job_id TEXT NOT NULL,'
+            ' seq INTEGER NOT NULL,'
+            ' record TEXT NOT NULL,'
+            ' PRIMARY KEY (job_id, seq))'
+        )
+        self._conn.commit()
+
+    def submit(self, job):
+        """Queue a job, or join the identical one already queued or running; returns (job id, merged)"""
+        key = job_key(job)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE key = ? AND status IN ('queued', 'running')", (key,)
+            ).fetchone()
+            if row:
+                self._conn.execute('UPDATE jobs SET submissions = submissions + 1 WHERE id = ?', (row[0],))
+                self._conn.commit()
+                return row[0], True
+
+            job_id = secrets.token_hex(8)
+            self._conn.execute(
+                "INSERT INTO jobs (id, key, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, key, json.dumps({field: job[field] for field in JOB_FIELDS}), time.time())
+            )
+            self._conn.commit()
+            return job_id, False
+
+    def claim(self):
+        """Oldest queued job, marked running, as (id, params); None when nothing is queued"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, params FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), row[0])
+            )
+            self._conn.commit()
+            return row[0], json.loads(row[1])
+
+    def set_search_results(self, job_id, count):
+        with self._lock:
+            self._conn.execute('UPDATE jobs SET search_results = ? WHERE id = ?', (count, job_id))
+            self._conn.commit()
+
+    def add_record(self, job_id, record):
+        with self._lock:
+            seq = self._conn.execute('SELECT records FROM jobs WHERE id = ?', (job_id,)).fetchone()[0]
+            self._conn.execute('INSERT INTO job_records (job_id, seq, record) VALUES (?, ?, ?)',
+                               (job_id, seq, json.dumps(dict(record), ensure_ascii=False)))
+            self._conn.execute('UPDATE jobs SET records = records + 1 WHERE id = ?', (job_id,))
+            self._conn.commit()
+
+    def finish(self, job_id, error=None):
+        with self._lock:
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                ('failed' if error else 'done', error, time.time(), job_id)
+            )
+            self._conn.commit()
+
+    def requeue(self, job_id=None):
+        """Put a running job (or every running job) back in the queue, dropping its partial records"""
+        with self._lock:
+            where, args = ("WHERE status = 'running'", ()) if job_id is None else \
+                ("WHERE status = 'running' AND id = ?", (job_id,))
+            ids = [row[0] for row in self._conn.execute('SELECT id FROM jobs ' + where, args)]
+            for requeued in ids:
+                self._conn.execute('DELETE FROM job_records WHERE job_id = ?', (requeued,))
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', search_results = NULL, records = 0, started_at = NULL"
+                    " WHERE id = ?", (requeued,)
+                )
+            self._conn.commit()
+            return len(ids)
+
+    def get(self, job_id):
+        """The job as a dict, with `queued_ahead` for queued jobs; None for an unknown id"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, params, status, submissions, search_results, records, error, created_at, started_at,'
+                ' finished_at FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = dict(zip(('id', 'params', 'status', 'submissions', 'search_results', 'records', 'error',
+                            'created_at', 'started_at', 'finished_at'), row))
+            job['params'] = json.loads(job['params'])
+            job['queued_ahead'] = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?", (job['created_at'],)
+            ).fetchone()[0] if job['status'] == 'queued' else 0
+            return job
+
+    def records(self, job_id, offset=0, limit=1000):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT record FROM job_records WHERE job_id = ? AND seq >= ? ORDER BY seq LIMIT ?',
+                (job_id, offset, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def prune(self, max_age):
+        """Delete finished jobs, and their records, that ended more than `max_age` seconds ago"""
+        cutoff = time.time() - max_age
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (cutoff,)
+            )]
+            for job_id in ids:
+                self._conn.execute('DELETE FROM job_records WHERE job_id = ?', (job_id,))
+                self._conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+            self._conn.commit()
+            return len(ids)
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return dict(rows)
+
+
+class JobRunner:
+    """Worker threads running queued jobs on one extractor"""
+
+    def __init__(self, extractor, queue, workers=2, poll_interval=1.0):
+        self.extractor = extractor
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def start(self):
+        requeued = self.queue.requeue()
+        if requeued:
+            logger.info("Queued %d interrupted jobs again", requeued)
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=30):
+        """Stop taking jobs; running jobs stop at their next record and are queued again"""
+        self._stopping.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, job):
+        job_id, merged = self.queue.submit(job)
+        if not merged:
+            self._wake.set()
+        return job_id, merged
+
+    def _work(self):
+        while not self._stopping.is_set():
+            claimed = self.queue.claim()
+            if claimed is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._run(*claimed)
+
+    def _run(self, job_id, job):
+        started = time.monotonic()
+        try:
+            search_results = self.extractor.search_companies_and_employees(
+                job['industry'], job['job_role'], job['city'], job['country'], job['num_results']
+            )
+            self.queue.set_search_results(job_id, len(search_results))
+            records = self.extractor.iter_real_employees_data(
+                search_results, job['industry'], job['job_role'], job['city'], job['country'], job['num_results']
+            )
+            try:
+                for record in records:
+                    if self._stopping.is_set():
+                        self.queue.requeue(job_id)
+                        return
+                    self.queue.add_record(job_id, record)
+            finally:
+                records.close()
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e)
+            self.queue.finish(job_id, str(e) or type(e).__name__)
+            self.extractor.metrics.count('jobs_failed')
+            return
+
+        self.queue.finish(job_id)
+        self.extractor.metrics.count('jobs_done')
+        logger.info("Job %s: %s / %s / %s, %s done in %.0fs", job_id, job['job_role'], job['industry'],
+                    job['city'], job['country'], time.monotonic() - started)
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip('/') != '/jobs':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            job = parse_job(json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}'))
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        job_id, merged = self.server.runner.submit(job)
+        self._send_json(202, dict(self.server.runner.queue.get(job_id), merged=merged))
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        if parts == ['metrics']:
+            self._send(200, 'text/plain; version=0.0.4', self.server.runner.extractor.metrics.to_prometheus())
+        elif parts == ['health']:
+            self._send_json(200, {'jobs': self.server.runner.queue.stats()})
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            job = self.server.runner.queue.get(parts[1])
+            if job is None:
+                self._send_json(404, {'error': 'unknown job'})
+            else:
+                self._send_json(200, job)
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'records':
+            query = parse_qs(url.query)
+            try:
+                offset = int(query.get('offset', ['0'])[0])
+            except ValueError:
+                self._send_json(400, {'error': 'offset is not a number'})
+                return
+            self._send_json(200, {'records': self.server.runner.queue.records(parts[1], offset)})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def _send_json(self, status, data):
+        self._send(status, 'application/json', json.dumps(data, ensure_ascii=False))
+
+    def _send(self, status, content_type, text):
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class JobServer(ThreadingHTTPServer):
+    """HTTP API in front of a JobRunner"""
+
+    daemon_threads = True
+
+    def __init__(self, runner, host='127.0.0.1', port=8600):
+        super().__init__((host, port), JobHandler)
+        self.runner = runner
+        self.port = self.server_address[1]
+
+
+class JobClient:
+    """Submits jobs to a job server and reads them back, for the Streamlit app"""
+
+    def __init__(self, base_url, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise RuntimeError(f"Job server at {self.base_url} is unreachable: {e}") from e
+        if response.status_code >= 400:
+            try:
+                message = response.json().get('error')
+            except ValueError:
+                message = response.text
+            raise RuntimeError(f"Job server: {message or response.status_code}")
+        return response.json()
+
+    def submit(self, industry, job_role, city, country, num_results=10):
+        """The submitted job, with `merged` set when it joined an identical queued or running job"""
+        return self._request('POST', '/jobs', json=dict(
+            industry=industry, job_role=job_role, city=city, country=country, num_results=num_results
+        ))
+
+    def job(self, job_id):
+        return self._request('GET', f'/jobs/{job_id}')
+
+    def records(self, job_id, offset=0):
+        return self._request('GET', f'/jobs/{job_id}/records', params={'offset': offset})['records']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run extraction jobs submitted over HTTP on a shared extractor")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--workers', type=int, default=2, help="Jobs to run at the same time")
+    parser.add_argument('--queue', default=os.getenv('JOB_QUEUE_PATH', '.cache/jobs.sqlite3'),
+                        help="SQLite file of jobs and their records (default: JOB_QUEUE_PATH)")
+    parser.add_argument('--keep-days', type=float, default=7, help="Delete finished jobs after this many days")
+    parser.add_argument('--api-key', help="Serper.dev API key (default: SERPER_API_KEY)")
+    parser.add_argument('--rate', type=float, default=5.0, help="Serper requests per second, for all jobs")
+    parser.add_argument('--burst', type=int, default=5, help="Serper burst size")
+    parser.add_argument('--engine', choices=['threads', 'async'], default='threads', help="Scraping engine")
+    parser.add_argument('--max-pages', type=int, default=20, help="Search results to scrape per job")
+    parser.add_argument('--parse-workers', type=int, default=0, help="Parser processes (0 = parse on fetch threads)")
+    parser.add_argument('--crawl-pages', type=int, default=0,
+                        help="Extra team/about/contact pages to fetch per site (0 = no crawl)")
+    parser.add_argument('--skip-known', action='store_true',
+                        help="Leave out contacts already in the contact store and skip pages fully stored before")
+    parser.add_argument('--verbose', '-v', action='store_true', help="Log every request and scraping warning")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.ERROR,
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s'
+    )
+    logger.setLevel(logging.INFO)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    from extractor import RealEmployeeDataExtractor
+
+    extractor = RealEmployeeDataExtractor(
+        requests_per_second=args.rate, burst=args.burst, scrape_engine=args.engine, max_pages=args.max_pages,
+        parse_workers=args.parse_workers, crawl_pages_per_domain=args.crawl_pages
+    )
+    if args.api_key:
+        extractor.set_api_key(args.api_key)
+    if not extractor.serper_api_key:
+        logger.error("No Serper.dev API key: set SERPER_API_KEY or pass --api-key")
+        return 2
+    extractor.set_contact_store(True, args.skip_known)
+
+    queue = JobQueue(args.queue)
+    pruned = queue.prune(args.keep_days * 24 * 3600)
+    if pruned:
+        logger.info("Deleted %d finished jobs older than %g days", pruned, args.keep_days)
+
+    runner = JobRunner(extractor, queue, args.workers)
+    server = JobServer(runner, args.host, args.port)
+    runner.start()
+    logger.info("Job server on http://%s:%d with %d workers", args.host, server.port, args.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping; running jobs are queued again for the next start")
+    finally:
+        server.server_close()
+        runner.stop()
+        extractor.shutdown_workers()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
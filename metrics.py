@@ -0,0 +1,349 @@
+import bisect
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_HELP = {
+    'search': "One Serper request, retries included",
+    'search_total': "All queries of one search, cache lookups included",
+    'connect': "DNS, connect and time to response headers",
+    'download': "Reading a page body",
+    'parse': "HTML to text",
+    'extract': "Names, emails, phones and company facts from one page",
+    'page': "One search result end to end",
+    'links': "Finding same-site links to crawl on one page",
+    'dedupe': "Duplicate check for one record",
+    'contact_store': "Looking up and storing one record in the contact store",
+    'robots': "Fetching and parsing one site's robots.txt",
+    'run': "One extraction run, from first fetch to the last record",
+}
+
+
+def failure_reason(error):
+    """Short label for why a page could not be used"""
+    if isinstance(error, requests.exceptions.Timeout) or isinstance(error, TimeoutError):
+        return 'timeout'
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = getattr(error.response, 'status_code', None)
+        if status is None:
+            # Raised by _check_response: "<status> Error for url: ..."
+            status = str(error).split(' ', 1)[0]
+        return f'http_{str(status)[0]}xx' if str(status)[:1].isdigit() else 'http_error'
+    if isinstance(error, (requests.exceptions.ConnectionError, ConnectionError, OSError)):
+        return 'connection'
+    if isinstance(error, ValueError) and 'non-HTML' in str(error):
+        return 'non_html'
+
+    # aiohttp and circuit breaker errors are classified by name so this module imports neither
+    name = type(error).__name__
+    if name == 'CircuitOpenError':
+        return 'circuit_open'
+    if name == 'RobotsDisallowedError':
+        return error.reason
+    if 'Timeout' in name:
+        return 'timeout'
+    if name == 'ClientResponseError':
+        return f'http_{str(getattr(error, "status", ""))[:1]}xx'
+    if 'Connect' in name or 'Connection' in name or 'Disconnected' in name:
+        return 'connection'
+    return 'other'
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as in the Prometheus exposition format"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / count)
+            seen += count
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max,
+            'buckets': dict(zip([str(b) for b in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+
+class PipelineMetrics:
+    """Thread-safe per-stage timings and counters for the extraction pipeline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Current values (e.g. concurrency limits) rather than totals, so reset() keeps them
+        self.gauges = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.stages = {}
+            self.bytes_downloaded = 0
+            self.failures = {}
+            self.records = {}
+            self.pages = {}
+            self.events = {}
+            self.decisions = deque(maxlen=100)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def mean(self, stage):
+        """Mean seconds of `stage` so far, 0 before its first observation"""
+        with self._lock:
+            histogram = self.stages.get(stage)
+            return histogram.sum / histogram.count if histogram and histogram.count else 0.0
+
+    @contextmanager
+    def time(self, stage):
+        """Time the body of a with block as one observation of `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def add_bytes(self, count):
+        with self._lock:
+            self.bytes_downloaded += count
+
+    def page_failed(self, error):
+        reason = error if isinstance(error, str) else failure_reason(error)
+        with self._lock:
+            self.failures[reason] = self.failures.get(reason, 0) + 1
+        return reason
+
+    def count_records(self, source, count=1):
+        with self._lock:
+            self.records[source] = self.records.get(source, 0) + count
+
+    def count_page(self, source):
+        """A page whose records were extracted; with count_records this gives records per page"""
+        with self._lock:
+            self.pages[source] = self.pages.get(source, 0) + 1
+
+    def count(self, event, count=1):
+        with self._lock:
+            self.events[event] = self.events.get(event, 0) + count
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def decision(self, controller, action, reason, **details):
+        """Record a concurrency controller or circuit breaker decision; the last 100 are kept"""
+        with self._lock:
+            self.decisions.append(dict(at=time.time(), controller=controller, action=action, reason=reason,
+                                       **details))
+            event = f'{controller}_{action}'
+            self.events[event] = self.events.get(event, 0) + 1
+
+    def snapshot(self):
+        """Everything collected so far as plain data"""
+        with self._lock:
+            return {
+                'started_at': self.started_at,
+                'elapsed_seconds': time.time() - self.started_at,
+                'stages': {stage: histogram.snapshot() for stage, histogram in self.stages.items()},
+                'bytes_downloaded': self.bytes_downloaded,
+                'pages_failed': dict(self.failures),
+                'records_by_source': dict(self.records),
+                'pages_by_source': dict(self.pages),
+                'records_per_page': {
+                    source: self.records.get(source, 0) / pages for source, pages in self.pages.items() if pages
+                },
+                'events': dict(self.events),
+                'gauges': dict(self.gauges),
+                'decisions': list(self.decisions),
+            }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent, sort_keys=True)
+
+    def to_prometheus(self, prefix='extractor'):
+        """Prometheus text exposition format, e.g. for node_exporter's textfile collector"""
+        snapshot = self.snapshot()
+        lines = [
+            f'# HELP {prefix}_stage_seconds Time spent per pipeline stage',
+            f'# TYPE {prefix}_stage_seconds histogram',
+        ]
+        for stage, histogram in sorted(snapshot['stages'].items()):
+            cumulative = 0
+            for bound, count in histogram['buckets'].items():
+                cumulative += count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+        lines += [
+            f'# HELP {prefix}_bytes_downloaded_total Page body bytes downloaded',
+            f'# TYPE {prefix}_bytes_downloaded_total counter',
+            f'{prefix}_bytes_downloaded_total {snapshot["bytes_downloaded"]}',
+        ]
+
+        for name, help_text, label, values in (
+            ('pages_failed_total', 'Pages that could not be used, by reason', 'reason', snapshot['pages_failed']),
+            ('records_total', 'Employee records extracted, by source', 'source', snapshot['records_by_source']),
+            ('pages_total', 'Pages records were extracted from, by source', 'source', snapshot['pages_by_source']),
+            ('events_total', 'Other pipeline events', 'event', snapshot['events']),
+        ):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            for key, value in sorted(values.items()):
+                lines.append(f'{prefix}_{name}{{{label}="{key}"}} {value}')
+
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f'# TYPE {prefix}_{name} gauge')
+            lines.append(f'{prefix}_{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def stage_rows(self):
+        """One summary row per stage for display"""
+        rows = []
+        for stage, histogram in sorted(self.snapshot()['stages'].items()):
+            rows.append({
+                'stage': stage,
+                'description': STAGE_HELP.get(stage, ''),
+                'count': histogram['count'],
+                'total_s': round(histogram['sum'], 3),
+                'mean_ms': round(histogram['mean'] * 1000, 2),
+                'p50_ms': round(histogram['p50'] * 1000, 2),
+                'p95_ms': round(histogram['p95'] * 1000, 2),
+                'max_ms': round(histogram['max'] * 1000, 2),
+            })
+        return rows
+
+    def write(self, json_path=None, prometheus_path=None):
+        """Write the JSON report and/or Prometheus file, replacing them atomically"""
+        for path, content in ((json_path, self.to_json), (prometheus_path, self.to_prometheus)):
+            if path:
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(content())
+                os.replace(tmp_path, path)
+
+
+class RunProfiler:
+    """cProfile capture of a whole run, including the worker threads it hands work to"""
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._main = cProfile.Profile()
+
+    def start(self):
+        self._main.enable()
+
+    def stop(self):
+        self._main.disable()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def wrap(self, fn):
+        """Profile every call of fn on whichever thread runs it
+
+        From Python 3.12 only one profiler may be active at a time and it sees every thread, so calls are
+        left to the one started by start(). A thread whose profiler can't be enabled runs unprofiled.
+        """
+        if sys.version_info >= (3, 12):
+            return fn
+
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                return fn(*args, **kwargs)
+            with self._lock:
+                self._profiles.append(profile)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+        return profiled
+
+    def stats(self):
+        """All captured profiles merged, or None if nothing was captured"""
+        with self._lock:
+            profiles = [self._main] + self._profiles
+
+        stats = None
+        for profile in profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                pass  # a profile that never collected anything
+        return stats
+
+    def summary(self, limit=40, sort='cumulative'):
+        """Top functions as text"""
+        stats = self.stats()
+        if stats is None:
+            return "Nothing was profiled"
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump(self):
+        """Merged profile in the .prof format read by pstats, snakeviz and friends"""
+        stats = self.stats()
+        if stats is None:
+            return b''
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'run.prof')
+            stats.dump_stats(path)
+            with open(path, 'rb') as f:
+                return f.read()
@@ -0,0 +1,93 @@
+import re
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
+
+# Pages with fewer words than this aren't fingerprinted: short error and placeholder pages look alike
+MIN_WORDS = 30
+SHINGLE_WORDS = 3
+
+# Fingerprints within this many differing bits (of 64) count as the same page: about 97% of shingles shared
+MAX_DISTANCE = 5
+BANDS = MAX_DISTANCE + 1
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+_WORD = re.compile(r'\w+')
+
+# _BIT_TABLES[b] maps every byte value to its bit b, so a column of hash bytes can be counted in C
+_BIT_TABLES = [bytes((value >> bit) & 1 for value in range(256)) for bit in range(8)]
+
+
+def fingerprint(text):
+    """64-bit SimHash of the text's word 3-grams, or None for pages too short to tell apart
+
+    Each bit is set when most shingle hashes have it set, so pages sharing most of their text get
+    fingerprints a few bits apart. Hashes are blake2b rather than hash(), so worker processes agree.
+    """
+    words = _WORD.findall(text.lower())
+    if len(words) < MIN_WORDS:
+        return None
+
+    shingles = {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    digests = b''.join(blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles)
+    half = len(shingles) / 2
+
+    value = 0
+    for i in range(8):
+        column = digests[i::8]
+        for bit in range(8):
+            if column.translate(_BIT_TABLES[bit]).count(1) > half:
+                value |= 1 << (i * 8 + bit)
+    return value
+
+
+def is_near(a, b, max_distance=MAX_DISTANCE):
+    return (a ^ b).bit_count() <= max_distance
+
+
+class NearDuplicateIndex:
+    """Recently seen page fingerprints, looked up by Hamming distance
+
+    A fingerprint is filed under each of its BANDS bands of BAND_BITS bits; two fingerprints at most
+    MAX_DISTANCE bits apart agree on at least one whole band, so only pages sharing a band are compared.
+    The oldest fingerprints are dropped beyond `capacity`.
+    """
+
+    def __init__(self, capacity=5000):
+        self.capacity = capacity
+        self._urls = OrderedDict()  # fingerprint -> first URL seen with it
+        self._bands = [{} for _ in range(BANDS)]
+        self._lock = threading.Lock()
+
+    def _find(self, value):
+        for band, buckets in enumerate(self._bands):
+            for other in buckets.get((value >> (band * BAND_BITS)) & BAND_MASK, ()):
+                if is_near(value, other):
+                    return self._urls[other]
+        return None
+
+    def check_and_add(self, value, url):
+        """URL of an earlier near-duplicate of this fingerprint, or None after filing it under `url`"""
+        with self._lock:
+            original = self._find(value)
+            if original is not None:
+                return original
+            self._add(value, url)
+            return None
+
+    def _add(self, value, url):
+        self._urls[value] = url
+        for band, buckets in enumerate(self._bands):
+            buckets.setdefault((value >> (band * BAND_BITS)) & BAND_MASK, []).append(value)
+
+        if len(self._urls) > self.capacity:
+            oldest, _ = self._urls.popitem(last=False)
+            for band, buckets in enumerate(self._bands):
+                key = (oldest >> (band * BAND_BITS)) & BAND_MASK
+                buckets[key].remove(oldest)
+                if not buckets[key]:
+                    del buckets[key]
+
+    def __len__(self):
+        return len(self._urls)
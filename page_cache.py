@@ -0,0 +1,155 @@
+import time
+import zlib
+
+from sqlite_store import open_database
+
+
+class PageCache:
+    """Disk-backed HTTP page cache keyed by URL, revalidated with ETag/Last-Modified"""
+
+    def __init__(self, path='.cache/page_cache.sqlite3', max_bytes=256 * 1024 * 1024, store_text=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.store_text = store_text
+        self.revalidated = 0
+        self.fetched = 0
+        self.bytes_saved = 0
+        self.parses_avoided = 0
+        self.evictions = 0
+
+        self._conn, self._lock = open_database(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS page_cache ('
+            ' url TEXT PRIMARY KEY,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' body BLOB NOT NULL,'
+            ' body_size INTEGER NOT NULL,'
+            ' text TEXT,'
+            ' title TEXT,'
+            ' stored_size INTEGER NOT NULL,'
+            ' fetched_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS page_cache_accessed ON page_cache (accessed_at)')
+        self._conn.commit()
+
+    def get(self, url):
+        """Return the cached entry for a URL as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT etag, last_modified, body, body_size, text, title FROM page_cache WHERE url = ?',
+                (url,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'body': zlib.decompress(row[2]),
+            'body_size': row[3],
+            'text': row[4],
+            'title': row[5],
+        }
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Request headers that let the server answer 304 Not Modified"""
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def mark_revalidated(self, url, entry):
+        """Record a 304 for a cached URL"""
+        with self._lock:
+            self._conn.execute('UPDATE page_cache SET accessed_at = ? WHERE url = ?', (time.time(), url))
+            self._conn.commit()
+            self.revalidated += 1
+            self.bytes_saved += entry['body_size']
+            if entry['text'] is not None:
+                self.parses_avoided += 1
+
+    def store(self, url, headers, body, text=None, title=None):
+        """Cache a 200 response when the server gave us something to revalidate with"""
+        headers = {key.lower(): value for key, value in headers.items()}
+        etag = headers.get('etag')
+        last_modified = headers.get('last-modified')
+
+        with self._lock:
+            self.fetched += 1
+
+        if not etag and not last_modified:
+            return
+
+        self.store_body(url, body, etag, last_modified, text, title)
+
+    def store_body(self, url, body, etag=None, last_modified=None, text=None, title=None):
+        compressed = zlib.compress(body)
+        if not self.store_text:
+            text = None
+        stored_size = len(compressed) + len((text or '').encode('utf-8'))
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO page_cache'
+                ' (url, etag, last_modified, body, body_size, text, title, stored_size, fetched_at, accessed_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (url, etag, last_modified, compressed, len(body), text, title, stored_size, now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def update_text(self, url, text, title):
+        """Attach parsed text to an entry that was stored body-only"""
+        if not self.store_text:
+            return
+        with self._lock:
+            self._conn.execute('UPDATE page_cache SET text = ?, title = ? WHERE url = ?', (text, title, url))
+            self._conn.commit()
+
+    def _evict(self):
+        # Least recently used pages go first once the cache grows past max_bytes
+        if not self.max_bytes:
+            return
+        total = self._conn.execute('SELECT COALESCE(SUM(stored_size), 0) FROM page_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute('SELECT url, stored_size FROM page_cache ORDER BY accessed_at ASC')
+        doomed = []
+        for url, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((url,))
+            total -= size
+
+        self._conn.executemany('DELETE FROM page_cache WHERE url = ?', doomed)
+        self.evictions += len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM page_cache')
+            self._conn.commit()
+
+    def stats(self):
+        """Counters showing what the cache has saved"""
+        with self._lock:
+            entries, stored = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(stored_size), 0) FROM page_cache'
+            ).fetchone()
+        return {
+            'revalidated': self.revalidated,
+            'fetched': self.fetched,
+            'bytes_saved': self.bytes_saved,
+            'parses_avoided': self.parses_avoided,
+            'evictions': self.evictions,
+            'entries': entries,
+            'stored_bytes': stored,
+        }
@@ -0,0 +1,133 @@
+"""Page parsing and record building with no Streamlit dependency, so it can run in worker processes"""
+import time
+from urllib.parse import urlparse
+
+from extraction import get_extraction_engine
+from html_text import extract_links, html_to_text
+from near_duplicates import fingerprint
+from phones import region_for_country
+from records import EmployeeRecord
+
+
+def extract_company_from_url(url):
+    """Extract company name from URL domain"""
+    try:
+        domain = urlparse(url).netloc.replace('www.', '').lower()
+        company_name = domain.split('.')[0]
+        return company_name.title().replace('-', ' ')
+    except:
+        return "Unknown Company"
+
+
+def company_info_from_extraction(url, title, extraction):
+    """Same fields as extract_company_info, built from an ExtractionEngine result"""
+    return {
+        'name': title.split('|')[0].split('-')[0].strip() if title else '',
+        'domain': urlparse(url).netloc.replace('www.', ''),
+        'address': extraction.address,
+        'phone': extraction.phones[0].number if extraction.phones else '',
+        'phone_type': extraction.phones[0].type if extraction.phones else '',
+        'employees_count': extraction.employees_count
+    }
+
+
+def build_page_records(result, text_content, page_title, job_role, industry, city, country, company_info=None):
+    """Employee records of one page and the company facts they were built with
+
+    Pass the company_info of another page of the same site to reuse it instead of extracting it again.
+    """
+    url = result.get('link', '')
+    title = result.get('title', '')
+    snippet = result.get('snippet', '')
+
+    employees_found = []
+
+    if not text_content:
+        return employees_found, company_info
+
+    # One precompiled pass finds names, emails, phones and (unless known) company facts
+    extraction = get_extraction_engine(job_role).extract(
+        text_content, ' ' + title + ' ' + snippet, company_facts=company_info is None,
+        region=region_for_country(country)
+    )
+
+    # Extract company information
+    if company_info is None:
+        company_info = company_info_from_extraction(url, page_title, extraction)
+
+    names = extraction.names
+    emails = extraction.emails
+    phones = extraction.phones
+
+    # Create employee records
+    for i, name in enumerate(names[:3]):  # Limit to 3 employees per company
+        first_name = name.split()[0]
+        last_name = name.split()[-1] if len(name.split()) > 1 else ''
+
+        # Try to match email to name
+        corporate_email = ''
+        for email in emails:
+            if first_name.lower() in email.lower() or last_name.lower() in email.lower():
+                corporate_email = email
+                break
+
+        # Generate corporate email if not found
+        if not corporate_email and company_info['domain']:
+            corporate_email = f"{first_name.lower()}.{last_name.lower()}@{company_info['domain']}"
+
+        # The i-th number found goes with the i-th name, else the company's main number
+        if i < len(phones):
+            phone, phone_type = phones[i]
+        else:
+            phone, phone_type = company_info['phone'], company_info.get('phone_type', '')
+
+        employee_record = EmployeeRecord(
+            business_name=company_info['name'] or extract_company_from_url(url),
+            num_employees=company_info['employees_count'] or 'Unknown',
+            contact_person=name,
+            first_name=first_name,
+            corporate_email=corporate_email,
+            other_emails=emails[0] if emails else f"info@{company_info['domain']}",
+            website=f"www.{company_info['domain']}",
+            phone=phone,
+            phone_type=phone_type or 'Unknown',
+            street_address=company_info['address'] or f"{city}, {country}",
+            zip_code='Unknown',
+            state='Unknown',
+            city=city
+        )
+
+        employees_found.append(employee_record)
+
+    return employees_found, company_info
+
+
+def process_page(result, body, encoding, text_content, page_title, job_role, industry, city, country,
+                 parser_backend='lxml', find_links=False, company_info=None, fingerprint_page=False):
+    """Worker entry point: parse the raw body (unless its text is already known) and build records
+
+    Returns plain (records, text, title, timings, links, company_info, fingerprint) so the parent can
+    cache the parsed text, record how long each stage took, queue same-site links for crawling, reuse
+    the company facts for the site's other pages and check the page's fingerprint against the run's.
+    """
+    timings = {}
+    if text_content is None:
+        started = time.perf_counter()
+        text_content, page_title = html_to_text(body, parser_backend, encoding)
+        timings['parse'] = time.perf_counter() - started
+
+    page_fingerprint = None
+    if fingerprint_page and text_content:
+        started = time.perf_counter()
+        page_fingerprint = fingerprint(text_content)
+        timings['fingerprint'] = time.perf_counter() - started
+
+    records = []
+    if text_content:
+        started = time.perf_counter()
+        records, company_info = build_page_records(result, text_content, page_title, job_role, industry, city,
+                                                   country, company_info)
+        timings['extract'] = time.perf_counter() - started
+
+    links = extract_links(body, result.get('link', ''), encoding) if find_links and body else []
+    return records, text_content, page_title, timings, links, company_info, page_fingerprint
@@ -0,0 +1,96 @@
+"""Phone numbers found with libphonenumber's matcher and normalized to E.164"""
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import phonenumbers
+from phonenumbers import Leniency, PhoneNumberFormat, PhoneNumberMatcher, PhoneNumberType
+
+Phone = namedtuple('Phone', ['number', 'type'])
+
+# Region used when none is given: the app's searches have always defaulted to India
+DEFAULT_REGION = 'IN'
+
+# Country names and abbreviations people type, by ISO region code; two-letter codes are accepted as is
+COUNTRY_REGIONS = {
+    'india': 'IN', 'bharat': 'IN',
+    'usa': 'US', 'us': 'US', 'u.s.': 'US', 'u.s.a.': 'US', 'united states': 'US',
+    'united states of america': 'US', 'america': 'US',
+    'uk': 'GB', 'u.k.': 'GB', 'united kingdom': 'GB', 'great britain': 'GB', 'britain': 'GB', 'england': 'GB',
+    'scotland': 'GB', 'wales': 'GB',
+    'uae': 'AE', 'united arab emirates': 'AE', 'dubai': 'AE',
+    'canada': 'CA', 'australia': 'AU', 'new zealand': 'NZ', 'ireland': 'IE', 'singapore': 'SG',
+    'malaysia': 'MY', 'indonesia': 'ID', 'philippines': 'PH', 'thailand': 'TH', 'vietnam': 'VN',
+    'japan': 'JP', 'china': 'CN', 'hong kong': 'HK', 'taiwan': 'TW', 'south korea': 'KR', 'korea': 'KR',
+    'pakistan': 'PK', 'bangladesh': 'BD', 'sri lanka': 'LK', 'nepal': 'NP',
+    'saudi arabia': 'SA', 'qatar': 'QA', 'kuwait': 'KW', 'oman': 'OM', 'bahrain': 'BH', 'israel': 'IL',
+    'turkey': 'TR', 'egypt': 'EG', 'south africa': 'ZA', 'nigeria': 'NG', 'kenya': 'KE',
+    'germany': 'DE', 'france': 'FR', 'spain': 'ES', 'italy': 'IT', 'netherlands': 'NL', 'holland': 'NL',
+    'belgium': 'BE', 'switzerland': 'CH', 'austria': 'AT', 'sweden': 'SE', 'norway': 'NO', 'denmark': 'DK',
+    'finland': 'FI', 'poland': 'PL', 'portugal': 'PT', 'russia': 'RU',
+    'brazil': 'BR', 'mexico': 'MX', 'argentina': 'AR', 'chile': 'CL', 'colombia': 'CO',
+}
+
+LINE_TYPES = {
+    PhoneNumberType.FIXED_LINE: 'Office',
+    PhoneNumberType.MOBILE: 'Mobile',
+    PhoneNumberType.FIXED_LINE_OR_MOBILE: 'Office/Mobile',
+    PhoneNumberType.TOLL_FREE: 'Toll-free',
+    PhoneNumberType.PREMIUM_RATE: 'Premium rate',
+    PhoneNumberType.SHARED_COST: 'Shared cost',
+    PhoneNumberType.VOIP: 'VoIP',
+    PhoneNumberType.PERSONAL_NUMBER: 'Personal',
+    PhoneNumberType.PAGER: 'Pager',
+    PhoneNumberType.UAN: 'Office',
+}
+
+# Stretches of characters phone numbers are written with; only these are handed to the matcher
+CANDIDATE_PATTERN = re.compile(r'\+?\(?\d[\d\s().\-/]{5,}\d')
+MIN_DIGITS = 7
+
+
+@lru_cache(maxsize=256)
+def region_for_country(country):
+    """ISO region code for a country name or code, or None when it isn't recognised"""
+    key = (country or '').strip().lower()
+    if key in COUNTRY_REGIONS:
+        return COUNTRY_REGIONS[key]
+    if len(key) == 2 and key.upper() in phonenumbers.SUPPORTED_REGIONS:
+        return key.upper()
+    return None
+
+
+@lru_cache(maxsize=65536)
+def _line_type(e164):
+    return LINE_TYPES.get(phonenumbers.number_type(phonenumbers.parse(e164)), 'Other')
+
+
+@lru_cache(maxsize=65536)
+def _match_window(window, region):
+    """Phones in one candidate stretch; pages repeat the same footer numbers, so this is memoized"""
+    phones = []
+    for match in PhoneNumberMatcher(window, region, Leniency.VALID):
+        e164 = phonenumbers.format_number(match.number, PhoneNumberFormat.E164)
+        phones.append(Phone(e164, _line_type(e164)))
+    return tuple(phones)
+
+
+def find_phones(text, region=DEFAULT_REGION, end=None):
+    """Valid phone numbers in text[:end] as Phone(E.164 number, line type), first mention first
+
+    Numbers written without a country code are read as numbers of `region`; with region None only
+    numbers in international format are found.
+    """
+    end = len(text) if end is None else end
+    phones = []
+    seen = set()
+    for match in CANDIDATE_PATTERN.finditer(text, 0, end):
+        if sum(c.isdigit() for c in match.group()) < MIN_DIGITS:
+            continue
+        # One character of context either side, so the matcher can reject numbers glued to words
+        window = text[max(0, match.start() - 1):min(match.end() + 1, end)]
+        for phone in _match_window(window, region):
+            if phone.number not in seen:
+                seen.add(phone.number)
+                phones.append(phone)
+    return phones
@@ -0,0 +1,297 @@
+"""robots.txt rules and per-host pacing: many hosts are fetched at once, each one at a steady, allowed rate"""
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+from single_flight import SingleFlight
+from urls import site_of
+
+# Product token matched against User-agent lines; the browser User-Agent header names no crawler, so in
+# practice the '*' group applies
+ROBOTS_USER_AGENT = 'BusinessDataExtractor'
+
+# Rules past this size are ignored, as RFC 9309 allows (Google reads the first 500 KiB)
+MAX_ROBOTS_BYTES = 500 * 1024
+
+ROBOTS_TIMEOUT = 5
+
+
+class RobotsDisallowedError(Exception):
+    """A page robots.txt keeps us from fetching; `reason` says why, for the failure counts"""
+
+    def __init__(self, message, reason='robots_disallowed'):
+        super().__init__(message)
+        self.reason = reason
+
+
+def robots_url(url):
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}/robots.txt'
+
+
+class RobotsRules:
+    """The robots.txt of one origin, as parsed when it was fetched"""
+
+    def __init__(self, parser, expires_at, unreachable=False):
+        self.parser = parser
+        self.expires_at = expires_at
+        self.unreachable = unreachable
+
+        # Request-rate: n/s is read as a delay of s/n seconds; the longer of it and Crawl-delay wins
+        delay = parser.crawl_delay(ROBOTS_USER_AGENT) or 0
+        rate = parser.request_rate(ROBOTS_USER_AGENT)
+        if rate is not None and rate.requests:
+            delay = max(delay, rate.seconds / rate.requests)
+        self.crawl_delay = float(delay)
+
+    def allows(self, url):
+        return self.parser.can_fetch(ROBOTS_USER_AGENT, url)
+
+    def check(self, url):
+        if self.unreachable:
+            raise RobotsDisallowedError(f"Skipped {url}: robots.txt could not be fetched", 'robots_unreachable')
+        if not self.allows(url):
+            raise RobotsDisallowedError(f"Skipped {url}: disallowed by robots.txt")
+
+
+class RobotsCache:
+    """Parsed robots.txt per origin (scheme and host), kept for `ttl` seconds
+
+    `fetch(robots_url)` returns (status, body) and raises on network errors; concurrent lookups of one
+    origin share a single fetch. As in RFC 9309, a missing robots.txt (4xx) allows everything, while a
+    server or network error disallows the whole site until it is retried after `error_ttl` seconds.
+    """
+
+    def __init__(self, fetch=None, ttl=24 * 3600, error_ttl=600, capacity=10000, metrics=None):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.capacity = capacity
+        self.metrics = metrics
+        self._rules = OrderedDict()  # origin -> RobotsRules, least recently used first
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def view(self, metrics):
+        """A cache over the same rules and fetches that counts into other metrics"""
+        cache = RobotsCache(self.fetch, self.ttl, self.error_ttl, self.capacity, metrics)
+        cache._rules, cache._lock, cache._flights = self._rules, self._lock, self._flights
+        return cache
+
+    def cached(self, url):
+        """Fresh rules for the URL's origin, or None when they have to be fetched"""
+        origin = robots_url(url)
+        with self._lock:
+            rules = self._rules.get(origin)
+            if rules is None or rules.expires_at <= time.monotonic():
+                return None
+            self._rules.move_to_end(origin)
+        return rules
+
+    def rules_for(self, url):
+        """Rules for the URL's origin, fetching its robots.txt with `fetch` when not cached"""
+        rules = self.cached(url)
+        if rules is not None:
+            if self.metrics is not None:
+                self.metrics.count('robots_cache_hits')
+            return rules
+        origin = robots_url(url)
+        rules, _ = self._flights.do(origin, lambda: self._fetch(origin))
+        return rules
+
+    def _fetch(self, origin):
+        started = time.perf_counter()
+        try:
+            status, body = self.fetch(origin)
+        except Exception:
+            status, body = None, b''
+        return self.store(origin, status, body, time.perf_counter() - started)
+
+    def store(self, url, status, body, seconds=None):
+        """Parse a fetched robots.txt (status None for a network error) and cache it for the URL's origin"""
+        if seconds is not None and self.metrics is not None:
+            self.metrics.observe('robots', seconds)
+        parser = RobotFileParser(robots_url(url))
+        unreachable = status is None or status >= 500
+        if unreachable:
+            parser.disallow_all = True
+        elif status >= 400:
+            parser.allow_all = True
+        elif status < 300:
+            parser.parse(body[:MAX_ROBOTS_BYTES].decode('utf-8', 'replace').splitlines())
+        else:
+            # A redirect that wasn't followed: no rules
+            parser.allow_all = True
+        parser.modified()
+
+        rules = RobotsRules(parser, time.monotonic() + (self.error_ttl if unreachable else self.ttl), unreachable)
+        with self._lock:
+            self._rules[robots_url(url)] = rules
+            self._rules.move_to_end(robots_url(url))
+            while len(self._rules) > self.capacity:
+                self._rules.popitem(last=False)
+        if self.metrics is not None:
+            self.metrics.count('robots_unreachable' if unreachable else 'robots_fetched')
+        return rules
+
+
+class HostPacer:
+    """When each host may be sent its next request
+
+    Requests to one host start at least `min_delay` seconds apart, or its robots.txt Crawl-delay apart
+    when that is longer (counted from the end of the last request once none is in flight), and at most
+    `per_host_limit` are in flight at once; only one while the host's robots.txt is not known yet or when
+    it sets a Crawl-delay. With `robots` None, robots.txt is ignored and only min_delay and per_host_limit
+    apply. Shared by every run of an extractor and its forks, so parallel batch jobs or users don't add up
+    to a faster rate: a request also waits out the delay the host's previous request was sent with, so
+    views with a shorter delay don't speed up a host that another view is pacing.
+    """
+
+    def __init__(self, robots, min_delay=0.5, per_host_limit=4, max_crawl_delay=10.0):
+        self.robots = robots
+        self.min_delay = min_delay
+        self.per_host_limit = per_host_limit
+        self.max_crawl_delay = max_crawl_delay
+        self._hosts = {}  # host -> [requests in flight, start of the last one or end when idle, its delay]
+        self._lock = threading.Lock()
+
+    def configure(self, min_delay=None, per_host_limit=None, max_crawl_delay=None):
+        if min_delay is not None:
+            self.min_delay = min_delay
+        if per_host_limit is not None:
+            self.per_host_limit = per_host_limit
+        if max_crawl_delay is not None:
+            self.max_crawl_delay = max_crawl_delay
+
+    def view(self, robots):
+        """A pacer over the same hosts that follows `robots` and has a min_delay of its own"""
+        pacer = HostPacer(robots, self.min_delay, self.per_host_limit, self.max_crawl_delay)
+        pacer._hosts, pacer._lock = self._hosts, self._lock
+        return pacer
+
+    def rules(self, url):
+        """Cached robots.txt rules for the URL, None when not fetched yet or robots.txt is ignored"""
+        return self.robots.cached(url) if self.robots is not None else None
+
+    def try_start(self, url):
+        """Claim a request to the URL's host: 0 if it may start now, else seconds to wait (None: until one ends)"""
+        rules = self.rules(url)
+        crawl_delay = rules.crawl_delay if rules is not None else 0.0
+        known = rules is not None or self.robots is None
+        limit = self.per_host_limit if known and not crawl_delay else 1
+        host = site_of(url)
+        now = time.monotonic()
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                if len(self._hosts) >= 1000:
+                    self._forget_idle(now)
+                state = self._hosts[host] = [0, None, 0.0]
+            if state[0] >= limit:
+                return None
+            # Measured from the last start, so a Crawl-delay learned meanwhile counts for the next request
+            delay = max(self.min_delay, crawl_delay)
+            if state[1] is not None and state[1] + max(delay, state[2]) > now:
+                return state[1] + max(delay, state[2]) - now
+            state[0] += 1
+            state[1] = now
+            state[2] = delay
+            return 0.0
+
+    def finish(self, url):
+        host = site_of(url)
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                return
+            state[0] -= 1
+            # Once nothing is in flight, the delay runs from the end of the last request: its start was
+            # taken when it was handed out, before any robots.txt fetch or wait for a connection
+            if state[0] <= 0:
+                state[1] = time.monotonic()
+
+    def _forget_idle(self, now):
+        # Hosts with nothing in flight for longer than any delay we would keep
+        for host in [host for host, state in self._hosts.items() if state[0] <= 0 and state[1] + 300 <= now]:
+            del self._hosts[host]
+
+
+class HostQueue:
+    """One wave of fetches queued per host and handed out across hosts, each as its host's pacer allows
+
+    pop_ready() moves on to the next host after every request, so one host's backlog never holds up
+    the others. Items that the host's cached robots.txt rules out are dropped through
+    `on_skip(item, error)` without using up a turn, as are all but the first item of a host whose
+    Crawl-delay is longer than the pacer's max_crawl_delay.
+    """
+
+    # Poll interval while every ready host is at its in-flight limit
+    BUSY_WAIT = 0.05
+
+    def __init__(self, pacer, items, url_of=None, on_skip=None):
+        self.pacer = pacer
+        self.url_of = url_of or (lambda item: item)
+        self.on_skip = on_skip
+        self._queues = OrderedDict()  # host -> deque of items, next host to serve first
+        self._served = set()
+        self._length = 0
+        self._wait = None
+        for item in items:
+            self._queues.setdefault(site_of(self.url_of(item)), deque()).append(item)
+            self._length += 1
+
+    def __len__(self):
+        return self._length
+
+    def pop_ready(self):
+        """The next item whose host may be sent a request now, or None"""
+        self._wait = None
+        for host in list(self._queues):
+            queue = self._queues[host]
+            while queue and self._refused(host, queue[0]):
+                self._length -= 1
+                queue.popleft()
+            if not queue:
+                del self._queues[host]
+                continue
+
+            wait = self.pacer.try_start(self.url_of(queue[0]))
+            if wait == 0:
+                item = queue.popleft()
+                self._length -= 1
+                self._served.add(host)
+                if queue:
+                    self._queues.move_to_end(host)
+                else:
+                    del self._queues[host]
+                return item
+            wait = self.BUSY_WAIT if wait is None else wait
+            self._wait = wait if self._wait is None else min(self._wait, wait)
+        return None
+
+    def _refused(self, host, item):
+        """Hand the item to on_skip if robots.txt keeps us from fetching it"""
+        url = self.url_of(item)
+        rules = self.pacer.rules(url)
+        if rules is None:
+            return False
+        try:
+            rules.check(url)
+            if host in self._served and rules.crawl_delay > self.pacer.max_crawl_delay:
+                raise RobotsDisallowedError(
+                    f"Skipped {url}: robots.txt asks for {rules.crawl_delay:g}s between requests",
+                    'crawl_delay_too_long'
+                )
+        except RobotsDisallowedError as e:
+            if self.on_skip is not None:
+                self.on_skip(item, e)
+            return True
+        return False
+
+    def wait_time(self):
+        """Seconds until pop_ready() may return an item again, None when nothing is queued"""
+        if not self._length:
+            return None
+        return self._wait if self._wait is not None else 0.0
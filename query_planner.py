@@ -0,0 +1,107 @@
+import math
+import time
+
+from sqlite_store import open_database
+
+# Search templates by name; the yield history is stored under these names, so keep them stable
+QUERY_TEMPLATES = [
+    ('linkedin', '"{job_role}" "{industry}" "{city}" "{country}" site:linkedin.com'),
+    ('contact_directory', '"{job_role}" "{industry}" companies "{city}" "{country}" contact directory'),
+    ('team_about', '"{job_role}" "{industry}" "{city}" "{country}" "team" "about us" site:company website'),
+    ('leadership_team', '"{industry}" companies "{city}" "{country}" "{job_role}" leadership team'),
+    ('meet_our_team', '"{job_role}" "{industry}" "{city}" "{country}" "meet our team" OR "our leadership"'),
+    ('email_phone', '"{industry}" "{city}" "{country}" "{job_role}" email contact phone'),
+    ('business_directories', '"{job_role}" "{industry}" "{city}" "{country}" site:crunchbase.com OR site:zoominfo.com'),
+]
+
+RESULTS_PER_QUERY = 10
+
+# What a template is assumed to yield per query before it has history, weighted as PRIOR_QUERIES queries
+PRIOR_QUERIES = 2
+PRIOR_NEW_URLS = 6.0
+PRIOR_CONTACTS = 3.0
+
+
+class QueryStats:
+    """SQLite history of what each search template yielded: queries, results, new URLs and final contacts"""
+
+    def __init__(self, path='.cache/query_stats.sqlite3'):
+        self.path = path
+
+        self._conn, self._lock = open_database(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS template_yield ('
+            ' template TEXT PRIMARY KEY,'
+            ' queries INTEGER NOT NULL DEFAULT 0,'
+            ' results INTEGER NOT NULL DEFAULT 0,'
+            ' new_urls INTEGER NOT NULL DEFAULT 0,'
+            ' contacts INTEGER NOT NULL DEFAULT 0,'
+            ' updated_at REAL)'
+        )
+        self._conn.commit()
+
+    def _add(self, template, queries=0, results=0, new_urls=0, contacts=0):
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO template_yield (template, queries, results, new_urls, contacts, updated_at)'
+                ' VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (template) DO UPDATE SET'
+                ' queries = queries + excluded.queries, results = results + excluded.results,'
+                ' new_urls = new_urls + excluded.new_urls, contacts = contacts + excluded.contacts,'
+                ' updated_at = excluded.updated_at',
+                (template, queries, results, new_urls, contacts, time.time())
+            )
+            self._conn.commit()
+
+    def record_query(self, template, results, new_urls):
+        """One query (or result page) of `template` returned `results`, `new_urls` of them not seen before"""
+        self._add(template, queries=1, results=results, new_urls=new_urls)
+
+    def record_contacts(self, counts):
+        """Contacts that made it into a run's output, by the template that found their page"""
+        for template, contacts in counts.items():
+            if template and contacts:
+                self._add(template, contacts=contacts)
+
+    def yields(self):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT template, queries, results, new_urls, contacts FROM template_yield'
+            ).fetchall()
+        return {row[0]: dict(zip(('queries', 'results', 'new_urls', 'contacts'), row[1:])) for row in rows}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM template_yield')
+            self._conn.commit()
+
+
+class QueryPlanner:
+    """Orders search templates by expected contacts per query and says how many candidates are enough
+
+    Expected yields are the recorded averages pulled towards PRIOR_* by PRIOR_QUERIES pseudo-queries, so
+    a template isn't written off after one unlucky query and untried templates keep their default rank.
+    """
+
+    def __init__(self, stats, margin=1.5, max_pages_per_template=3):
+        self.stats = stats
+        self.margin = margin
+        self.max_pages_per_template = max_pages_per_template
+
+    def expected(self, yields, name):
+        """(new URLs, contacts) one more query of template `name` is expected to bring"""
+        row = yields.get(name, {})
+        queries = row.get('queries', 0) + PRIOR_QUERIES
+        return ((row.get('new_urls', 0) + PRIOR_QUERIES * PRIOR_NEW_URLS) / queries,
+                (row.get('contacts', 0) + PRIOR_QUERIES * PRIOR_CONTACTS) / queries)
+
+    def order(self, yields):
+        """QUERY_TEMPLATES by expected contacts per query, best first; ties keep the listed order"""
+        return sorted(QUERY_TEMPLATES, key=lambda template: -self.expected(yields, template[0])[1])
+
+    def target_urls(self, yields, num_results, max_pages):
+        """Unique search results to gather for `num_results` contacts; never more than will be processed"""
+        new_urls = sum(row['new_urls'] for row in yields.values()) + PRIOR_QUERIES * PRIOR_NEW_URLS
+        contacts = sum(row['contacts'] for row in yields.values()) + PRIOR_QUERIES * PRIOR_CONTACTS
+        # A page gives at most 3 contacts; assume no fewer than one per five pages
+        per_url = min(3.0, max(0.2, contacts / new_urls))
+        return min(max_pages, math.ceil(num_results * self.margin / per_url))
@@ -0,0 +1,58 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket that paces outgoing API requests"""
+
+    def __init__(self, rate=5.0, burst=5):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, rate=None, burst=None):
+        """Change the refill rate and/or burst size in place"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if rate is not None:
+                self.rate = float(rate)
+            if burst is not None:
+                self.burst = max(1, int(burst))
+                self._tokens = min(self._tokens, self.burst)
+
+    def _refill(self, now):
+        elapsed = now - self._last
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._last = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` tokens are available, then consume them"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                elif self.rate > 0:
+                    wait = (tokens - self._tokens) / self.rate
+                else:
+                    wait = 1.0
+
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds` (e.g. after an HTTP 429)"""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            # Whatever was saved up is not trustworthy once the server pushes back
+            self._tokens = 0.0
+            self._last = now
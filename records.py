@@ -0,0 +1,159 @@
+"""Employee records: a slotted row type with interned shared values, and a column-per-field buffer of them"""
+import sys
+from collections.abc import Mapping
+
+# Fields of every employee record, in display order
+COLUMN_ORDER = [
+    'business_name', 'num_employees', 'contact_person', 'first_name',
+    'corporate_email', 'other_emails', 'website', 'phone', 'phone_type',
+    'street_address', 'zip_code', 'state', 'city'
+]
+
+# Plus whether the contact store already knew the contact, set once the record has been stored
+RECORD_FIELDS = COLUMN_ORDER + ['contact_status']
+
+_FIELDS = frozenset(RECORD_FIELDS)
+
+# Company facts, placeholders ('Unknown') and the search's city repeat across records; names and emails don't
+INTERNED_FIELDS = _FIELDS - {'contact_person', 'corporate_email'}
+
+
+def _interned(value):
+    return sys.intern(value) if value.__class__ is str else value
+
+
+def _intern(name, value):
+    return _interned(value) if name in INTERNED_FIELDS else value
+
+
+class EmployeeRecord(Mapping):
+    """One contact, read like the dict it replaces: record['city'], record.get('phone'), dict(record)
+
+    Values live in slots rather than a per-record dict, and values of INTERNED_FIELDS are interned, so
+    the records of one company or city share their strings. Fields that are None (contact_status before
+    the contact store has seen the record) are not keys, so dict(record) has the keys the dict had.
+    """
+
+    __slots__ = tuple(RECORD_FIELDS)
+
+    def __init__(self, business_name=None, num_employees=None, contact_person=None, first_name=None,
+                 corporate_email=None, other_emails=None, website=None, phone=None, phone_type=None,
+                 street_address=None, zip_code=None, state=None, city=None, contact_status=None):
+        # Spelled out rather than looped over RECORD_FIELDS, which takes three times as long per record
+        self.business_name = _interned(business_name)
+        self.num_employees = _interned(num_employees)
+        self.contact_person = contact_person
+        self.first_name = _interned(first_name)
+        self.corporate_email = corporate_email
+        self.other_emails = _interned(other_emails)
+        self.website = _interned(website)
+        self.phone = _interned(phone)
+        self.phone_type = _interned(phone_type)
+        self.street_address = _interned(street_address)
+        self.zip_code = _interned(zip_code)
+        self.state = _interned(state)
+        self.city = _interned(city)
+        self.contact_status = _interned(contact_status)
+
+    @classmethod
+    def from_values(cls, values):
+        """Record from values in RECORD_FIELDS order"""
+        record = cls.__new__(cls)
+        for name, value in zip(RECORD_FIELDS, values):
+            setattr(record, name, _intern(name, value))
+        return record
+
+    def values_tuple(self):
+        return tuple(getattr(self, name) for name in RECORD_FIELDS)
+
+    def __getitem__(self, name):
+        value = getattr(self, name) if name in _FIELDS else None
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        if name not in _FIELDS:
+            raise KeyError(name)
+        setattr(self, name, _intern(name, value))
+
+    def __iter__(self):
+        return (name for name in RECORD_FIELDS if getattr(self, name) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __reduce__(self):
+        # Unpickled records (from parser processes) are interned again in this process
+        return EmployeeRecord.from_values, (self.values_tuple(),)
+
+    def __repr__(self):
+        return f'EmployeeRecord({dict(self)!r})'
+
+
+class RecordBuffer:
+    """Records held as one list per field rather than one object per row
+
+    Converts to a DataFrame or an Arrow table column by column, without building a dict per row.
+    Records may be EmployeeRecords or dicts (e.g. read back from JSON); missing fields are None.
+    """
+
+    def __init__(self, fields=RECORD_FIELDS):
+        self.fields = list(fields)
+        self._columns = [[] for _ in self.fields]
+        self._length = 0
+
+    @classmethod
+    def from_records(cls, records, fields=RECORD_FIELDS):
+        buffer = cls(fields)
+        buffer.extend(records)
+        return buffer
+
+    def append(self, record):
+        if isinstance(record, EmployeeRecord):
+            for name, column in zip(self.fields, self._columns):
+                column.append(getattr(record, name, None))
+        else:
+            for name, column in zip(self.fields, self._columns):
+                column.append(_intern(name, record.get(name)))
+        self._length += 1
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        """The rows as EmployeeRecords (or dicts when the fields aren't RECORD_FIELDS)"""
+        for values in zip(*self._columns):
+            yield self._row(values)
+
+    def __getitem__(self, index):
+        return self._row(tuple(column[index] for column in self._columns))
+
+    def _row(self, values):
+        if self.fields == RECORD_FIELDS:
+            return EmployeeRecord.from_values(values)
+        return dict(zip(self.fields, values))
+
+    def column(self, name):
+        """The values of one field, in record order; the buffer's own list, so don't modify it"""
+        return self._columns[self.fields.index(name)]
+
+    def to_pandas(self, headers=None):
+        """DataFrame with one column per field, named by `headers` when given"""
+        import pandas as pd
+
+        headers = list(headers or self.fields)
+        return pd.DataFrame(dict(zip(headers, self._columns)), columns=headers)
+
+    def to_arrow(self, headers=None):
+        """pyarrow Table with one column per field, named by `headers` when given"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError("Arrow tables need pyarrow: pip install pyarrow") from None
+
+        return pa.table(dict(zip(headers or self.fields, self._columns)))
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import time
+
+from sqlite_store import open_database
+
+
+def normalize_payload(payload):
+    """Canonical JSON form of a Serper payload used as the cache key"""
+    normalized = {}
+    for key, value in payload.items():
+        if isinstance(value, str):
+            value = ' '.join(value.split())
+            if key != 'q':
+                value = value.lower()
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+
+
+class SerperCache:
+    """SQLite-backed cache of Serper search responses with TTL and size-bounded eviction"""
+
+    def __init__(self, path='.cache/serper_cache.sqlite3', ttl_seconds=7 * 24 * 3600, max_entries=5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self._conn, self._lock = open_database(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS serper_cache ('
+            ' key TEXT PRIMARY KEY,'
+            ' payload TEXT NOT NULL,'
+            ' response TEXT NOT NULL,'
+            ' created_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS serper_cache_accessed ON serper_cache (accessed_at)')
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(payload):
+        return hashlib.sha256(normalize_payload(payload).encode('utf-8')).hexdigest()
+
+    def get(self, payload, ttl_seconds=None):
+        """Return the cached organic results for a payload, or None on a miss; `ttl_seconds` overrides the TTL"""
+        key = self.make_key(payload)
+        now = time.time()
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT response, created_at FROM serper_cache WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None or (ttl_seconds and now - row[1] > ttl_seconds):
+                self.misses += 1
+                return None
+
+            self._conn.execute('UPDATE serper_cache SET accessed_at = ? WHERE key = ?', (now, key))
+            self._conn.commit()
+            self.hits += 1
+
+        return json.loads(row[0])
+
+    def set(self, payload, results):
+        """Store the organic results for a payload and evict the oldest entries past the size bound"""
+        key = self.make_key(payload)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO serper_cache (key, payload, response, created_at, accessed_at)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                (key, normalize_payload(payload), json.dumps(results), now, now)
+            )
+            self.stores += 1
+
+            if self.max_entries:
+                count = self._conn.execute('SELECT COUNT(*) FROM serper_cache').fetchone()[0]
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        'DELETE FROM serper_cache WHERE key IN ('
+                        ' SELECT key FROM serper_cache ORDER BY accessed_at ASC LIMIT ?)',
+                        (overflow,)
+                    )
+                    self.evictions += overflow
+
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM serper_cache')
+            self._conn.commit()
+
+    def stats(self):
+        """Hit/miss counters for display"""
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM serper_cache').fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'entries': entries,
+        }
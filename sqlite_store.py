@@ -0,0 +1,19 @@
+"""SQLite connections for the on-disk caches, stores and job queue"""
+import os
+import sqlite3
+import threading
+
+
+def open_database(path, synchronous=None):
+    """Connection shared by all threads of a store and the lock that serialises its use
+
+    The file's directory is created as needed (path ':memory:' keeps the database in memory) and the
+    journal is put in WAL mode so readers in other processes don't block writers.
+    """
+    if path != ':memory:':
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    if synchronous is not None:
+        conn.execute(f'PRAGMA synchronous={synchronous}')
+    return conn, threading.Lock()
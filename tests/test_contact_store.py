@@ -0,0 +1,22 @@
+from contact_store import ContactStore, contact_keys
+
+
+def record(name, company, website):
+    return {'contact_person': name, 'business_name': company, 'website': website}
+
+
+def test_same_name_on_company_domain_is_one_contact():
+    store = ContactStore(':memory:')
+    assert store.upsert(record('John Smith', 'Acme Pvt Ltd', 'www.acme.com')) == 'new'
+    assert store.upsert(record('Smith, John', 'Acme Technologies', 'www.acme.com')) == 'known'
+
+
+def test_same_name_on_directory_domain_is_kept_apart():
+    acme = record('John Smith', 'Acme', 'www.zoominfo.com')
+    globex = record('John Smith', 'Globex', 'www.zoominfo.com')
+    assert contact_keys(acme)[2] == contact_keys(globex)[2] == ''
+
+    store = ContactStore(':memory:')
+    assert store.upsert(acme) == 'new'
+    assert store.upsert(globex) == 'new'
+    assert store.upsert(dict(globex)) == 'known'
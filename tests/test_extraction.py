@@ -0,0 +1,100 @@
+"""ExtractionEngine against the regex helpers it replaced, on synthetic team pages and seeded random text"""
+import random
+
+import phonenumbers
+import pytest
+
+from bench_html_parsing import CORPUS, make_page
+from bench_phone_extraction import legacy_phones
+from extraction import get_extraction_engine
+from extractor import RealEmployeeDataExtractor
+from html_text import lxml_html_to_text
+
+ROLES = ["CTO", "CEO", "CFO", "Software Developer", "Marketing Manager", "HR Manager", "Sales Manager",
+         "VP Engineering", "Director"]
+
+WORDS = ['John', 'Smith', 'priya', 'SHARMA', 'Dr.', 'Mr', 'Chief', 'Technology', 'Executive', 'Officer',
+         'Address:', 'Location', 'office', 'Office:', 'team', 'of', 'employees', 'people', 'CTO', 'ceo',
+         'VP', 'Director', 'manager', 'Engineering', 'Sales', 'HR', 'Marketing', 'Software', 'Developer',
+         'MG Road', 'Bengaluru', 'India', 'the', 'and', 'at', 'call', '+91', '98765', '43210', '9876543210',
+         '1234', '567', '890', '250+', '1,200', 'john.smith@acme.com', 'info@acme.com', 'x@y.io',
+         'directoffice', 'teamanager', 'ctoffice', 'officeo', 'Dr. Ab', 'Ms.', 'R&D', '.', '(', 'ıK', 'ſmith', 'İ',
+         'addreſſ', 'EMPLOYEEſ', 'Teİam']
+SEPARATORS = [' ', '  ', ', ', ' - ', ' – ', ': ', '\n', '-', '']
+
+# Pages as company sites write numbers; the old regexes were written for these
+PHONE_TEXTS = [
+    "Call us on +91 98765 43210 or 080-4123-4567",
+    "Sales: +91-9876543210, support 98450 12345.",
+    "Office: 2nd floor, MG Road. Phone 9988776655 / +919812345678",
+    "Contact Priya Sharma, CTO, at 9123 456 789 or priya@acme.in",
+]
+
+
+def random_text(rng):
+    parts = []
+    for _ in range(rng.randint(5, 80)):
+        parts.append(rng.choice(WORDS))
+        parts.append(rng.choice(SEPARATORS))
+    return ''.join(parts)
+
+
+def documents():
+    rng = random.Random(0)
+    pages = [lxml_html_to_text(make_page(members, seed=members))[0]
+             for name, members in CORPUS.items() if name != 'large']
+    docs = [(page, ' Acme | Leadership Team John Smith - CTO') for page in pages]
+    docs += [(text, ' Acme | Contact') for text in PHONE_TEXTS]
+    docs += [(random_text(rng), ' ' + random_text(rng)) for _ in range(200)]
+    return docs
+
+
+DOCUMENTS = documents()
+
+
+@pytest.fixture(scope='module')
+def helpers():
+    # The helpers don't touch instance state, so skip the caches and sessions __init__ sets up
+    return object.__new__(RealEmployeeDataExtractor)
+
+
+def legacy_e164(text):
+    """Numbers the old India-only regexes found, as the valid E.164 numbers they stand for"""
+    numbers = set()
+    for found in legacy_phones(text):
+        try:
+            number = phonenumbers.parse(found, 'IN')
+        except phonenumbers.NumberParseException:
+            continue
+        if phonenumbers.is_valid_number(number):
+            numbers.add(phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164))
+    return numbers
+
+
+@pytest.mark.parametrize('job_role', ROLES)
+def test_engine_matches_helpers(helpers, job_role):
+    engine = get_extraction_engine(job_role)
+    for text, extra in DOCUMENTS:
+        extraction = engine.extract(text, extra, region='IN')
+        info = helpers.extract_company_info('https://acme.example/team', text, '', 'India')
+        assert set(extraction.names) == set(helpers.extract_names_from_text(text + extra, job_role)), text
+        assert extraction.emails == helpers.extract_emails_from_text(text), text
+        assert extraction.address == info['address'], text
+        assert extraction.employees_count == info['employees_count'], text
+
+
+def test_engine_finds_the_valid_numbers_the_old_regexes_found():
+    # Only on written-out pages: in the random text the old regexes also match digits glued to words,
+    # which the engine rejects on purpose (bench_phone_extraction.py measures that trade-off)
+    engine = get_extraction_engine('CTO')
+    for text in PHONE_TEXTS:
+        expected = legacy_e164(text)
+        assert expected
+        assert expected <= {phone.number for phone in engine.extract(text, region='IN').phones}, text
+
+
+def test_engine_reads_local_numbers_by_region():
+    engine = get_extraction_engine('CTO')
+    text = "Call (415) 555-2671 or 020 7946 0958"
+    assert [phone.number for phone in engine.extract(text, region='US').phones] == ['+14155552671']
+    assert '+442079460958' in {phone.number for phone in engine.extract(text, region='GB').phones}
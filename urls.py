@@ -0,0 +1,43 @@
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'yclid', '_ga', '_gl', 'ref',
+                   'ref_src', 'source', 'spm'}
+
+
+def site_of(url):
+    """Host without a leading www., used to group pages of one company site"""
+    try:
+        host = (urlsplit(url).hostname or '').lower().rstrip('.')
+    except ValueError:
+        return ''
+    return host[4:] if host.startswith('www.') else host
+
+
+def canonical_url(url):
+    """Key shared by trivially different URLs of one page
+
+    Scheme (http/https), www., default ports, fragments, trailing slashes, tracking parameters and the
+    order of the remaining query parameters don't matter.
+    """
+    try:
+        parsed = urlsplit(url.strip())
+        port = parsed.port
+    except ValueError:
+        return url
+
+    host = site_of(url)
+    if port and port not in (80, 443):
+        host = f'{host}:{port}'
+
+    path = parsed.path or '/'
+    while '//' in path:
+        path = path.replace('//', '/')
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit(('', host, path, urlencode(query), ''))